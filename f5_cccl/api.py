@@ -17,10 +17,16 @@
 """F5 Common Controller Core Library to read, diff and apply BIG-IP config."""
 
 import logging
+from multiprocessing.pool import ThreadPool
 import pkg_resources
+import threading
 
 from f5_cccl.bigip import BigIPProxy
+from f5_cccl.bigip_multi import MultiPartitionBigIPProxy
+from f5_cccl.exceptions import F5CcclApplyConfigError
+from f5_cccl.exceptions import F5CcclError
 from f5_cccl.service.manager import ServiceManager
+from f5_cccl.utils.mgmt import session_guard
 
 resource_package = __name__
 api_schema = "schemas/cccl-api-schema.yml"
@@ -28,6 +34,27 @@ api_schema = "schemas/cccl-api-schema.yml"
 LOGGER = logging.getLogger("f5_cccl")
 
 
+def _run_in_executor(loop, executor, func, *args):
+    """Return an asyncio future of func(*args) called by the executor.
+
+    Raises:
+        RuntimeError: No loop is given and none is running.
+    """
+    # asyncio is only needed, and only available, on Python 3.
+    import asyncio
+
+    if loop is None:
+        try:
+            loop = asyncio.get_running_loop()
+        except AttributeError:
+            # Python < 3.7
+            # pylint: disable=protected-access
+            loop = asyncio._get_running_loop()
+            if loop is None:
+                raise RuntimeError("no running event loop")
+    return loop.run_in_executor(executor, func, *args)
+
+
 class F5CloudServiceManager(object):
     """F5 Common Controller Cloud Service Management.
 
@@ -41,7 +68,11 @@ class F5CloudServiceManager(object):
     under its control.
     """
 
-    def __init__(self, bigip, partition, prefix=None, schema_path=None):
+    def __init__(self, bigip, partition, prefix=None, schema_path=None,
+                 refresh_workers=1, direct_updates=False, deploy_workers=1,
+                 transaction_size=0, skip_unchanged=False,
+                 stream_collections=False, page_size=None, page_workers=1,
+                 select_properties=False):
         """Initialize an instance of the F5 CCCL service manager.
 
         :param bigip: BIG-IP management root.
@@ -50,18 +81,61 @@ class F5CloudServiceManager(object):
         managed by this CCCL instance.  This is prepended to the
         resource name (default: None)
         :param schema_path: User defined schema (default: from package)
+        :param refresh_workers: Number of BIG-IP collections to retrieve
+        concurrently when refreshing the cached state (default: 1)
+        :param direct_updates: Update and delete resources with a single
+        request to their known location instead of loading them first.
+        It also lets a pool update only its changed members, without it
+        the whole pool is updated (default: False)
+        :param deploy_workers: Maximum number of resources to create,
+        update or delete concurrently.  Resources that depend on others
+        are deployed after them (default: 1)
+        :param transaction_size: Deploy the resources of each dependency
+        tier in iControl REST transactions of at most this many resources.
+        Updates and deletes are only part of a transaction when
+        direct_updates is set.  Transactions are committed one after
+        another, deploy_workers does not apply.  The applies that deploy
+        in transactions are made alone among those of every manager of
+        the same management root (default: 0, disabled)
+        :param skip_unchanged: Retrieve the change marker of each BIG-IP
+        collection when refreshing the cached state, and only retrieve
+        the collections that changed since they were last retrieved
+        (default: False)
+        :param stream_collections: Create the cached virtual servers and
+        pools from the decoded collections, without creating F5 SDK
+        resources for them (default: False)
+        :param page_size: Retrieve the BIG-IP collections in pages of at
+        most this many items (default: None, in a single request)
+        :param page_workers: Number of pages of a collection to retrieve
+        concurrently (default: 1)
+        :param select_properties: Retrieve only the properties of the
+        virtual servers, pools, policies and health monitors that are
+        compared and managed (default: False)
         """
         LOGGER.debug("F5CloudServiceManager initialize")
         self._bigip_proxy = BigIPProxy(bigip,
                                        partition,
-                                       prefix=prefix)
+                                       prefix=prefix,
+                                       refresh_workers=refresh_workers,
+                                       direct_updates=direct_updates,
+                                       skip_unchanged=skip_unchanged,
+                                       stream_collections=stream_collections,
+                                       page_size=page_size,
+                                       page_workers=page_workers,
+                                       select_properties=select_properties)
 
         if schema_path is None:
             schema_path = pkg_resources.resource_filename(resource_package,
                                                           api_schema)
-        self._service_manager = ServiceManager(self._bigip_proxy,
-                                               partition,
-                                               schema_path)
+        self._service_manager = ServiceManager(
+            self._bigip_proxy,
+            partition,
+            schema_path,
+            deploy_workers=deploy_workers,
+            transaction_size=transaction_size)
+        self._apply_lock = threading.Lock()
+        self._session_guard = session_guard(bigip)
+        self._exclusive = bool(transaction_size)
 
     def apply_config(self, services):
         """Apply service configurations to the BIG-IP partition.
@@ -71,7 +145,29 @@ class F5CloudServiceManager(object):
 
         :return: True if successful, otherwise an exception is thrown.
         """
-        return self._service_manager.apply_config(services)
+        with self._apply_lock, \
+                self._session_guard.hold(exclusive=self._exclusive):
+            return self._service_manager.apply_config(services)
+
+    def apply_config_async(self, services, loop=None, executor=None):
+        """Apply service configurations without blocking an event loop.
+
+        The configuration is applied by the blocking apply_config in a
+        thread of the executor, the iControl REST requests are still
+        those of the F5 SDK session.  The applies of one manager are made
+        one after another, those of managers of other partitions or
+        BIG-IPs run concurrently, except for the applies in transactions,
+        see transaction_size.
+
+        :param services: See apply_config.
+        :param loop: The asyncio event loop (default: the running loop)
+        :param executor: The concurrent.futures executor that applies the
+        configuration (default: the default executor of the loop)
+
+        :return: An asyncio future of the result of apply_config.
+        :raises RuntimeError: No loop is given and none is running.
+        """
+        return _run_in_executor(loop, executor, self.apply_config, services)
 
     def get_partition(self):
         """Get the name of the managed partition.
@@ -105,3 +201,127 @@ class F5CloudServiceManager(object):
         statistics = {}
 
         return statistics
+
+
+class F5MultiPartitionServiceManager(object):
+    """F5 Common Controller Cloud Service Management of several partitions.
+
+    Manages each partition as an F5CloudServiceManager does, over a
+    single iControl REST session.  The BIG-IP state of all the managed
+    partitions is retrieved with one request per collection, and the
+    configurations of different partitions are applied concurrently.
+    """
+
+    def __init__(self, bigip, partitions, prefix=None, schema_path=None,
+                 refresh_workers=1, direct_updates=False, deploy_workers=1,
+                 transaction_size=0, apply_workers=1, skip_unchanged=False,
+                 stream_collections=False, page_size=None, page_workers=1,
+                 select_properties=False):
+        """Initialize an instance of the F5 CCCL multi-partition manager.
+
+        :param bigip: BIG-IP management root.
+        :param partitions: Names of the BIG-IP partitions to manage.
+        :param apply_workers: Maximum number of partitions to apply the
+        configuration of concurrently.  The partitions share the iControl
+        REST session, which carries the open transaction of a deploy, so
+        it cannot be combined with transaction_size (default: 1)
+
+        The other parameters are those of F5CloudServiceManager, they
+        apply to every partition.
+
+        :raises F5CcclError: Both apply_workers and transaction_size are
+        set.
+        """
+        LOGGER.debug("F5MultiPartitionServiceManager initialize")
+        if (apply_workers or 1) > 1 and transaction_size:
+            raise F5CcclError(
+                "Partitions cannot be applied concurrently in "
+                "transactions, set apply_workers or transaction_size")
+
+        self._bigip_proxy = MultiPartitionBigIPProxy(
+            bigip,
+            partitions,
+            prefix=prefix,
+            refresh_workers=refresh_workers,
+            direct_updates=direct_updates,
+            skip_unchanged=skip_unchanged,
+            stream_collections=stream_collections,
+            page_size=page_size,
+            page_workers=page_workers,
+            select_properties=select_properties)
+        self._apply_workers = max(1, apply_workers or 1)
+
+        if schema_path is None:
+            schema_path = pkg_resources.resource_filename(resource_package,
+                                                          api_schema)
+        self._service_managers = dict(
+            (partition, ServiceManager(
+                self._bigip_proxy.get_proxy(partition),
+                partition,
+                schema_path,
+                deploy_workers=deploy_workers,
+                transaction_size=transaction_size))
+            for partition in partitions
+        )
+        self._apply_lock = threading.Lock()
+        self._session_guard = session_guard(bigip)
+        self._exclusive = bool(transaction_size)
+
+    def apply_config(self, services):
+        """Apply service configurations to the BIG-IP partitions.
+
+        The cached BIG-IP state of all the partitions is refreshed once,
+        then the configurations are applied.
+
+        :param services: A dict of the service configuration of each
+        partition to apply, see F5CloudServiceManager.apply_config.  The
+        partitions that are not in the dict are left as they are.
+
+        :return: A dict of the number of resources that were not
+        successfully deployed in each partition.
+        """
+        unknown = set(services) - set(self._service_managers)
+        if unknown:
+            raise F5CcclApplyConfigError(
+                "Partitions not managed: {}".format(
+                    ",".join(sorted(unknown))))
+
+        with self._apply_lock, \
+                self._session_guard.hold(exclusive=self._exclusive):
+            return self._apply_config(services)
+
+    def apply_config_async(self, services, loop=None, executor=None):
+        """Apply service configurations without blocking an event loop.
+
+        See F5CloudServiceManager.apply_config_async.
+
+        :return: An asyncio future of the result of apply_config.
+        """
+        return _run_in_executor(loop, executor, self.apply_config, services)
+
+    def _apply_config(self, services):
+        self._bigip_proxy.refresh()
+
+        def _apply(partition):
+            return (partition,
+                    self._service_managers[partition].apply_config(
+                        services[partition], refresh=False))
+
+        partitions = sorted(services)
+        workers = min(self._apply_workers, len(partitions))
+        if workers <= 1:
+            return dict(_apply(partition) for partition in partitions)
+
+        thread_pool = ThreadPool(workers)
+        try:
+            return dict(thread_pool.map(_apply, partitions))
+        finally:
+            thread_pool.close()
+            thread_pool.join()
+
+    def get_partitions(self):
+        """Get the names of the managed partitions.
+
+        :return: The sorted list of the managed partition names.
+        """
+        return self._bigip_proxy.get_partitions()
@@ -15,8 +15,8 @@ u"""This module provides a class for managing a BIG-IP."""
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from copy import copy
 import logging
+from multiprocessing.pool import ThreadPool
 from time import time
 
 import requests
@@ -25,25 +25,41 @@ from requests.packages.urllib3.exceptions import InsecureRequestWarning
 from f5.sdk_exception import F5SDKError
 
 import f5_cccl.exceptions as cccl_exc
+from f5_cccl.resource.ltm.app_service import ApplicationService
 from f5_cccl.resource.ltm.app_service import IcrApplicationService
+from f5_cccl.resource.ltm.monitor.http_monitor import HTTPMonitor
 from f5_cccl.resource.ltm.monitor.http_monitor import IcrHTTPMonitor
+from f5_cccl.resource.ltm.monitor.https_monitor import HTTPSMonitor
 from f5_cccl.resource.ltm.monitor.https_monitor import IcrHTTPSMonitor
+from f5_cccl.resource.ltm.monitor.icmp_monitor import ICMPMonitor
 from f5_cccl.resource.ltm.monitor.icmp_monitor import IcrICMPMonitor
 from f5_cccl.resource.ltm.monitor.tcp_monitor import IcrTCPMonitor
+from f5_cccl.resource.ltm.monitor.tcp_monitor import TCPMonitor
 from f5_cccl.resource.ltm.policy import IcrPolicy
+from f5_cccl.resource.ltm.policy import Policy
 from f5_cccl.resource.ltm.pool import IcrPool
+from f5_cccl.resource.ltm.pool import Pool
 from f5_cccl.resource.ltm.virtual_address import IcrVirtualAddress
+from f5_cccl.resource.ltm.virtual_address import VirtualAddress
 from f5_cccl.resource.ltm.virtual import IcrVirtualServer
+from f5_cccl.resource.ltm.virtual import VirtualServer
 from f5_cccl.resource.ltm.node import Node
 from f5_cccl.resource.ltm.irule import IcrIRule
+from f5_cccl.resource.ltm.irule import IRule
 from f5_cccl.resource.ltm.internal_data_group import IcrInternalDataGroup
+from f5_cccl.resource.ltm.internal_data_group import InternalDataGroup
+from f5_cccl.utils.collection import collection_lock
+from f5_cccl.utils.collection import collection_resource
+from f5_cccl.utils.collection import CollectionItem
+from f5_cccl.utils.collection import iter_collection_items
+from f5_cccl.utils.mgmt import get_connection_stats
 
 requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
 
 LOGGER = logging.getLogger(__name__)
 
 
-class BigIPProxy(object):
+class BigIPProxy(object):  # pylint: disable=too-many-instance-attributes
     """BigIPProxy class.
 
     Manages the resources for the partition(s) of the specified BIG-IP
@@ -57,14 +73,49 @@ class BigIPProxy(object):
         partitions: List of BIG-IP partitions to manage
         prefix: Opetional string to prepend to resource names
         manage_types: A list of types managed by this proxy object.
+        refresh_workers: Number of collections to retrieve concurrently
+            on refresh (default: 1, retrieve them one after another).
+        direct_updates: Record the selfLink of the cached resources so
+            that they are updated and deleted with a single request,
+            without loading them first, and a pool only updates its
+            changed members (default: False).
+        stream_collections: Retrieve the virtual servers and pools with
+            the iControl REST session and create their resources from
+            the decoded items, without creating F5 SDK resources
+            (default: False).
+        page_size: Retrieve the collections in pages of at most this
+            many items, with $top and $skip (default: None, retrieve
+            each collection with a single request).
+        page_workers: Number of pages of a collection to retrieve
+            concurrently (default: 1, retrieve them one after another).
+        select_properties: Retrieve only the properties of the virtual
+            servers, pools, policies and health monitors that CCCL
+            compares and manages, with $select (default: False).
+        skip_unchanged: Retrieve the change marker of each collection on
+            refresh and only retrieve the collections whose marker moved
+            since they were last retrieved (default: False).
     """
 
-    def __init__(self, bigip, partition, prefix=None, manage_types=None):
+    def __init__(self, bigip, partition, prefix=None, manage_types=None,
+                 refresh_workers=1, direct_updates=False,
+                 stream_collections=False, page_size=None, page_workers=1,
+                 select_properties=False, skip_unchanged=False):
         """Initialize the BigIPProxy object."""
         LOGGER.debug("BigIPProxy.__init__()")
 
         self._bigip = bigip
         self._partition = partition
+        self._refresh_workers = max(1, refresh_workers or 1)
+        self._refresh_timings = dict()
+        self._direct_updates = direct_updates
+        self._stream_collections = stream_collections
+        self._page_size = page_size
+        self._page_workers = max(1, page_workers or 1)
+        self._select_properties = select_properties
+        self._skip_unchanged = skip_unchanged
+
+        # The change marker of each collection when it was last retrieved.
+        self._collection_markers = dict()
 
         self._prefix = ""
         if prefix:
@@ -90,15 +141,26 @@ class BigIPProxy(object):
 
         # BIG-IP resources
         self._virtuals = dict()
+        self._all_virtuals = dict()
+        self._virtual_addresses = dict()
         self._pools = dict()
         self._all_pools = dict()
         self._policies = dict()
         self._iapps = dict()
         self._monitors = dict()
         self._nodes = dict()
+        self._node_addresses = dict()
         self._irules = dict()
         self._internal_data_groups = dict()
 
+    # Health monitor type, iControl REST type and canonical base type.
+    _monitor_types = [
+        ('http', IcrHTTPMonitor, HTTPMonitor),
+        ('https', IcrHTTPSMonitor, HTTPSMonitor),
+        ('tcp', IcrTCPMonitor, TCPMonitor),
+        ('icmp', IcrICMPMonitor, ICMPMonitor)
+    ]
+
     def mgmt_root(self):
         """Return a reference to the proxied BIG-IP."""
         return self._bigip
@@ -117,31 +179,31 @@ class BigIPProxy(object):
 
     def get_virtual_address_references(self):
         """The list of virtual addresses to remove from existing config."""
-        unreferenced = copy(self._virtual_addresses)
-        all_virtuals = self._all_virtuals
-        referenced = dict()
-
-        # For each virtual in managed partition:
-        for virtual in all_virtuals:
-            # Get the name of virtual address from virtual destination.
-            vaddr_name = all_virtuals[virtual].destination[2]
+        # The names of the virtual addresses referenced by the
+        # destination of a virtual server in the managed partition.
+        addresses = set(
+            v.destination.address for v in self._all_virtuals.values())
 
-            # This virtual server references the virtual address.
-            # Remove it from the list of unreferenced virtual addresses.
-            # If the virtual name is not found, it is a no-op.
-            vaddr = unreferenced.pop(vaddr_name, None)
-            if vaddr:
-                # This virtual refers to the virtual address.  Add it to
-                # the map of referenced virtual addresses.
-                referenced[vaddr_name] = vaddr
+        referenced = dict()
+        unreferenced = dict()
+        for (name, vaddr) in self._virtual_addresses.items():
+            if name in addresses:
+                referenced[name] = vaddr
+            else:
+                unreferenced[name] = vaddr
 
         return (referenced, unreferenced)
 
-    def refresh(self):
-        """Refresh the internal cache with the BIG-IP state."""
+    def refresh(self, collections=None):
+        """Refresh the internal cache with the BIG-IP state.
+
+        Args:
+            collections: Keys of the collections to refresh, e.g.
+            ['nodes', 'virtual_addresses'] (default: refresh all).
+        """
         LOGGER.debug("Refreshing the BIG-IP cached state...")
         try:
-            self._refresh()
+            self._refresh(collections)
         except F5SDKError as error:
             LOGGER.error("F5 SDK Error: %s", error)
             raise cccl_exc.F5CcclCacheRefreshError(
@@ -173,8 +235,35 @@ class BigIPProxy(object):
             icr_resource = resource_type(resource_obj.name,
                                          resource_obj.partition)
 
+        # iApps are always loaded before they are updated, the update
+        # must be sent as a PUT with the executeAction.
+        if self._direct_updates and \
+                not issubclass(resource_type, ApplicationService):
+            icr_resource.set_location(
+                getattr(resource_obj, 'selfLink', None))
+
         return icr_resource
 
+    def _create_resources(self, resource_type, resource_objs):
+        """Create the iControl REST resources of a collection.
+
+        Each resource is created once, the managed resources are shared
+        by both indexes.
+
+        Returns:
+            The index of all the resources by name, and the index of the
+            managed resources.
+        """
+        all_resources = dict()
+        managed = dict()
+        for resource_obj in resource_objs:
+            resource = self._create_resource(resource_type, resource_obj)
+            all_resources[resource_obj.name] = resource
+            if self._manageable_resource(resource_obj):
+                managed[resource_obj.name] = resource
+
+        return (all_resources, managed)
+
     def _policy_status_check(self, policy, virtuals):
         """Delete non-legacy policies because they can't be updated."""
         if policy.status != 'legacy':
@@ -189,8 +278,13 @@ class BigIPProxy(object):
                         policies.append(p)
 
                 if policy_delete:
+                    # The retrieved virtual can be a dict or have only
+                    # the selected properties, load it to update it.
                     v.policiesReference['items'] = policies
-                    v.update()
+                    virtual = self._bigip.tm.ltm.virtuals.virtual.load(
+                        name=v.name, partition=v.partition)
+                    virtual.policiesReference['items'] = policies
+                    virtual.update()
 
             # delete policy
             LOGGER.warning("Deleting policy /%s/%s due to invalid status: %s",
@@ -200,164 +294,520 @@ class BigIPProxy(object):
 
         return True
 
-    def _refresh(self):  # pylint: disable=too-many-locals
-        """Refresh the internal cache with the BIG-IP state."""
+    def _collections(self):
+        """Return the collections that are retrieved on refresh.
+
+        Each entry is a tuple of (key, description, collection, expand)
+        where key names the result, description is used for logging,
+        collection is the F5 SDK collection object and expand indicates
+        that the subcollections should be retrieved as well.
+        """
+        ltm = self._bigip.tm.ltm
+        return [
+            ('http_monitors', "http_monitors", ltm.monitor.https, False),
+            ('https_monitors', "https_monitors", ltm.monitor.https_s, False),
+            ('tcp_monitors', "tcp_monitors", ltm.monitor.tcps, False),
+            ('icmp_monitors', "gateway icmp_monitors",
+             ltm.monitor.gateway_icmps, False),
+            ('iapps', "iApps", self._bigip.tm.sys.application.services,
+             False),
+            ('nodes', "nodes", ltm.nodes, False),
+            ('virtual_addresses', "virtual addresses",
+             ltm.virtual_address_s, False),
+            ('irules', "LTM iRules", ltm.rules, False),
+            ('internal_data_groups', "LTM Internal data-groups",
+             ltm.data_group.internals, False),
+            ('virtuals', "virtual servers", ltm.virtuals, True),
+            ('pools', "pools", ltm.pools, True),
+            ('policies', "LTM policies", ltm.policys, True)
+        ]
+
+    # Subcollection references of the expanded collections, retrieved
+    # with the change marker since changes to a subcollection item do
+    # not always change the generation of its parent.
+    _marker_references = {
+        'virtuals': ['policiesReference', 'profilesReference'],
+        'pools': ['membersReference'],
+        'policies': ['rulesReference']
+    }
+
+    # Collections that are decoded item by item when streamed.
+    _streamed_collections = ['virtuals', 'pools']
+
+    # The properties that every selected item is retrieved with: the
+    # kind and selfLink let the F5 SDK create its resource objects.
+    _management_properties = ['name', 'partition', 'kind', 'selfLink',
+                              'generation', 'appService']
+
+    # The selected collections: the resource class, the properties of
+    # the class that are not iControl REST properties and the other
+    # properties that the iControl REST resources are created from.
+    _selections = {
+        'virtuals': (VirtualServer, ['profiles', 'policies'],
+                     ['profilesReference', 'policiesReference']),
+        'pools': (Pool, [], []),
+        'policies': (Policy, ['rules'], ['rulesReference', 'status']),
+        'http_monitors': (HTTPMonitor, [], ['send', 'recv']),
+        'https_monitors': (HTTPSMonitor, [], []),
+        'tcp_monitors': (TCPMonitor, [], []),
+        'icmp_monitors': (ICMPMonitor, [], [])
+    }
+
+    def _selection(self, key):
+        """Return the properties to select for a collection, or None."""
+        if key not in self._selections:
+            return None
+
+        (resource_type, derived, extra) = self._selections[key]
+        properties = set(self._management_properties) | set(extra) | \
+            (set(resource_type.properties) - set(derived))
+        return sorted(properties)
+
+    def _fetch_collection(self, task, select=None):
+        """Retrieve a single collection from the BIG-IP.
+
+        Args:
+            task: A collection tuple as returned by _collections().
+            select: Optional list of the properties to retrieve, by
+                default those of the collection's selection when the
+                properties are selected.
+
+        Returns a tuple of (key, items, elapsed seconds).
+        """
+        (key, description, collection, expand) = task
+        if select is None and self._select_properties:
+            select = self._selection(key)
+
+        #  Retrieve the resources in managed partition, or in all of
+        #  them, getting all subCollections when requested.
+        query = list()
+        if self._partition is not None:
+            query.append("$filter=partition+eq+{}".format(self._partition))
+        if select:
+            query.append("$select={}".format(",".join(select)))
+        if expand:
+            query.append("expandSubcollections=true")
+        query = "&".join(query)
+        stream = self._stream_collections and \
+            key in self._streamed_collections
+
+        LOGGER.debug("Retrieving %s from BIG-IP /%s...",
+                     description, self._partition)
         start_time = time()
+        if self._page_size:
+            items = self._get_pages(collection, query, stream)
+        else:
+            items = self._get_items(collection, query, stream)[0]
+        elapsed = time() - start_time
+        LOGGER.debug("Retrieved %s from BIG-IP /%s in %.5f seconds.",
+                     description, self._partition, elapsed)
+
+        return (key, items, elapsed)
+
+    def _get_items(self, collection, query, stream=False, paged=False):
+        """Retrieve the items of a collection query.
+
+        The F5 SDK keeps the response of get_collection in the shared
+        collection object, so the pages of a collection and the streamed
+        collections are retrieved with the iControl REST session, each
+        request with a response of its own.  Each item is turned into
+        its resource as it is decoded, so the decoded response is never
+        held beside the resources, and the time it takes is part of the
+        retrieval.
+
+        Returns a tuple of (items, total) where total is the totalItems
+        of a paged query, or None.
+
+        Raises:
+            F5CcclCacheRefreshError: The response could not be decoded.
+        """
+        if not (stream or paged):
+            with collection_lock(collection):
+                items = collection.get_collection(
+                    requests_params={"params": query})
+                # The SDK keeps the JSON of the last response in the
+                # collection, which lives as long as the management root.
+                collection.__dict__.pop('items', None)
+                total = collection.__dict__.pop('totalItems', None)
+            return (items, total)
+
+        # pylint: disable=protected-access
+        session = self._bigip._meta_data['icr_session']
+        uri = collection._meta_data['uri']
+        properties = dict()
+        items = list()
+        try:
+            text = session.get(uri, params=query).text
+            for item in iter_collection_items(text, properties):
+                if stream:
+                    items.append(CollectionItem(item))
+                else:
+                    items.append(collection_resource(collection, item))
+        except ValueError as error:
+            LOGGER.error("Failed to decode the collection %s: %s",
+                         uri, error)
+            raise cccl_exc.F5CcclCacheRefreshError(
+                "BigIPProxy: failed to decode a BIG-IP collection.")
+
+        return (items, properties.get('totalItems'))
+
+    def _get_pages(self, collection, query, stream=False):
+        """Retrieve the items of a collection query page by page.
+
+        The number of pages is known from the totalItems of the first
+        page, the others are retrieved concurrently if configured to.
+        Otherwise pages are retrieved until one is not full.  Resources
+        created or deleted while the pages are retrieved can shift the
+        items of the following pages, the next refresh corrects that.
+
+        Returns a list of the items.
+        """
+        page_size = self._page_size
+
+        def _get_page(skip):
+            page_query = "{}&$top={}&$skip={}".format(query, page_size, skip)
+            return self._get_items(collection, page_query, stream,
+                                   paged=True)
+
+        (items, total) = _get_page(0)
+        items = list(items)
+        if total is not None:
+            pages = self._map(_get_page, list(range(page_size, total,
+                                                    page_size)),
+                              self._page_workers)
+            for (page, _) in pages:
+                items.extend(page)
+        else:
+            page = items
+            while len(page) == page_size:
+                page = list(_get_page(len(items))[0])
+                items.extend(page)
+
+        return items
+
+    @staticmethod
+    def _map(function, tasks, workers):
+        """Apply the function to each task, concurrently if configured to.
+
+        Any error raised by the function is raised again in the calling
+        thread.
+        """
+        workers = min(workers, len(tasks))
+        if workers <= 1:
+            return [function(task) for task in tasks]
+
+        thread_pool = ThreadPool(workers)
+        try:
+            return thread_pool.map(function, tasks)
+        finally:
+            thread_pool.close()
+            thread_pool.join()
+
+    def _fetch_collections(self, tasks, fetch=None):
+        """Retrieve the collections, concurrently if configured to.
+
+        When more than one refresh worker is configured, the collections
+        are retrieved over a bounded pool of threads.  Any error raised
+        by a fetch is raised again in the calling thread.
+
+        Returns a list of (key, items, elapsed seconds) tuples.
+        """
+        if fetch is None:
+            fetch = self._fetch_collection
+
+        return self._map(fetch, tasks, self._refresh_workers)
+
+    def _fetch_marker(self, task):
+        """Retrieve the names and generations of a collection's items."""
+        select = ['name', 'generation'] + \
+            self._marker_references.get(task[0], [])
+        return self._fetch_collection(task, select=select)
+
+    @staticmethod
+    def _collection_marker(items):
+        """Return the (count, max generation) of the items.
+
+        The items of any subcollection references are included.  Items
+        retrieved with $select have no kind, the F5 SDK returns them as
+        dicts rather than resource objects.
+        """
+        count = 0
+        generation = 0
+        for item in items:
+            raw = getattr(item, 'raw', item)
+            count += 1
+            generation = max(generation, raw.get('generation', 0))
+            for value in raw.values():
+                if isinstance(value, dict) and 'items' in value:
+                    for subitem in value['items']:
+                        count += 1
+                        generation = max(generation,
+                                         subitem.get('generation', 0))
+
+        return (count, generation)
+
+    def get_change_marker(self):
+        """Return a marker of the state of the managed partition.
+
+        The marker is made up of the number of resources and the highest
+        configuration generation of each collection that is retrieved
+        on refresh.  The BIG-IP assigns a new generation to a resource
+        whenever it is created or modified, and deleting a resource
+        changes the count, so two equal markers indicate that nothing
+        in the partition changed in between.  Only the names and
+        generations are retrieved, which is much cheaper than a refresh.
+
+        Raises:
+            F5CcclCacheRefreshError: Failed to retrieve the marker.
+        """
+        try:
+            markers = self._fetch_markers(self._collections())
+        except F5SDKError as error:
+            LOGGER.error("F5 SDK Error: %s", error)
+            raise cccl_exc.F5CcclCacheRefreshError(
+                "BigIPProxy: failed to retrieve the BIG-IP change marker.")
+
+        return tuple(sorted(markers.items()))
 
-        partition_filter = "$filter=partition+eq+{}".format(self._partition)
-
-        #  Retrieve the list of virtual servers in managed partition.
-        query = partition_filter
-
-        #  Retrieve the lists of health monitors
-        LOGGER.debug("Retrieving http_monitors from BIG-IP /%s...",
-                     self._partition)
-        http_monitors = self._bigip.tm.ltm.monitor.https.get_collection(
-            requests_params={"params": query})
-        LOGGER.debug("Retrieving https_monitors from BIG-IP /%s...",
-                     self._partition)
-        https_monitors = self._bigip.tm.ltm.monitor.https_s.get_collection(
-            requests_params={"params": query})
-        LOGGER.debug("Retrieving tcp_monitors from BIG-IP /%s...",
-                     self._partition)
-        tcp_monitors = self._bigip.tm.ltm.monitor.tcps.get_collection(
-            requests_params={"params": query})
-        LOGGER.debug("Retrieving gateway icmp_monitors from BIG-IP /%s...",
-                     self._partition)
-        icmp_monitors = (
-            self._bigip.tm.ltm.monitor.gateway_icmps.get_collection(
-                requests_params={"params": query})
+    def _fetch_markers(self, tasks):
+        """Return the change marker of each collection by key."""
+        return dict(
+            (key, self._collection_marker(items))
+            for (key, items, _) in self._fetch_collections(
+                tasks, fetch=self._fetch_marker)
         )
-        LOGGER.debug("Retrieving iApps from BIG-IP /%s...",
-                     self._partition)
-        iapps = self._bigip.tm.sys.application.services.get_collection(
-            requests_params={"params": query})
-        LOGGER.debug("Retrieving nodes from BIG-IP /%s...",
-                     self._partition)
-        nodes = self._bigip.tm.ltm.nodes.get_collection(
-            requests_params={"params": query})
-        LOGGER.debug("Retrieving virtual addresses from BIG-IP /%s...",
-                     self._partition)
-        virtual_addresses = \
-            self._bigip.tm.ltm.virtual_address_s.get_collection(
-                requests_params={"params": query})
-
-        LOGGER.debug("Retrieving LTM iRules from BIG-IP /%s...",
-                     self._partition)
-        irules = self._bigip.tm.ltm.rules.get_collection(
-            requests_params={"params": query})
-
-        LOGGER.debug("Retrieving LTM Internal data-groups from BIG-IP /%s...",
-                     self._partition)
-        int_dgs = self._bigip.tm.ltm.data_group.internals.get_collection(
-            requests_params={"params": query})
-
-        #  Retrieve the list of virtuals, pools, and policies in the
-        #  managed partition getting all subCollections.
-        query = "{}&expandSubcollections=true".format(partition_filter)
-
-        LOGGER.debug("Retrieving virtual servers from BIG-IP /%s...",
-                     self._partition)
-        virtuals = self._bigip.tm.ltm.virtuals.get_collection(
-            requests_params={"params": query})
-
-        LOGGER.debug("Retrieving pools from BIG-IP /%s...",
-                     self._partition)
-        pools = self._bigip.tm.ltm.pools.get_collection(
-            requests_params={"params": query})
-
-        LOGGER.debug("Retrieving LTM policies from BIG-IP /%s...",
-                     self._partition)
-        all_policies = self._bigip.tm.ltm.policys.get_collection(
-            requests_params={"params": query})
-
-        #  Delete non-legacy policies
-        policies = [
-            p for p in all_policies
-            if self._policy_status_check(p, virtuals)
-        ]
 
-        #  Refresh the virtuals cache.
-        self._virtuals = {
-            v.name: self._create_resource(IcrVirtualServer, v)
-            for v in virtuals if self._manageable_resource(v)
-        }
-
-        #  Refresh the virtuals cache.
-        self._all_virtuals = {
-            v.name: self._create_resource(IcrVirtualServer, v)
-            for v in virtuals
-        }
-
-        #  Refresh the virtual address cache.
-        self._virtual_addresses = {
-            v.name: self._create_resource(IcrVirtualAddress, v)
-            for v in virtual_addresses if self._manageable_resource(v)
-        }
-
-        #  Refresh the pool cache
-        self._pools = {
-            p.name: self._create_resource(IcrPool, p)
-            for p in pools if self._manageable_resource(p)
-        }
-
-        #  Refresh the all-pool cache
-        self._all_pools = {
-            p.name: self._create_resource(IcrPool, p)
-            for p in pools
-        }
-
-        #  Refresh the iRule cache
-        self._irules = {
-            p.name: self._create_resource(IcrIRule, p)
-            for p in irules if self._manageable_resource(p)
-        }
-
-        #  Refresh the data_group cache
-        self._internal_data_groups = {
-            p.name: self._create_resource(IcrInternalDataGroup, p)
-            for p in int_dgs if self._manageable_resource(p)
-        }
-
-        #  Refresh the policy cache
-        self._policies = {
-            p.name: self._create_resource(IcrPolicy, p)
-            for p in policies if self._manageable_resource(p)
-        }
-
-        #  Refresh the iapp cache
-        self._iapps = {
-            i.name: self._create_resource(IcrApplicationService, i)
-            for i in iapps if i.name.startswith(self._prefix)
-        }
-
-        #  Refresh the node cache
-        self._nodes = {
-            n.name: self._create_resource(Node, n)
-            for n in nodes
-        }
+    def _refresh(self, collections=None):
+        """Refresh the internal cache with the BIG-IP state."""
+        start_time = time()
 
-        #  Refresh the health monitor cache
-        self._monitors['http'] = {
-            m.name: self._create_resource(IcrHTTPMonitor, m)
-            for m in http_monitors if self._manageable_resource(m)
-        }
-        self._monitors['https'] = {
-            m.name: self._create_resource(IcrHTTPSMonitor, m)
-            for m in https_monitors if self._manageable_resource(m)
-        }
-        self._monitors['tcp'] = {
-            m.name: self._create_resource(IcrTCPMonitor, m)
-            for m in tcp_monitors if self._manageable_resource(m)
-        }
-        self._monitors['icmp'] = {
-            m.name: self._create_resource(IcrICMPMonitor, m)
-            for m in icmp_monitors if self._manageable_resource(m)
-        }
+        if collections is not None and 'policies' in collections:
+            # Non-legacy policies are removed from the virtuals that
+            # reference them before they are deleted.
+            collections = set(collections) | set(['virtuals'])
+
+        tasks = [
+            task for task in self._collections()
+            if collections is None or task[0] in collections
+        ]
+
+        # The markers are retrieved first, a change made while the
+        # collections are retrieved moves the marker of the next refresh.
+        markers = dict()
+        if self._skip_unchanged:
+            markers = self._fetch_markers(tasks)
+            changed = set(
+                key for key in markers
+                if markers[key] != self._known_marker(key))
+            if 'policies' in changed:
+                changed.add('virtuals')
+            LOGGER.debug("BIG-IP collections changed since the last "
+                         "refresh: %s", ",".join(sorted(changed)))
+            tasks = [task for task in tasks if task[0] in changed]
+
+        fetched = dict()
+        for (key, items, elapsed) in self._fetch_collections(tasks):
+            fetched[key] = items
+            self._refresh_timings[key] = elapsed
+        self._update_caches(fetched)
+        self._record_markers(markers)
 
         LOGGER.debug(
             "BIG-IP refresh took %.5f seconds.", (time() - start_time))
 
+    def _known_marker(self, key):
+        """Return the marker of a collection as the cache holds it."""
+        return self._collection_markers.get(key)
+
+    def _record_markers(self, markers):
+        """Record the markers of the collections that were refreshed."""
+        self._collection_markers.update(markers)
+
+    def _update_caches(self, fetched):
+        """Rebuild the caches of the collections that were retrieved."""
+        if 'policies' in fetched:
+            #  Delete non-legacy policies
+            policies = [
+                p for p in fetched['policies']
+                if self._policy_status_check(p, fetched['virtuals'])
+            ]
+
+            #  Refresh the policy cache
+            self._policies = {
+                p.name: self._create_resource(IcrPolicy, p)
+                for p in policies if self._manageable_resource(p)
+            }
+
+        if 'virtuals' in fetched:
+            #  Refresh the virtuals caches.
+            (self._all_virtuals, self._virtuals) = self._create_resources(
+                IcrVirtualServer, fetched['virtuals'])
+
+        if 'virtual_addresses' in fetched:
+            #  Refresh the virtual address cache.
+            self._virtual_addresses = {
+                v.name: self._create_resource(IcrVirtualAddress, v)
+                for v in fetched['virtual_addresses']
+                if self._manageable_resource(v)
+            }
+
+        if 'pools' in fetched:
+            #  Refresh the pool caches
+            (self._all_pools, self._pools) = self._create_resources(
+                IcrPool, fetched['pools'])
+
+        if 'irules' in fetched:
+            #  Refresh the iRule cache
+            self._irules = {
+                p.name: self._create_resource(IcrIRule, p)
+                for p in fetched['irules'] if self._manageable_resource(p)
+            }
+
+        if 'internal_data_groups' in fetched:
+            #  Refresh the data_group cache
+            self._internal_data_groups = {
+                p.name: self._create_resource(IcrInternalDataGroup, p)
+                for p in fetched['internal_data_groups']
+                if self._manageable_resource(p)
+            }
+
+        if 'iapps' in fetched:
+            #  Refresh the iapp cache
+            self._iapps = {
+                i.name: self._create_resource(IcrApplicationService, i)
+                for i in fetched['iapps'] if i.name.startswith(self._prefix)
+            }
+
+        if 'nodes' in fetched:
+            #  Refresh the node cache
+            self._nodes = {
+                n.name: self._create_resource(Node, n)
+                for n in fetched['nodes']
+            }
+
+            #  Index the node names by address
+            self._node_addresses = dict()
+            for node in self._nodes.values():
+                self._index_node(node)
+
+        #  Refresh the health monitor cache
+        for (hm_type, monitor_type, _) in self._monitor_types:
+            key = "{}_monitors".format(hm_type)
+            if key in fetched:
+                self._monitors[hm_type] = {
+                    m.name: self._create_resource(monitor_type, m)
+                    for m in fetched[key] if self._manageable_resource(m)
+                }
+
+    def _resource_caches(self, resource):
+        """Return the caches that hold resources of the resource's type."""
+        caches = list()
+        if isinstance(resource, VirtualServer):
+            caches = [self._virtuals, self._all_virtuals]
+        elif isinstance(resource, Pool):
+            caches = [self._pools, self._all_pools]
+        elif isinstance(resource, VirtualAddress):
+            caches = [self._virtual_addresses]
+        elif isinstance(resource, Policy):
+            caches = [self._policies]
+        elif isinstance(resource, IRule):
+            caches = [self._irules]
+        elif isinstance(resource, InternalDataGroup):
+            caches = [self._internal_data_groups]
+        elif isinstance(resource, ApplicationService):
+            caches = [self._iapps]
+        elif isinstance(resource, Node):
+            caches = [self._nodes]
+        else:
+            for (hm_type, _, base_type) in self._monitor_types:
+                if isinstance(resource, base_type):
+                    caches = [self._monitors.setdefault(hm_type, dict())]
+
+        return caches
+
+    def _forget_marker(self, resource):
+        """Retrieve the collection of a resource on the next refresh.
+
+        The cache of the collection no longer holds the resources as
+        they were retrieved.
+        """
+        keys = [
+            (VirtualServer, 'virtuals'),
+            (Pool, 'pools'),
+            (VirtualAddress, 'virtual_addresses'),
+            (Policy, 'policies'),
+            (IRule, 'irules'),
+            (InternalDataGroup, 'internal_data_groups'),
+            (ApplicationService, 'iapps'),
+            (Node, 'nodes')
+        ] + [
+            (base_type, "{}_monitors".format(hm_type))
+            for (hm_type, _, base_type) in self._monitor_types
+        ]
+        for (resource_type, key) in keys:
+            if isinstance(resource, resource_type):
+                self._collection_markers.pop(key, None)
+
+    def _index_node(self, node):
+        """Add the node to the index of node names by address."""
+        self._node_addresses.setdefault(
+            node.data['address'], list()).append(node.name)
+
+    def _unindex_node(self, name):
+        """Remove the named node from the index of node names by address."""
+        node = self._nodes.get(name)
+        if node is not None:
+            names = self._node_addresses.get(node.data['address'], [])
+            if name in names:
+                names.remove(name)
+
+    def cache_resource(self, resource):
+        """Update the cached state with a created or updated resource.
+
+        Returns:
+            True if the cached state reflects the change, False if
+            a refresh is required to bring the cache in step with the
+            BIG-IP (e.g. iApps, which create resources of their own).
+        """
+        if isinstance(resource, Node):
+            self._unindex_node(resource.name)
+            self._index_node(resource)
+
+        caches = self._resource_caches(resource)
+        for cache in caches:
+            cache[resource.name] = resource
+        self._forget_marker(resource)
+
+        return (bool(caches) and
+                not isinstance(resource, ApplicationService))
+
+    def uncache_resource(self, resource):
+        """Remove a deleted resource from the cached state.
+
+        Returns:
+            True if the cached state reflects the change, False if
+            a refresh is required to bring the cache in step with the
+            BIG-IP.
+        """
+        if isinstance(resource, Node):
+            self._unindex_node(resource.name)
+
+        caches = self._resource_caches(resource)
+        for cache in caches:
+            cache.pop(resource.name, None)
+        self._forget_marker(resource)
+
+        return (bool(caches) and
+                not isinstance(resource, ApplicationService))
+
+    def get_refresh_timings(self):
+        """Return the seconds spent retrieving each collection."""
+        return self._refresh_timings
+
+    def get_connection_stats(self):
+        """Return the connection reuse statistics of the BIG-IP session."""
+        return get_connection_stats(self._bigip)
+
     def get_virtuals(self, all_virtuals=False):
         """Return the index of virtual servers."""
         if all_virtuals:
@@ -413,6 +863,10 @@ class BigIPProxy(object):
         """Return the index of nodes."""
         return self._nodes
 
+    def get_node_addresses(self):
+        """Return the index of node names by node address."""
+        return self._node_addresses
+
     def get_virtual_addresses(self):
         """Return the index of virtual_addresses."""
         return self._virtual_addresses
@@ -0,0 +1,140 @@
+# coding=utf-8
+#
+# Copyright 2017 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""BIG-IP proxy of several partitions."""
+
+import logging
+
+from f5_cccl.bigip import BigIPProxy
+from f5_cccl.utils.mgmt import get_connection_stats
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _item_partition(item):
+    """Return the partition of an item of a retrieved collection."""
+    if isinstance(item, dict):
+        return item.get('partition')
+
+    return getattr(item, 'partition', None)
+
+
+class _PartitionSweep(BigIPProxy):
+    """Retrieves the collections of all partitions for their proxies."""
+
+    def __init__(self, bigip, proxies, **kwargs):
+        """Initialize the sweep of the proxies, a dict by partition."""
+        super(_PartitionSweep, self).__init__(bigip, None, **kwargs)
+        self._proxies = proxies
+
+    def _known_marker(self, key):
+        """Return the marker of a collection as every proxy holds it.
+
+        A proxy forgets the marker of a collection whose cache it
+        changed, or that it refreshed on its own.
+        """
+        marker = self._collection_markers.get(key)
+        for proxy in self._proxies.values():
+            # pylint: disable=protected-access
+            if proxy._collection_markers.get(key) != marker:
+                return None
+
+        return marker
+
+    def _record_markers(self, markers):
+        """Record the markers in the sweep and in every proxy."""
+        super(_PartitionSweep, self)._record_markers(markers)
+        for proxy in self._proxies.values():
+            # pylint: disable=protected-access
+            proxy._collection_markers.update(markers)
+
+    def _update_caches(self, fetched):
+        """Rebuild the caches of each proxy with its partition's items."""
+        partitioned = dict(
+            (partition, dict((key, list()) for key in fetched))
+            for partition in self._proxies
+        )
+        for (key, items) in fetched.items():
+            for item in items:
+                partition = _item_partition(item)
+                if partition in partitioned:
+                    partitioned[partition][key].append(item)
+
+        for (partition, proxy) in self._proxies.items():
+            # pylint: disable=protected-access
+            proxy._update_caches(partitioned[partition])
+
+
+class MultiPartitionBigIPProxy(object):
+    """MultiPartitionBigIPProxy class.
+
+    Manages the resources of several partitions of the specified BIG-IP
+
+    Each partition has a BigIPProxy of its own over the same management
+    root, and so over the same iControl REST session and connection
+    pool.  A refresh retrieves each collection once, without a
+    partition filter, and fans the items out to the caches of the
+    proxy of each partition.  The proxies can still be refreshed one
+    at a time.
+
+    Args:
+        bigip: Management Root of the BIG-IP
+        partitions: List of BIG-IP partitions to manage
+        kwargs: The BigIPProxy options of the partitions, they apply
+            to the refresh of all the partitions as well.
+    """
+
+    def __init__(self, bigip, partitions, **kwargs):
+        """Initialize the MultiPartitionBigIPProxy object."""
+        LOGGER.debug("MultiPartitionBigIPProxy.__init__()")
+
+        self._bigip = bigip
+        self._proxies = dict(
+            (partition, BigIPProxy(bigip, partition, **kwargs))
+            for partition in partitions
+        )
+        self._sweep = _PartitionSweep(bigip, self._proxies, **kwargs)
+
+    def mgmt_root(self):
+        """Return a reference to the proxied BIG-IP."""
+        return self._bigip
+
+    def get_partitions(self):
+        """Return the names of the managed partitions."""
+        return sorted(self._proxies)
+
+    def get_proxy(self, partition):
+        """Return the BigIPProxy of a managed partition."""
+        return self._proxies[partition]
+
+    def refresh(self, collections=None):
+        """Refresh the internal caches of all the partitions.
+
+        Args:
+            collections: Keys of the collections to refresh, e.g.
+            ['nodes', 'virtual_addresses'] (default: refresh all).
+        """
+        LOGGER.debug("Refreshing the BIG-IP cached state of %d "
+                     "partitions...", len(self._proxies))
+        self._sweep.refresh(collections)
+
+    def get_refresh_timings(self):
+        """Return the seconds spent retrieving each collection."""
+        return self._sweep.get_refresh_timings()
+
+    def get_connection_stats(self):
+        """Return the connection reuse statistics of the BIG-IP session."""
+        return get_connection_stats(self._bigip)
@@ -16,6 +16,7 @@
 # limitations under the License.
 #
 
+import json
 import logging
 
 from f5_cccl.resource import Resource
@@ -77,6 +78,17 @@ class ApplicationService(Resource):
                     return False
         return True
 
+    def _canonical(self):
+        """Sort the variables and tables, whose order is not compared."""
+        canonical = dict(self._data)
+        for key in ["variables", "tables"]:
+            canonical[key] = sorted(
+                [json.dumps(v, sort_keys=True) for v in self._data[key]])
+        if 'appsvcs_integration' in (self._data['template'] or ""):
+            # See the description workaround in __eq__.
+            canonical.pop('description', None)
+        return canonical
+
     def __hash__(self):  # pylint: disable=useless-super-delegation
         return super(ApplicationService, self).__hash__()
 
@@ -89,7 +101,10 @@ class ApplicationService(Resource):
         Args:
             bigip (f5.bigip.ManagementRoot): F5 SDK session object
         """
-        self._data['executeAction'] = 'definition'
+        # The resource is not modified, it is compared again on the next
+        # apply.
+        data = dict(data or self._data)
+        data['executeAction'] = 'definition'
         super(ApplicationService, self).update(bigip, data=data, modify=modify)
 
 
@@ -62,6 +62,10 @@ class InternalDataGroup(Resource):
                 return False
         return True
 
+    def _canonical(self):
+        """Get the data group properties that are compared."""
+        return dict((key, self._data.get(key)) for key in self.properties)
+
     def __hash__(self):  # pylint: disable=useless-super-delegation
         return super(InternalDataGroup, self).__hash__()
 
@@ -75,7 +79,10 @@ class InternalDataGroup(Resource):
         """Override of base class implemntation, required because data-groups
            are picky about what data can exist in the object when modifying.
         """
+        # The existing data group is handed over rather than copied.
+        (current, self._current) = (self._current, None)
         tmp_copy = deepcopy(self)
+        tmp_copy._current = current  # pylint: disable=protected-access
         tmp_copy.do_update(bigip, data, modify)
 
     def do_update(self, bigip, data, modify):
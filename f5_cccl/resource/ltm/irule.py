@@ -57,6 +57,10 @@ class IRule(Resource):
                 return False
         return True
 
+    def _canonical(self):
+        """Get the iRule properties that are compared."""
+        return dict((key, self._data.get(key)) for key in self.properties)
+
     def __hash__(self):  # pylint: disable=useless-super-delegation
         return super(IRule, self).__hash__()
 
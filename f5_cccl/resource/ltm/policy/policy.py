@@ -78,6 +78,20 @@ class Policy(Resource):
                 return False
         return True
 
+    def _canonical(self):
+        """Get the policy properties that are compared."""
+        return dict((key, self._data.get(key)) for key in self.properties)
+
+    def diff(self, resource):
+        """Get the changed fields, with the legacy flag.
+
+        Published policies can only be modified as legacy policies.
+        """
+        changes = super(Policy, self).diff(resource)
+        if changes:
+            changes['legacy'] = self._data['legacy']
+        return changes
+
     def __str__(self):
         return str(self._data)
 
@@ -89,7 +103,7 @@ class Policy(Resource):
         """
         new_rules = list()
         for index, rule in enumerate(rules):
-            rule['ordinal'] = index
+            rule = dict(rule, ordinal=index)
             new_rules.append(Rule(**rule).data)
 
         return new_rules
@@ -147,6 +147,15 @@ def test_compare_policy(policy_0):
     policy_2.data['name'] = "your_policy"
     assert not policy_0 == policy_2
 
+def test_policy_diff(policy_0):
+    policy_1 = deepcopy(policy_0)
+    assert policy_0.diff(policy_1) == {}
+
+    policy_1.data['strategy'] = "/Common/best-match"
+    assert policy_0.diff(policy_1) == {'strategy': "/Common/first-match",
+                                       'legacy': True}
+
+
 def test_compare_policy_w_dict(policy_0):
     data = {
         'name': "my_policy",
@@ -19,6 +19,9 @@ u"""This module provides class for managing resource configuration."""
 from __future__ import print_function
 
 import logging
+from operator import itemgetter
+
+from icontrol.exceptions import iControlUnexpectedHTTPError
 
 from f5_cccl.resource.ltm.pool_member import ApiPoolMember
 from f5_cccl.resource.ltm.pool_member import IcrPoolMember
@@ -42,17 +45,14 @@ class Pool(Resource):
         super(Pool, self).__init__(name, partition)
 
         for key, value in self.properties.items():
-            if key == "name" or key == "partition":
+            if key in ["name", "partition", "membersReference"]:
                 continue
             self._data[key] = properties.get(key, value)
 
-        self._data['membersReference'] = {
-            'isSubcollection': True, 'items': []}
-
+        # The membersReference is made from the members when the data
+        # is requested.
         if members:
             self.members = members
-            self._data['membersReference']['items'] = [
-                m.data for m in members]
         else:
             self.members = list()
 
@@ -67,7 +67,8 @@ class Pool(Resource):
             if key == 'membersReference' or key == 'monitor':
                 continue
 
-            if self._data[key] != other.data.get(key, None):
+            # pylint: disable=protected-access
+            if self._data[key] != other._data.get(key, None):
                 return False
 
         if len(self) != len(other):
@@ -84,12 +85,26 @@ class Pool(Resource):
             [m.rstrip() for m in self._data['monitor'].split(" and ")]
         )
 
+        # pylint: disable=protected-access
         other_monitor_list = sorted(
-            [m.rstrip() for m in other.data['monitor'].split(" and ")]
+            [m.rstrip() for m in other._data['monitor'].split(" and ")]
         )
 
         return self_monitor_list == other_monitor_list
 
+    def _canonical(self):
+        """Sort the members and the monitors, whose order is not compared."""
+        canonical = dict(
+            (key, self._data.get(key)) for key in self.properties
+            if key not in ['membersReference', 'monitor'])
+        canonical['monitor'] = sorted(
+            [m.rstrip() for m in self._data['monitor'].split(" and ")])
+        # pylint: disable=protected-access
+        canonical['members'] = sorted(
+            [m._canonical() for m in self.members], key=itemgetter(1, 0))
+
+        return canonical
+
     def __hash__(self):  # pylint: disable=useless-super-delegation
         return super(Pool, self).__hash__()
 
@@ -99,6 +114,113 @@ class Pool(Resource):
     def _uri_path(self, bigip):
         return bigip.tm.ltm.pools.pool
 
+    @property
+    def data(self):
+        u"""Get the internal data model for this pool, with its members."""
+        data = dict(self._data)
+        data['membersReference'] = {
+            'isSubcollection': True,
+            'items': [m.data for m in self.members]}
+        return data
+
+    def _member_changes(self, current):
+        u"""Compare the members with those of the existing pool.
+
+        Returns:
+            A tuple of the lists of added, removed and modified members.
+        """
+        current = dict(((m.partition, m.name), m) for m in current.members)
+        desired = dict(((m.partition, m.name), m) for m in self.members)
+
+        added = [m for (key, m) in desired.items() if key not in current]
+        removed = [m for (key, m) in current.items() if key not in desired]
+        modified = [
+            m for (key, m) in desired.items()
+            if key in current and m != current[key]
+        ]
+
+        return (added, removed, modified)
+
+    def _property_changes(self, current):
+        u"""Return the pool properties that differ from the existing pool."""
+        changes = dict()
+        for key in self.properties:
+            if key in ['name', 'partition', 'membersReference', 'monitor']:
+                continue
+            # pylint: disable=protected-access
+            if self._data[key] != current._data.get(key, None):
+                changes[key] = self._data[key]
+
+        if not self._monitors_equal(current):
+            changes['monitor'] = self._data['monitor']
+
+        return changes
+
+    def _update_members(self, bigip, current):
+        u"""Update the pool by deploying only what changed.
+
+        The changed pool properties are patched, and members are added,
+        removed and modified through the pool's members subcollection.
+        When more than half of the members change, the pool is patched
+        with the whole members list instead.
+
+        Returns:
+            True if the update was deployed.
+        """
+        (added, removed, modified) = self._member_changes(current)
+        changes = self._property_changes(current)
+        member_tasks = len(added) + len(removed) + len(modified)
+        if member_tasks > max(1, len(self.members) // 2):
+            return False
+
+        LOGGER.debug(
+            "Updating pool /%s/%s: %d properties, %d added, %d removed "
+            "and %d modified members.", self.partition, self.name,
+            len(changes), len(added), len(removed), len(modified))
+
+        # pylint: disable=protected-access
+        session = bigip._meta_data['icr_session']
+        uri = self._direct_uri(bigip)
+        members_uri = "{}/members".format(uri)
+        if changes:
+            session.patch(uri, json=changes)
+        for member in removed:
+            session.delete("{}/~{}~{}".format(
+                members_uri, member.partition, member.name))
+        for member in added:
+            session.post(members_uri, json=member.data)
+        for member in modified:
+            session.patch("{}/~{}~{}".format(
+                members_uri, member.partition, member.name),
+                          json=member.data)
+
+        return True
+
+    def update(self, bigip, data=None, modify=False):
+        u"""Update the pool on the BIG-IP.
+
+        When the existing pool and its location are known, only the
+        changes are deployed.  If that fails, for instance because the
+        pool changed in the meantime, the whole pool is updated.  The
+        location is only known with the direct_updates of the
+        BigIPProxy, otherwise the pool is loaded and updated whole.
+        """
+        # A retried update deploys the whole pool.
+        current = self._current
+        self._current = None
+
+        if data is None and current is not None and self.has_location():
+            try:
+                if self._update_members(bigip, current):
+                    return
+            except iControlUnexpectedHTTPError as err:
+                LOGGER.warning(
+                    "Failed to update the changes of pool /%s/%s, "
+                    "updating the whole pool: %s",
+                    self.partition, self.name, err)
+
+        super(Pool, self).update(bigip, data=data, modify=modify)
+
 
 class ApiPool(Pool):
     """Parse the CCCL input to create the canonical Pool."""
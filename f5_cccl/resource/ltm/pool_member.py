@@ -32,7 +32,14 @@ class PoolMember(Resource):
 
     Encapsulate an PoolMember configuration object as defined by BIG-IP
     into a dictionary
+
+    Pools can have many thousands of members, so a member keeps its
+    properties in a tuple, in the order of the fields class attribute,
+    and has no per-instance __dict__.  The data dictionary is built
+    when it is requested.
     """
+    __slots__ = ('_pool',)
+
     # The property names class attribute defines the names of the
     # properties that we wish to compare.
     properties = dict(name=None,
@@ -42,6 +49,10 @@ class PoolMember(Resource):
                       priorityGroup=0,
                       session="user-enabled",
                       description=None)
+    fields = ('name', 'partition', 'ratio', 'connectionLimit',
+              'priorityGroup', 'session', 'description')
+    defaults = tuple(zip(fields[2:], map(properties.get, fields[2:])))
+    session_index = fields.index('session')
     member_name_re = re.compile("^(.*:?)%(\\d+)[\\.|\\:](\\d+)$")
 
     def __init__(self, name, partition, pool=None, **properties):
@@ -50,10 +61,8 @@ class PoolMember(Resource):
         super(PoolMember, self).__init__(name, partition)
 
         self._pool = pool
-        for key, value in self.properties.items():
-            if key == 'name' or key == 'partition':
-                continue
-            self._data[key] = properties.get(key, value)
+        self._data = (name, partition) + tuple([
+            properties.get(key, default) for (key, default) in self.defaults])
 
     def __hash__(self):  # pylint: disable=useless-super-delegation
         return super(PoolMember, self).__hash__()
@@ -67,10 +76,11 @@ class PoolMember(Resource):
         if not isinstance(other, PoolMember):
             return False
 
-        for key in self.properties:
-            if self._data[key] != other.data.get(key, None):
+        # pylint: disable=protected-access
+        for (index, value) in enumerate(self._data):
+            if value != other._data[index]:
 
-                if key == "session":
+                if index == self.session_index:
                     if self._check_states(other):
                         continue
 
@@ -78,11 +88,28 @@ class PoolMember(Resource):
 
         return True
 
+    def _canonical(self):
+        """Normalize the monitored session states.
+
+        A monitor-enabled member is equal to a user-enabled one and a
+        monitor-disabled member to a user-disabled one.
+        """
+        session = self._data[self.session_index]
+        if session and "monitor" in session:
+            if "disabled" in session:
+                session = "user-disabled"
+            else:
+                session = "user-enabled"
+
+        index = self.session_index
+        return self._data[:index] + (session,) + self._data[index + 1:]
+
     def _check_states(self, other):
         """Compare desired admin state to operational state."""
-        other_session = other.data['session']
+        # pylint: disable=protected-access
+        other_session = other._data[self.session_index]
 
-        return ("monitor" in self.data['session'] or
+        return ("monitor" in self._data[self.session_index] or
                 "monitor" in other_session)
 
     def _strip_route_domain_zero(self, name):
@@ -113,16 +140,28 @@ class PoolMember(Resource):
 
         This handles the '%' route domain marker.
         """
-        return urlquote(self._data['name'])
+        return urlquote(self._data[0])
+
+    @property
+    def partition(self):
+        u"""Get the partition for this member."""
+        return self._data[1]
+
+    @property
+    def data(self):
+        u"""Get a dictionary of the member properties."""
+        return dict(zip(self.fields, self._data))
 
 
 class IcrPoolMember(PoolMember):
     """PoolMember instantiated from iControl REST pool member object."""
-    pass
+    __slots__ = ()
 
 
 class ApiPoolMember(PoolMember):
     """PoolMember instantiated from F5 CCCL schema input."""
+    __slots__ = ()
+
     def __init__(self, name, partition, pool=None, **properties):
         u"""Create a PoolMember instance from CCCL PoolMemberType.
 
@@ -293,6 +293,9 @@ def test_update_app_service(bigip, mock_resource):
 
     # verify that 'update' was called with expected dict
     assert Resource.update.called
+    assert Resource.update.call_args[1]['data']['executeAction'] == \
+        'definition'
+    assert 'executeAction' not in appsvc.data
 
 
 def test_hash():
@@ -347,9 +350,11 @@ def test_eq():
     assert appsvc2
     assert appsvc3
     assert appsvc1 == appsvc2
+    assert appsvc1.digest == appsvc2.digest
 
     # not equal
     assert appsvc1 != appsvc3
+    assert appsvc1.differs(appsvc3)
 
     # different objects
     assert appsvc1 != pool 
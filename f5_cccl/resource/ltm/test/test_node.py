@@ -106,9 +106,14 @@ def test_eq():
     assert node2
     assert node != node2
 
+    # The equality depends on the state of the other node only.
+    assert node.digest is None
+    assert node.differs(node2)
+
     node2.data['state'] = 'up'
     node2.data['session'] = 'user-enabled'
     assert node == node2
+    assert not node.differs(node2)
 
     node2.data['state'] = 'unchecked'
     node2.data['session'] = 'monitor-enabled'
@@ -20,6 +20,7 @@ from pprint import pprint as pp
 
 from f5_cccl.resource.ltm.pool import *
 
+from icontrol.exceptions import iControlUnexpectedHTTPError
 from mock import MagicMock
 import pytest
 
@@ -215,6 +216,46 @@ def test_compare_bigip_cccl_pools(cccl_pool1, bigip_pool0):
     assert bigip_pool == cccl_pool
 
 
+def test_pool_digest(cccl_pool1, bigip_pool0):
+    bigip_pool = IcrPool(**bigip_pool0)
+    cccl_pool = ApiPool(partition="Common", **cccl_pool1)
+
+    assert cccl_pool.digest == bigip_pool.digest
+    assert not cccl_pool.differs(bigip_pool)
+
+    # The order of the monitors and members is not compared.
+    cfg = _pool_cfg([1, 2])
+    cfg['monitors'] = ["/Common/http", "/Common/tcp"]
+    pool = ApiPool(partition="Common", **cfg)
+    cfg['monitors'].reverse()
+    cfg['members'].reverse()
+    reordered = ApiPool(partition="Common", **cfg)
+    assert pool.digest == reordered.digest
+
+    cfg['members'][0]['ratio'] = 2
+    changed = ApiPool(partition="Common", **cfg)
+    assert pool.digest != changed.digest
+    assert pool.differs(changed)
+
+
+def test_pool_digest_member_sessions():
+    pools = dict()
+    for session in ["user-enabled", "monitor-enabled", "user-disabled"]:
+        pools[session] = IcrPool(
+            name="pool1", partition="Common",
+            membersReference={'items': [
+                {'name': "172.16.0.1:80", 'partition': "Common",
+                 'session': session}]})
+
+    # A monitored member is enabled as desired.
+    assert pools["user-enabled"].digest == pools["monitor-enabled"].digest
+
+    # The digests differ, but the pools are still compared equal.
+    assert pools["user-disabled"].digest != pools["monitor-enabled"].digest
+    assert not pools["user-disabled"].differs(pools["monitor-enabled"])
+    assert pools["user-disabled"].differs(pools["user-enabled"])
+
+
 def test_create_bigip_pool_no_members(bigip_pool1):
 
     bigip_pool = IcrPool(**bigip_pool1)
@@ -273,3 +314,122 @@ def test_get_monitors(bigip):
 
     monitors = ["/Common/my_tcp", "/Common/http"]
     assert pool._get_monitors(monitors) == "/Common/http and /Common/my_tcp"
+
+
+def _located_pools(bigip, desired_cfg, existing_cfg):
+    """Create a desired pool that updates the existing one."""
+    bigip._meta_data = {'uri': "https://1.2.3.4:443/mgmt/",
+                        'icr_session': MagicMock()}
+    existing = ApiPool(partition="Common", **existing_cfg)
+    existing.set_location(
+        "https://localhost/mgmt/tm/ltm/pool/~Common~pool1?ver=12.1.0")
+    desired = ApiPool(partition="Common", **desired_cfg)
+    desired.copy_location(existing)
+
+    return (desired, bigip._meta_data['icr_session'])
+
+
+def _pool_cfg(addresses):
+    """Create the configuration of a pool with members at the addresses."""
+    return {"name": "pool1",
+            "members": [
+                {"address": "172.16.0.{}".format(address), "port": 8080}
+                for address in addresses],
+            "monitors": ["/Common/http"]}
+
+
+def test_update_pool_member_changes(bigip):
+    """Test that only the changed members of a pool are updated."""
+    (pool, session) = _located_pools(
+        bigip, _pool_cfg(range(1, 7)), _pool_cfg(range(0, 6)))
+    pool_uri = "https://1.2.3.4:443/mgmt/tm/ltm/pool/~Common~pool1"
+
+    pool.update(bigip)
+
+    session.delete.assert_called_once_with(
+        pool_uri + "/members/~Common~172.16.0.0%3A8080")
+    session.post.assert_called_once()
+    args, kwargs = session.post.call_args
+    assert args == (pool_uri + "/members",)
+    assert kwargs['json']['name'] == "172.16.0.6:8080"
+    session.patch.assert_not_called()
+    session.put.assert_not_called()
+    bigip.tm.ltm.pools.pool.load.assert_not_called()
+
+
+def test_update_pool_member_changes_unlocated(bigip):
+    """Test that a pool of unknown location is loaded and updated whole."""
+    (pool, session) = _located_pools(
+        bigip, _pool_cfg(range(1, 7)), _pool_cfg(range(0, 6)))
+    pool.set_location(None)
+    bigip.tm.ltm.pools.pool.load.return_value = bigip.tm.ltm.pools.pool.obj
+
+    pool.update(bigip)
+
+    session.delete.assert_not_called()
+    session.post.assert_not_called()
+    session.put.assert_not_called()
+    bigip.tm.ltm.pools.pool.load.assert_called_once()
+    args, kwargs = bigip.tm.ltm.pools.pool.obj.update.call_args
+    assert len(kwargs['membersReference']['items']) == 6
+
+
+def test_update_pool_property_changes(bigip, cccl_pool1):
+    """Test that only the changed properties of a pool are patched."""
+    desired_cfg = dict(cccl_pool1)
+    desired_cfg['description'] = "changed"
+    desired_cfg['monitors'] = ["/Common/tcp"]
+    member = dict(cccl_pool1['members'][0])
+    member['ratio'] = 5
+    desired_cfg['members'] = [member, cccl_pool1['members'][1]]
+    (pool, session) = _located_pools(bigip, desired_cfg, cccl_pool1)
+    pool_uri = "https://1.2.3.4:443/mgmt/tm/ltm/pool/~Common~pool1"
+
+    pool.update(bigip)
+
+    assert session.patch.call_args_list[0] == ((pool_uri,), {
+        'json': {'description': "changed", 'monitor': "/Common/tcp"}})
+    args, kwargs = session.patch.call_args_list[1]
+    assert args == (pool_uri + "/members/~Common~172.16.0.100%3A8080",)
+    assert kwargs['json']['ratio'] == 5
+    session.post.assert_not_called()
+    session.delete.assert_not_called()
+
+
+def test_update_pool_many_member_changes(bigip, cccl_pool1, cccl_pool2):
+    """Test that the whole pool is replaced when most members changed."""
+    desired_cfg = dict(cccl_pool2)
+    desired_cfg['name'] = "pool1"
+    (pool, session) = _located_pools(bigip, desired_cfg, cccl_pool1)
+
+    pool.update(bigip)
+
+    session.patch.assert_not_called()
+    session.put.assert_called_once()
+    args, kwargs = session.put.call_args
+    assert len(kwargs['json']['membersReference']['items']) == 2
+    session.post.assert_not_called()
+    session.delete.assert_not_called()
+
+
+def test_update_pool_member_changes_failed(bigip):
+    """Test that the whole pool is updated if updating a member fails."""
+    (pool, session) = _located_pools(
+        bigip, _pool_cfg(range(1, 7)), _pool_cfg(range(0, 6)))
+    response = MagicMock()
+    response.status_code = 404
+    session.delete.side_effect = iControlUnexpectedHTTPError(
+        response=response)
+
+    pool.update(bigip)
+
+    session.post.assert_not_called()
+    session.put.assert_called_once()
+    args, kwargs = session.put.call_args
+    assert len(kwargs['json']['membersReference']['items']) == 6
+
+    # A retry updates the whole pool as well.
+    session.reset_mock()
+    pool.update(bigip)
+    session.put.assert_called_once()
+    session.delete.assert_not_called()
@@ -151,3 +151,46 @@ def test_create_pool_member_with_rd_ipv6(pool, pool_member_with_rd_ipv6):
     # Test data
     assert member.data
     assert member.data['name'] == "2001:0db8:3c4d:0015:0000:0000:abcd:ef12.80"
+
+
+def test_pool_member_compact(pool, bigip_members):
+    """Test the properties of a member are kept without a __dict__."""
+    member = IcrPoolMember(pool=pool, **bigip_members[0])
+
+    assert not hasattr(member, '__dict__')
+    with pytest.raises(AttributeError):
+        member.address = "192.168.200.2"
+
+    assert member.data == {
+        'name': "192.168.200.2:80",
+        'partition': "Common",
+        'ratio': 1,
+        'connectionLimit': 0,
+        'priorityGroup': 0,
+        'session': "user-enabled",
+        'description': None
+    }
+    assert member.name == "192.168.200.2%3A80"
+    assert member.partition == "Common"
+
+    # The data is a copy.
+    member.data['ratio'] = 2
+    assert member.data['ratio'] == 1
+
+
+def test_compare_pool_members(pool, bigip_members):
+    """Test the comparison of the member properties."""
+    member_cfg = dict(bigip_members[0])
+    member = IcrPoolMember(pool=pool, **member_cfg)
+
+    assert member == IcrPoolMember(**member_cfg)
+    assert member != dict(member_cfg)
+    assert member != IcrPoolMember(**dict(member_cfg, ratio=2))
+    assert member != IcrPoolMember(**dict(member_cfg, partition="Test"))
+    assert member != IcrPoolMember(**dict(member_cfg, session="user-disabled"))
+    assert len(set([member, IcrPoolMember(**member_cfg)])) == 1
+
+    # Monitor states match any admin state.
+    monitored = IcrPoolMember(**dict(member_cfg, session="monitor-enabled"))
+    assert member == monitored
+    assert monitored == member
@@ -277,6 +277,27 @@ def test_ipv6_destination():
     assert not destination[3]
 
 
+def test_parsed_destination():
+    """Test the destination is parsed once into its parts."""
+    cfg = copy(cfg_test)
+    cfg['destination'] = "/Test/1.2.3.4%2:80"
+    virtual = VirtualServer(**cfg)
+
+    destination = virtual.destination
+    assert destination is virtual.destination
+    assert destination.destination == "/Test/1.2.3.4%2:80"
+    assert destination.partition == "Test"
+    assert destination.address == "1.2.3.4%2"
+    assert destination.port == "80"
+    assert destination.route_domain == 2
+
+    assert VirtualServer(**cfg_test).destination.route_domain is None
+
+    # A virtual server created without its properties.
+    destination = IcrVirtualServer("Virtual-1", "Test").destination
+    assert destination == (None, None, None, None, None)
+
+
 cfg_test_api_virtual = {
     'name': 'Virtual-1',
     'partition': 'my_partition',
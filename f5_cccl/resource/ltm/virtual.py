@@ -18,6 +18,7 @@
 
 from __future__ import print_function
 
+from collections import namedtuple
 from copy import copy
 import logging
 from operator import itemgetter
@@ -29,6 +30,14 @@ from f5_cccl.resource.ltm.profile import Profile
 
 LOGGER = logging.getLogger(__name__)
 
+# The parts of a virtual server destination, e.g. /Test/1.2.3.4%2:80 is
+# ('/Test/1.2.3.4%2:80', 'Test', '1.2.3.4%2', '80', 2).  The address is
+# the name of the virtual address, route_domain is None if the address
+# has none.
+Destination = namedtuple(
+    'Destination',
+    ['destination', 'partition', 'address', 'port', 'route_domain'])
+
 
 class VirtualServer(Resource):
     """Virtual Server class for managing configuration on BIG-IP."""
@@ -75,24 +84,41 @@ class VirtualServer(Resource):
                 if value is not None:
                     self._data[key] = value
 
+        self._destination = self._parse_destination(
+            self._data.get('destination'))
+
     @property
     def destination(self):
         """Return the destination of the virtual server.
 
+        The destination is parsed when the virtual server is created.
+
         Return:
-        (destination, partition, name, port)
+        Destination(destination, partition, address, port, route_domain)
         """
-        match = None
-        for pattern in [self.ipv4_dest_pattern, self.ipv6_dest_pattern]:
-            match = pattern.match(self._data['destination'])
+        return self._destination
+
+    @classmethod
+    def _parse_destination(cls, destination):
+        """Split a destination into its parts."""
+        if destination is None:
+            return Destination(None, None, None, None, None)
+
+        for pattern in [cls.ipv4_dest_pattern, cls.ipv6_dest_pattern]:
+            match = pattern.match(destination)
             if match:
-                destination = match.group(0, 1, 2, 3)
                 break
         else:
             print("unexpected destination address format")
-            destination = (self._data['destination'], None, None, None)
+            return Destination(destination, None, None, None, None)
+
+        (partition, address, port) = match.group(1, 2, 3)
+        route_domain = None
+        if '%' in address:
+            route_domain = int(address.rsplit('%', 1)[1])
 
-        return destination
+        return Destination(destination, partition, address, port,
+                           route_domain)
 
     def __eq__(self, other):
         if not isinstance(other, VirtualServer):
@@ -18,6 +18,8 @@ u"""This module provides class for managing resource configuration."""
 #
 
 import copy
+import hashlib
+import json
 import logging
 
 import f5_cccl.exceptions as cccl_exc
@@ -54,6 +56,10 @@ class Resource(object):
 
     """
 
+    # Subclasses that are instantiated in large numbers can declare
+    # their own __slots__ to do without a per-instance __dict__.
+    __slots__ = ('_data', '_self_link', '_digest', '_current')
+
     @classmethod
     def classname(cls):
         """Return the class name of the resource."""
@@ -75,6 +81,15 @@ class Resource(object):
         self._data['name'] = name
         self._data['partition'] = partition
 
+        # Where the resource lives on the BIG-IP, if known.
+        self._self_link = None
+
+        # The resource as it exists on the BIG-IP, when this one updates it.
+        self._current = None
+
+        # The digest of the canonical form, computed when first needed.
+        self._digest = None
+
     def __eq__(self, resource):
         u"""Compare two resources for equality.
 
@@ -84,11 +99,30 @@ class Resource(object):
             True if equal
             False otherwise
         """
-        return self._data == resource.data
+        return self.data == resource.data
 
     def __ne__(self, resource):
         return not self.__eq__(resource)
 
+    def differs(self, resource):
+        u"""Check whether two resources differ, by digest first.
+
+        The digests tell most unchanged resources apart from changed
+        ones without walking their data.  When the digests differ, the
+        resources are compared field by field, since __eq__ also treats
+        some different values as equal, e.g. pool member session states.
+
+        Args:
+            resouce (Resource): The resource to compare
+        Return:
+            True if the resources are not equal
+            False otherwise
+        """
+        digest = self.digest
+        if digest is not None and digest == resource.digest:
+            return False
+        return self.__ne__(resource)
+
     def __hash__(self):
         return hash((self.name, self.partition))
 
@@ -96,7 +130,21 @@ class Resource(object):
         return self.full_path() < resource.full_path()
 
     def __str__(self):
-        return str(self._data)
+        return str(self.data)
+
+    def diff(self, resource):
+        u"""Get the top-level fields that differ from another resource.
+
+        Args:
+            resource (Resource): The resource to compare, e.g. as it
+                exists on the BIG-IP.
+        Return:
+            A dict of the fields whose values differ, with the values
+            of this resource.
+        """
+        other = resource.data
+        return dict((key, value) for (key, value) in self.data.items()
+                    if value != other.get(key))
 
     def create(self, bigip):
         u"""Create resource on a BIG-IP system.
@@ -118,7 +166,7 @@ class Resource(object):
         LOGGER.info("Creating %s: /%s/%s",
                     self.classname(), self.partition, self.name)
         try:
-            obj = self._uri_path(bigip).create(**self._data)
+            obj = self._uri_path(bigip).create(**self.data)
             return obj
         except iControlUnexpectedHTTPError as err:
             self._handle_http_error(err)
@@ -161,6 +209,9 @@ class Resource(object):
         defined in the model object.
         The internal data model is applied to the BIG-IP
 
+        When the resource as it exists on the BIG-IP is known, only the
+        fields that changed are modified.
+
         Args:
             bigip: BigIP instance to use for updating resource.
             data: Applies mostly for 'patching' or modify, but contains targets
@@ -177,8 +228,20 @@ class Resource(object):
         """
         LOGGER.info("Updating %s: /%s/%s",
                     self.classname(), self.partition, self.name)
+        # A retried update deploys the whole resource.
+        current = self._current
+        self._current = None
+
+        if not data and current is not None:
+            data = self.diff(current)
+            LOGGER.debug("Changed fields of %s /%s/%s: %s",
+                         self.classname(), self.partition, self.name, data)
+            modify = bool(data)
         if not data:
-            data = self._data
+            data = self.data
+        method = 'patch' if modify else 'put'
+        if self._direct_request(bigip, method, json=copy.copy(data)):
+            return
         try:
             obj = self._uri_path(bigip).load(
                 name=urlquote(self.name),
@@ -211,6 +274,9 @@ class Resource(object):
         """
         LOGGER.info("Deleting %s: /%s/%s",
                     self.classname(), self.partition, self.name)
+        if self._direct_request(bigip, 'delete'):
+            self.set_location(None)
+            return
         try:
             obj = self._uri_path(bigip).load(
                 name=urlquote(self.name),
@@ -226,6 +292,97 @@ class Resource(object):
             LOGGER.error("Delete FAILED: /%s/%s", self.partition, self.name)
             raise cccl_exc.F5CcclResourceDeleteError(str(err))
 
+    def set_location(self, self_link):
+        u"""Record where the resource lives on the BIG-IP.
+
+        When it is known, update and delete send a single request to the
+        resource's URI instead of loading the resource first.
+
+        Args:
+            self_link (string): The selfLink returned by the BIG-IP.
+        """
+        self._self_link = self_link
+
+    def copy_location(self, resource):
+        u"""Record the location of another representation of the resource.
+
+        The resource is kept so that an update only deploys what changed.
+
+        Args:
+            resource (Resource): The resource as retrieved from the BIG-IP.
+        """
+        self.set_location(resource.self_link)
+        self._current = resource
+
+    def forget_location(self):
+        u"""Forget the location and the retrieved state of the resource.
+
+        They are recorded again by copy_location when the resource is
+        deployed.
+        """
+        self.set_location(None)
+        self._current = None
+
+    def has_location(self):
+        u"""Check whether the location of the resource is known."""
+        return self._self_link is not None
+
+    def _direct_uri(self, bigip):
+        u"""Get the URI of the resource from its selfLink.
+
+        The selfLink names the BIG-IP as 'localhost', so its path is
+        joined to the URI of the management root.
+
+        Returns: the URI, or None if the location is not known.
+        """
+        if not self.has_location():
+            return None
+
+        # pylint: disable=protected-access
+        path = self._self_link.split('/mgmt/', 1)[-1].split('?', 1)[0]
+        return bigip._meta_data['uri'] + path
+
+    def _direct_request(self, bigip, method, **kwargs):
+        u"""Send a request to the known URI of the resource.
+
+        The resource is not checked for changes made on the BIG-IP since
+        it was retrieved: iControl REST takes no precondition, and
+        reading the resource back costs the request that is saved.  Only
+        a resource that is not found at its URI is loaded first.  A
+        resource changed on the BIG-IP in between is replaced, or
+        modified from the retrieved state; the next refresh finds where
+        it differs from the desired resource and that is deployed again.
+
+        Args:
+            bigip (f5.bigip.ManagementRoot): F5 SDK session object
+            method (string): the iControl REST session method to call
+
+        Returns:
+            True if the request succeeded.  False if the location of the
+            resource is not known or the resource was not found there,
+            in which case the caller should load the resource first.
+
+        Raises:
+            F5CcclError: the request failed for any other reason.
+        """
+        uri = self._direct_uri(bigip)
+        if uri is None:
+            return False
+
+        # pylint: disable=protected-access
+        session = bigip._meta_data['icr_session']
+        try:
+            getattr(session, method)(uri, **kwargs)
+        except iControlUnexpectedHTTPError as err:
+            if err.response.status_code != 404:
+                self._handle_http_error(err)
+            LOGGER.debug("%s /%s/%s not found at %s, loading it...",
+                         self.classname(), self.partition, self.name, uri)
+            self.set_location(None)
+            return False
+
+        return True
+
     @property
     def name(self):
         u"""Get the name for this resource."""
@@ -241,6 +398,36 @@ class Resource(object):
         u"""Get the internal data model for this resource."""
         return self._data
 
+    @property
+    def self_link(self):
+        u"""Get the selfLink of this resource, or None if not known."""
+        return self._self_link
+
+    @property
+    def digest(self):
+        u"""Get the digest of the canonical form of this resource.
+
+        Resources with the same digest are equal.  The digest is None
+        for resources that have no canonical form.
+        """
+        if self._digest is None:
+            canonical = self._canonical()
+            if canonical is not None:
+                text = json.dumps(canonical, sort_keys=True,
+                                  separators=(',', ':'), default=str)
+                self._digest = hashlib.sha1(text.encode('utf-8')).digest()
+        return self._digest
+
+    def _canonical(self):
+        u"""Get the normalized content that the digest is computed from.
+
+        Resources with equal canonical forms must compare equal, so a
+        subclass that overrides __eq__ normalizes its data the same way,
+        or returns None if its equality cannot be expressed this way.
+        The data must not change once the digest has been computed.
+        """
+        return self.data
+
     def full_path(self):
         u"""Concatenate the partition and name to form fullPath."""
         return "/{}/{}".format(self.partition, self.name)
@@ -20,6 +20,7 @@ from f5_cccl.resource import Resource
 
 from icontrol.exceptions import iControlUnexpectedHTTPError
 from mock import MagicMock
+from mock import patch
 import pytest
 
 
@@ -142,6 +143,25 @@ def test_resource_not_equal():
     assert not res1 == res2
 
 
+def test_resource_digest():
+    u"""Test the digest comparison of Resources."""
+    data = resource_data()
+
+    res1 = Resource(**data)
+    res2 = Resource(**data)
+    res3 = Resource(name="other_resource", partition="Common")
+
+    assert res1.digest == res2.digest
+    assert res1.digest != res3.digest
+    assert not res1.differs(res2)
+    assert res1.differs(res3)
+
+    # The digest is computed once.
+    with patch.object(Resource, '_canonical') as canonical:
+        assert res1.digest == res2.digest
+        assert not canonical.called
+
+
 def test_resource_less_than():
     u"""Test the __eq__ operation for Resouces."""
     data = resource_data()
@@ -507,3 +527,164 @@ def test_delete_subresource_icontrol_4XX_exception(bigip, response):
         obj = subres.delete(bigip)
 
         assert not obj
+
+
+def _locate(bigip, subres):
+    """Record a location for the resource on the mock BIG-IP."""
+    bigip._meta_data = {'uri': "https://1.2.3.4:443/mgmt/",
+                        'icr_session': MagicMock()}
+    subres.set_location(
+        "https://localhost/mgmt/tm/ltm/subresource/"
+        "~Common~test_resource?ver=12.1.0")
+    return bigip._meta_data['icr_session']
+
+
+def test_update_subresource_direct(bigip):
+    u"""Test that a located resource is replaced without loading it."""
+    data = resource_data()
+    subres = SubResource(name=data['name'], partition=data['partition'])
+    session = _locate(bigip, subres)
+
+    subres.update(bigip)
+
+    session.put.assert_called_once_with(
+        "https://1.2.3.4:443/mgmt/tm/ltm/subresource/~Common~test_resource",
+        json=subres.data)
+    session.patch.assert_not_called()
+    bigip.tm.ltm.subresources.subresource.load.assert_not_called()
+
+    # A modify only patches the given fields.
+    subres.update(bigip, data={'description': "new"}, modify=True)
+    session.patch.assert_called_once_with(
+        "https://1.2.3.4:443/mgmt/tm/ltm/subresource/~Common~test_resource",
+        json={'description': "new"})
+
+
+def test_update_subresource_direct_not_found(bigip, response):
+    u"""Test that update loads the resource if its location is stale."""
+    data = resource_data()
+    subres = SubResource(name=data['name'], partition=data['partition'])
+    session = _locate(bigip, subres)
+    response.status_code = 404
+    session.put.side_effect = iControlUnexpectedHTTPError(
+        response=response)
+    bigip.tm.ltm.subresources.subresource.load.return_value = (
+        bigip.tm.ltm.subresources.subresource.obj
+    )
+
+    subres.update(bigip)
+
+    session.put.assert_called_once()
+    assert not subres.has_location()
+    bigip.tm.ltm.subresources.subresource.load.assert_called()
+    bigip.tm.ltm.subresources.subresource.obj.update.assert_called()
+
+
+def test_update_subresource_direct_exception(bigip, response):
+    u"""Test that errors of a direct update are reported."""
+    data = resource_data()
+    subres = SubResource(name=data['name'], partition=data['partition'])
+    session = _locate(bigip, subres)
+    response.status_code = 400
+    session.put.side_effect = iControlUnexpectedHTTPError(
+        response=response)
+
+    with pytest.raises(cccl_exc.F5CcclResourceRequestError):
+        subres.update(bigip)
+
+    bigip.tm.ltm.subresources.subresource.load.assert_not_called()
+
+
+def test_update_subresource_unknown_location(bigip):
+    u"""Test that a resource of unknown location is loaded first."""
+    data = resource_data()
+    subres = SubResource(name=data['name'], partition=data['partition'])
+    session = _locate(bigip, subres)
+    subres.set_location(None)
+
+    subres.update(bigip)
+
+    session.put.assert_not_called()
+    bigip.tm.ltm.subresources.subresource.load.assert_called()
+
+
+def test_delete_subresource_direct(bigip):
+    u"""Test that a located resource is deleted without loading it."""
+    data = resource_data()
+    subres = SubResource(name=data['name'], partition=data['partition'])
+    session = _locate(bigip, subres)
+
+    subres.delete(bigip)
+
+    session.delete.assert_called_once_with(
+        "https://1.2.3.4:443/mgmt/tm/ltm/subresource/~Common~test_resource")
+    bigip.tm.ltm.subresources.subresource.load.assert_not_called()
+    assert not subres.has_location()
+
+
+def test_copy_location():
+    u"""Test that the location is copied from another resource."""
+    data = resource_data()
+    existing = SubResource(name=data['name'], partition=data['partition'])
+    existing.set_location("https://localhost/mgmt/tm/x/~Common~y")
+    desired = SubResource(name=data['name'], partition=data['partition'])
+
+    desired.copy_location(existing)
+
+    assert desired.self_link == existing.self_link
+
+
+def test_resource_diff():
+    u"""Test that the differing top-level fields are returned."""
+    data = resource_data()
+    existing = Resource(**data)
+    existing._data.update(description="old", ratio=1, extra="existing")
+    desired = Resource(**data)
+    desired._data.update(description="new", ratio=1, monitor="http")
+
+    assert desired.diff(existing) == {'description': "new",
+                                      'monitor': "http"}
+    assert desired.diff(desired) == {}
+
+
+def test_update_subresource_changes(bigip):
+    u"""Test that only the changed fields of a resource are patched."""
+    data = resource_data()
+    existing = SubResource(name=data['name'], partition=data['partition'])
+    existing._data['description'] = "old"
+    existing._data['ratio'] = 1
+    session = _locate(bigip, existing)
+    desired = SubResource(name=data['name'], partition=data['partition'])
+    desired._data['description'] = "new"
+    desired._data['ratio'] = 1
+    desired.copy_location(existing)
+
+    desired.update(bigip)
+
+    session.patch.assert_called_once_with(
+        "https://1.2.3.4:443/mgmt/tm/ltm/subresource/~Common~test_resource",
+        json={'description': "new"})
+
+    # A retried update deploys the whole resource.
+    desired.update(bigip)
+    session.put.assert_called_once_with(
+        "https://1.2.3.4:443/mgmt/tm/ltm/subresource/~Common~test_resource",
+        json=desired.data)
+
+
+def test_update_subresource_changes_loaded(bigip):
+    u"""Test that the changes are modified when the resource is loaded."""
+    data = resource_data()
+    existing = SubResource(name=data['name'], partition=data['partition'])
+    desired = SubResource(name=data['name'], partition=data['partition'])
+    desired._data['description'] = "new"
+    desired.copy_location(existing)
+    bigip.tm.ltm.subresources.subresource.load.return_value = (
+        bigip.tm.ltm.subresources.subresource.obj
+    )
+
+    desired.update(bigip)
+
+    obj = bigip.tm.ltm.subresources.subresource.obj
+    obj.modify.assert_called_once_with(description="new")
+    obj.update.assert_not_called()
@@ -19,9 +19,12 @@
 from __future__ import print_function
 
 
+from collections import OrderedDict
+import json
 import logging
 
 import f5_cccl.exceptions as cccl_error
+from f5_cccl.service.validation import STRING_TYPES
 from f5_cccl.resource.ltm.monitor.http_monitor import ApiHTTPMonitor
 from f5_cccl.resource.ltm.monitor.https_monitor import ApiHTTPSMonitor
 from f5_cccl.resource.ltm.monitor.icmp_monitor import ApiICMPMonitor
@@ -37,13 +40,73 @@ from f5_cccl.resource.ltm.internal_data_group import ApiInternalDataGroup
 
 LOGGER = logging.getLogger(__name__)
 
+# The number of resources created from the configuration to remember.
+DEFAULT_CACHE_SIZE = 50000
+
 
 class ServiceConfigReader(object):
-    """Class that loads a service defined by cccl-api-schema."""
+    """Class that loads a service defined by cccl-api-schema.
+
+    The resources created from the configuration objects are remembered.
+    A configuration object that did not change since the last read gives
+    the same resource, it is not parsed again.
+    """
+
+    def __init__(self, partition, cache_size=DEFAULT_CACHE_SIZE):
+        """Initializer.
 
-    def __init__(self, partition):
-        """Initializer."""
+        :param partition: The managed partition.
+        :param cache_size: Maximum number of resources to remember,
+        0 disables the cache.
+        """
         self._partition = partition
+        self._cache_size = cache_size
+        self._resources = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get_cache_stats(self):
+        """Get the number of resources that were reused and created."""
+        return dict(hits=self._hits,
+                    misses=self._misses,
+                    size=len(self._resources))
+
+    def _cached_config_item(self, resource_type, obj):
+        """Get the resource created from an unchanged configuration object.
+
+        Returns:
+            The key and the resource, which is None if the object changed
+            or was never read.
+        """
+        name = obj.get('name')
+        if not self._cache_size or not isinstance(name, STRING_TYPES):
+            return (None, None)
+
+        key = (resource_type, name)
+        cached = self._resources.pop(key, None)
+        if cached is None or cached[0] != obj:
+            return (key, None)
+
+        self._resources[key] = cached
+        resource = cached[1]
+        # The location and the state retrieved from the BIG-IP are those
+        # of the last deploy, they are recorded again for this one.
+        resource.forget_location()
+        return (key, resource)
+
+    @staticmethod
+    def _copy(obj):
+        """Return a copy of a configuration object, or None."""
+        try:
+            return json.loads(json.dumps(obj))
+        except (TypeError, ValueError):
+            return None
+
+    def _remember_config_item(self, key, source, resource):
+        """Remember the resource created from a configuration object."""
+        self._resources[key] = (source, resource)
+        while len(self._resources) > self._cache_size:
+            self._resources.popitem(last=False)
 
     def _create_config_item(self, resource_type, obj):
         """Create an API resource object and handle exceptions.
@@ -58,7 +121,13 @@ class ServiceConfigReader(object):
         :rtype: f5_cccl.resource.Resource
         :raises:  f5_cccl.exceptions.F5CcclConfigurationReadError
         """
-        config_resource = None
+        (key, config_resource) = self._cached_config_item(resource_type, obj)
+        if config_resource is not None:
+            self._hits += 1
+            return config_resource
+
+        self._misses += 1
+        source = self._copy(obj) if key is not None else None
         try:
             config_resource = resource_type(
                 partition=self._partition,
@@ -71,6 +140,9 @@ class ServiceConfigReader(object):
             LOGGER.error(msg)
             raise cccl_error.F5CcclConfigurationReadError(msg)
 
+        if source is not None:
+            self._remember_config_item(key, source, config_resource)
+
         return config_resource
 
     def read_config(self, service_config):
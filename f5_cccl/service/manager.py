@@ -18,24 +18,83 @@
 
 from __future__ import print_function
 
+import hashlib
+import json
 import logging
+from multiprocessing.pool import ThreadPool
 from time import time
 
+from f5.bigip.contexts import TransactionContextManager
+from f5.sdk_exception import F5SDKError
+from icontrol.exceptions import iControlUnexpectedHTTPError
+
 import f5_cccl.exceptions as exc
 from f5_cccl.service.config_reader import ServiceConfigReader
 from f5_cccl.service.validation import ServiceConfigValidator
+from f5_cccl.resource.ltm.app_service import ApplicationService
+from f5_cccl.resource.ltm.internal_data_group import InternalDataGroup
+from f5_cccl.resource.ltm.irule import IRule
+from f5_cccl.resource.ltm.monitor.monitor import Monitor
 from f5_cccl.resource.ltm.node import Node
+from f5_cccl.resource.ltm.policy import Policy
+from f5_cccl.resource.ltm.pool import Pool
+from f5_cccl.resource.ltm.virtual import VirtualServer
+from f5_cccl.resource.ltm.virtual_address import VirtualAddress
 
 
 LOGGER = logging.getLogger(__name__)
 
+# The order in which resources are deployed when deploying concurrently.
+# Resources may reference those of the tiers before theirs: pools
+# reference monitors, iRules reference data groups, policies reference
+# pools and virtual servers reference all of them.  The resources of a
+# tier are deployed concurrently and deleted in the reverse order.
+DEPLOY_TIERS = [
+    (VirtualAddress, Monitor, InternalDataGroup),
+    (Pool, IRule),
+    (Policy,),
+    (VirtualServer, ApplicationService)
+]
+
+
+def deploy_tier(resource):
+    """Return the index of the deployment tier of the resource."""
+    for (tier, resource_types) in enumerate(DEPLOY_TIERS):
+        if isinstance(resource, resource_types):
+            return tier
+
+    return 0
+
 
 class ServiceConfigDeployer(object):
     """CCCL config deployer class."""
 
-    def __init__(self, bigip_proxy):
-        """Initialize the config deployer."""
+    def __init__(self, bigip_proxy, deploy_workers=1, transaction_size=0):
+        """Initialize the config deployer.
+
+        :param bigip_proxy: BigIPProxy object, f5_cccl.bigip.BigIPProxy.
+        :param deploy_workers: Maximum number of resources to deploy
+        concurrently (default: 1, deploy them one after another).
+        :param transaction_size: Maximum number of resources to deploy in
+        one iControl REST transaction (default: 0, no transactions).
+        """
         self._bigip = bigip_proxy
+        self._deploy_workers = max(1, deploy_workers or 1)
+        self._transaction_size = max(0, transaction_size or 0)
+
+        # Set when the proxy's cached state could not be kept in step
+        # with the changes made by the deployer.
+        self._cache_stale = False
+
+    def _cache_resource(self, resource):
+        """Record a created or updated resource in the proxy's cache."""
+        if not self._bigip.cache_resource(resource):
+            self._cache_stale = True
+
+    def _uncache_resource(self, resource):
+        """Remove a deleted resource from the proxy's cache."""
+        if not self._bigip.uncache_resource(resource):
+            self._cache_stale = True
 
     def _get_resource_tasks(self, existing, desired):
         """Get the list of resources to create, delete, update."""
@@ -43,11 +102,12 @@ class ServiceConfigDeployer(object):
             desired[resource] for resource in
             set(desired) - set(existing)
         ]
-        update_list = set(desired) & set(existing)
-        update_list = [
-            desired[resource] for resource in update_list
-            if desired[resource] != existing[resource]
-        ]
+        update_list = list()
+        for resource in set(desired) & set(existing):
+            if desired[resource].differs(existing[resource]):
+                # Update the resource where the existing one was found.
+                desired[resource].copy_location(existing[resource])
+                update_list.append(desired[resource])
         delete_list = [
             existing[resource] for resource in
             set(existing) - set(desired)
@@ -65,10 +125,12 @@ class ServiceConfigDeployer(object):
                 resource.create(self._bigip.mgmt_root())
                 LOGGER.debug("Created %s in %.5f seconds.",
                              resource.name, (time() - start_time))
+                self._cache_resource(resource)
             except exc.F5CcclResourceConflictError:
                 LOGGER.warning(
                     "Resource /%s/%s already exists, skipping task...",
                     resource.partition, resource.name)
+                self._cache_stale = True
             except (exc.F5CcclResourceCreateError,
                     exc.F5CcclError) as e:
                 LOGGER.error(str(e))
@@ -89,10 +151,12 @@ class ServiceConfigDeployer(object):
                 resource.update(self._bigip.mgmt_root())
                 LOGGER.debug("Updated %s in %.5f seconds.",
                              resource.name, (time() - start_time))
+                self._cache_resource(resource)
             except exc.F5CcclResourceNotFoundError as e:
                 LOGGER.warning(
                     "Resource /%s/%s does not exist, skipping task...",
                     resource.partition, resource.name)
+                self._uncache_resource(resource)
             except (exc.F5CcclResourceUpdateError,
                     exc.F5CcclResourceRequestError,
                     exc.F5CcclError) as e:
@@ -114,10 +178,12 @@ class ServiceConfigDeployer(object):
                 resource.delete(self._bigip.mgmt_root())
                 LOGGER.debug("Deleted %s in %.5f seconds.",
                              resource.name, (time() - start_time))
+                self._uncache_resource(resource)
             except exc.F5CcclResourceNotFoundError:
                 LOGGER.warning(
                     "Resource /%s/%s does not exist, skipping task...",
                     resource.partition, resource.name)
+                self._uncache_resource(resource)
             except (exc.F5CcclResourceDeleteError,
                     exc.F5CcclResourceRequestError,
                     exc.F5CcclError) as e:
@@ -155,31 +221,38 @@ class ServiceConfigDeployer(object):
         desired_nodes = dict()
 
         nodes = self._bigip.get_nodes()
+        node_addresses = self._bigip.get_node_addresses()
         pools = self._bigip.get_pools(True)
-        for pool in pools:
-            for member in pools[pool].members:
+        for pool in pools.values():
+            for member in pool.members:
                 addr = member.name.split('%3A')[0]
-                # make a copy to iterate over, then delete from 'nodes'
-                node_list = list(nodes.keys())
-                for key in node_list:
-                    if nodes[key].data['address'] == addr:
-                        node = {'name': key,
-                                'partition': nodes[key].partition,
-                                'address': addr,
-                                'state': 'user-up',
-                                'session': 'user-enabled'}
-                        desired_nodes[key] = Node(**node)
+                for key in node_addresses.get(addr, []):
+                    if key in desired_nodes:
+                        continue
+                    node = {'name': key,
+                            'partition': nodes[key].partition,
+                            'address': addr,
+                            'state': 'user-up',
+                            'session': 'user-enabled'}
+                    desired_nodes[key] = Node(**node)
 
         return desired_nodes
 
-    def _post_deploy(self, desired_config):
+    def _post_deploy(self, desired_config, refresh_collections=None):
         """Perform post-deployment service tasks/cleanup.
 
         Remove superfluous resources that could not be inferred from the
         desired config.
+
+        :param refresh_collections: The BIG-IP collections to refresh
+        before post-processing; None refreshes all of them and an empty
+        list refreshes none.
         """
         LOGGER.debug("Perform post-deploy service tasks...")
-        self._bigip.refresh()
+        if refresh_collections is None:
+            self._bigip.refresh()
+        elif refresh_collections:
+            self._bigip.refresh(refresh_collections)
 
         # Delete/update nodes (no creation)
         LOGGER.debug("Post-process nodes.")
@@ -210,16 +283,156 @@ class ServiceConfigDeployer(object):
 
         self._update_resources(update_vaddrs)
 
-    def deploy(self, desired_config):  # pylint: disable=too-many-locals
-        """Deploy the managed partition with the desired config.
+    def _run_tiers(self, run_tasks, tasks, thread_pool, reverse=False):
+        """Run the tasks tier by tier, concurrently within each tier.
 
-        :param desired_config: A dictionary with the configuration
-        to be applied to the bigip managed partition.
+        :param run_tasks: Method that runs a list of tasks and returns the
+        list of tasks to retry, e.g. _create_resources.
+        :param tasks: The resources to run the tasks for.
+        :param thread_pool: The worker pool to run the tasks on.
+        :param reverse: Run the tiers in the reverse order (for deletes).
 
-        :returns: The number of tasks that could not be completed.
+        :returns: The list of tasks to retry.
         """
-        self._bigip.refresh()
+        tiers = dict()
+        for resource in tasks:
+            tiers.setdefault(deploy_tier(resource), list()).append(resource)
+
+        retry_list = list()
+        for tier in sorted(tiers, reverse=reverse):
+            LOGGER.debug("Running %d tasks of deploy tier %d...",
+                         len(tiers[tier]), tier)
+            results = thread_pool.map(
+                lambda resource: run_tasks([resource]), tiers[tier])
+            for retry in results:
+                retry_list += retry
+
+        return retry_list
+
+    @staticmethod
+    def _in_transaction(resource, operation):
+        """Check whether the operation can be part of a transaction.
+
+        Resources must be updated and deleted at their known location,
+        since a resource cannot be loaded within a transaction.  iApps
+        are never deployed in a transaction.
+        """
+        if isinstance(resource, ApplicationService):
+            return False
+
+        return operation == 'create' or resource.has_location()
+
+    def _commit_transaction(self, operation, batch):
+        """Deploy a batch of resources in one iControl REST transaction.
+
+        :param operation: The resource method to call: 'create', 'update'
+        or 'delete'.
+        :param batch: The resources to deploy.
+
+        :returns: True if the transaction was committed.
+        """
+        LOGGER.debug("Committing a transaction of %d %s tasks...",
+                     len(batch), operation)
+        bigip = self._bigip.mgmt_root()
+        start_time = time()
+        try:
+            with TransactionContextManager(
+                    bigip.tm.transactions.transaction) as api:
+                for resource in batch:
+                    getattr(resource, operation)(api)
+        except (exc.F5CcclError, F5SDKError,
+                iControlUnexpectedHTTPError) as error:
+            LOGGER.warning(
+                "Transaction of %d %s tasks was rejected, deploying the "
+                "resources one at a time: %s", len(batch), operation, error)
+            return False
+
+        LOGGER.debug("Committed the transaction in %.5f seconds.",
+                     (time() - start_time))
+        for resource in batch:
+            if operation == 'delete':
+                self._uncache_resource(resource)
+            else:
+                self._cache_resource(resource)
+
+        return True
+
+    def _run_transactions(self, run_tasks, operation, tasks, reverse=False):
+        """Run the tasks tier by tier in transactions.
+
+        The tasks of a tier are split into transactions of at most
+        transaction_size resources.  The resources of a rejected
+        transaction, and those that cannot be part of one, are deployed
+        one at a time by run_tasks.
+
+        :returns: The list of tasks to retry.
+        """
+        tiers = dict()
+        for resource in tasks:
+            tiers.setdefault(deploy_tier(resource), list()).append(resource)
+
+        retry_list = list()
+        for tier in sorted(tiers, reverse=reverse):
+            # Split the tier before committing, a committed delete
+            # forgets the location of the resource.
+            batched = list()
+            single = list()
+            for resource in tiers[tier]:
+                if self._in_transaction(resource, operation):
+                    batched.append(resource)
+                else:
+                    single.append(resource)
+
+            for start in range(0, len(batched), self._transaction_size):
+                batch = batched[start:start + self._transaction_size]
+                if not self._commit_transaction(operation, batch):
+                    retry_list += run_tasks(batch)
+
+            retry_list += run_tasks(single)
+
+        return retry_list
+
+    def _run_tasks(self, create_tasks, update_tasks, delete_tasks,
+                   thread_pool=None):
+        """Make a pass over the task lists.
 
+        Without a worker pool or transactions, the tasks are run one
+        after another in the order they are given.
+
+        :returns: A tuple of the create, update and delete tasks to retry.
+        """
+        if self._transaction_size:
+            return (
+                self._run_transactions(self._create_resources, 'create',
+                                       create_tasks),
+                self._run_transactions(self._update_resources, 'update',
+                                       update_tasks),
+                self._run_transactions(self._delete_resources, 'delete',
+                                       delete_tasks, reverse=True))
+
+        if thread_pool is None:
+            return (self._create_resources(create_tasks),
+                    self._update_resources(update_tasks),
+                    self._delete_resources(delete_tasks))
+
+        return (
+            self._run_tiers(self._create_resources, create_tasks,
+                            thread_pool),
+            self._run_tiers(self._update_resources, update_tasks,
+                            thread_pool),
+            self._run_tiers(self._delete_resources, delete_tasks,
+                            thread_pool, reverse=True))
+
+    def _get_tasks(self, desired_config):
+        """Get the create, update and delete tasks of the desired config.
+
+        The tasks of each operation are in the order of their
+        dependencies, creates and updates from the resources that others
+        refer to, deletes the other way around.
+
+        :returns: A tuple of the create, update and delete task lists.
+        """
+        # pylint: disable=too-many-locals
         # Get the list of virtual address tasks
         LOGGER.debug("Getting virtual address tasks...")
         existing = self._bigip.get_virtual_addresses()
@@ -286,7 +499,27 @@ class ServiceConfigDeployer(object):
             delete_irules + delete_internal_data_groups + delete_pools + \
             delete_monitors
 
+        return (create_tasks, update_tasks, delete_tasks)
+
+    def deploy(self, desired_config, refresh=True):
+        """Deploy the managed partition with the desired config.
+
+        :param desired_config: A dictionary with the configuration
+        to be applied to the bigip managed partition.
+        :param refresh: Refresh the cached BIG-IP state first (default:
+        True, False when the caller has just refreshed it).
+
+        :returns: The number of tasks that could not be completed.
+        """
+        if refresh:
+            self._bigip.refresh()
+
+        (create_tasks, update_tasks, delete_tasks) = \
+            self._get_tasks(desired_config)
+
         taskq_len = len(create_tasks) + len(update_tasks) + len(delete_tasks)
+        initial_taskq_len = taskq_len
+        self._cache_stale = False
 
         # 'finished' indicates that the task queue is empty, or there is
         # no way to continue to make progress.  If there are errors in
@@ -296,30 +529,48 @@ class ServiceConfigDeployer(object):
         # queue, it is determined that progress has stopped and the
         # loop is exited with work remaining.
         finished = False
-        while not finished:
-            LOGGER.debug("Service task queue length: %d", taskq_len)
-
-            # Iterate over the list of resources to create
-            create_tasks = self._create_resources(create_tasks)
-
-            # Iterate over the list of resources to update
-            update_tasks = self._update_resources(update_tasks)
-
-            # Iterate over the list of resources to delete
-            delete_tasks = self._delete_resources(delete_tasks)
-
-            tasks_remaining = (
-                len(create_tasks) + len(update_tasks) + len(delete_tasks))
-
-            # Did the task queue shrink?
-            if tasks_remaining >= taskq_len or tasks_remaining == 0:
-                # No, we have stopped making progress.
-                finished = True
-
-            # Reset the taskq length.
-            taskq_len = tasks_remaining
-
-        self._post_deploy(desired_config)
+        thread_pool = None
+        workers = min(self._deploy_workers, taskq_len)
+        if workers > 1 and not self._transaction_size:
+            thread_pool = ThreadPool(workers)
+        try:
+            while not finished:
+                LOGGER.debug("Service task queue length: %d", taskq_len)
+
+                # Create, then update, then delete the resources
+                (create_tasks, update_tasks, delete_tasks) = \
+                    self._run_tasks(create_tasks, update_tasks,
+                                    delete_tasks, thread_pool)
+
+                tasks_remaining = (
+                    len(create_tasks) + len(update_tasks) +
+                    len(delete_tasks))
+
+                # Did the task queue shrink?
+                if tasks_remaining >= taskq_len or tasks_remaining == 0:
+                    # No, we have stopped making progress.
+                    finished = True
+
+                # Reset the taskq length.
+                taskq_len = tasks_remaining
+        finally:
+            if thread_pool is not None:
+                thread_pool.close()
+                thread_pool.join()
+
+        # The proxy's cache was updated with the result of each task, so
+        # only the resources that the BIG-IP creates implicitly, nodes and
+        # virtual addresses, need to be read back.  If nothing was done
+        # there is nothing to read; if any task failed, or the cache could
+        # not be updated for a task, read everything back.
+        if taskq_len or self._cache_stale:
+            refresh_collections = None
+        elif initial_taskq_len:
+            refresh_collections = ['nodes', 'virtual_addresses']
+        else:
+            refresh_collections = []
+
+        self._post_deploy(desired_config, refresh_collections)
 
         return taskq_len
 
@@ -327,7 +578,8 @@ class ServiceConfigDeployer(object):
 class ServiceManager(object):
     """CCCL apply config implementation class."""
 
-    def __init__(self, bigip_proxy, partition, schema):
+    def __init__(self, bigip_proxy, partition, schema, deploy_workers=1,
+                 transaction_size=0):
         """Initialize the ServiceManager.
 
         Args:
@@ -335,25 +587,70 @@ class ServiceManager(object):
             partition: The managed partition.
             schema: Schema that defines the structure of a service
             configuration.
+            deploy_workers: Maximum number of resources to deploy
+            concurrently.
+            transaction_size: Maximum number of resources to deploy in
+            one iControl REST transaction, 0 to disable transactions.
 
         Raises:
             F5CcclError: Error initializing the validator or reading the
             API schema.
         """
         self._partition = partition
+        self._bigip = bigip_proxy
         self._config_validator = ServiceConfigValidator(schema)
-        self._service_deployer = ServiceConfigDeployer(bigip_proxy)
+        self._service_deployer = ServiceConfigDeployer(
+            bigip_proxy, deploy_workers=deploy_workers,
+            transaction_size=transaction_size)
         self._config_reader = ServiceConfigReader(self._partition)
 
+        # Fingerprint of the last configuration that was applied without
+        # errors and the BIG-IP change marker taken after applying it.
+        self._applied_fingerprint = None
+        self._applied_marker = None
+        self._unchanged_applies = 0
+
     def get_partition(self):
         """Get the name of the managed partition."""
         return self._partition
 
-    def apply_config(self, service_config):
+    def get_unchanged_applies(self):
+        """Get the number of applies skipped because nothing changed."""
+        return self._unchanged_applies
+
+    @staticmethod
+    def _fingerprint(service_config):
+        """Return a canonical digest of the service configuration.
+
+        Returns None if the configuration cannot be serialized.
+        """
+        try:
+            canonical = json.dumps(service_config, sort_keys=True,
+                                   separators=(',', ':'))
+        except (TypeError, ValueError):
+            return None
+
+        return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+    def _is_applied(self, fingerprint):
+        """Check whether the configuration is already applied.
+
+        The configuration is applied if it is the same as the last one
+        that was applied without errors and the BIG-IP partition has
+        not changed since.
+        """
+        if fingerprint is None or fingerprint != self._applied_fingerprint:
+            return False
+
+        return self._bigip.get_change_marker() == self._applied_marker
+
+    def apply_config(self, service_config, refresh=True):
         """Apply the desired service configuration.
         Args:
             service_config: The desired configuration state of the mananged
             partition.
+            refresh: Refresh the cached BIG-IP state before deploying the
+            configuration, False when the caller has just refreshed it.
 
         Returns:
             The number of resources that were not successfully deployed.
@@ -366,6 +663,19 @@ class ServiceManager(object):
         LOGGER.debug("apply_config start")
         start_time = time()
 
+        # The fingerprint is taken before validation, which sets the
+        # default values in the service configuration.
+        fingerprint = self._fingerprint(service_config)
+        if self._is_applied(fingerprint):
+            self._unchanged_applies += 1
+            LOGGER.debug(
+                "apply_config: configuration unchanged, took %.5f seconds.",
+                (time() - start_time))
+            return 0
+
+        self._applied_fingerprint = None
+        self._applied_marker = None
+
         # Validate the service configuration.
         self._config_validator.validate(service_config)
 
@@ -373,7 +683,12 @@ class ServiceManager(object):
         desired_config = self._config_reader.read_config(service_config)
 
         # Deploy the service desired configuratio.
-        retval = self._service_deployer.deploy(desired_config)
+        retval = self._service_deployer.deploy(desired_config,
+                                               refresh=refresh)
+
+        if retval == 0 and fingerprint is not None:
+            self._applied_marker = self._bigip.get_change_marker()
+            self._applied_fingerprint = fingerprint
 
         LOGGER.debug(
             "apply_config took %.5f seconds.", (time() - start_time))
@@ -20,6 +20,7 @@ import pytest
 from f5_cccl.api import F5CloudServiceManager
 from f5_cccl.exceptions import F5CcclConfigurationReadError
 from f5_cccl.resource import ltm
+from f5_cccl.resource.ltm.pool import IcrPool
 from f5_cccl.resource.ltm.virtual import ApiVirtualServer
 from f5_cccl.service.manager import ServiceConfigDeployer
 from f5_cccl.service.config_reader import ServiceConfigReader
@@ -63,3 +64,35 @@ class TestServiceConfigReader:
             reader = ServiceConfigReader(self.partition)
             with pytest.raises(F5CcclConfigurationReadError) as e:
                 reader.read_config(self.service)
+
+    def test_read_config_cached(self):
+        reader = ServiceConfigReader(self.partition)
+        first = reader.read_config(self.service)
+        count = sum(len(resources) for resources in first.values())
+        assert reader.get_cache_stats() == \
+            dict(hits=0, misses=count, size=count)
+
+        # Unchanged objects give the same resources.
+        existing = IcrPool(name="pool2", partition=self.partition,
+                           loadBalancingMode="round-robin")
+        existing.set_location("https://localhost/pool2")
+        first['pools']['pool2'].copy_location(existing)
+        service = json.loads(json.dumps(self.service))
+        service['virtualServers'][0]['connectionLimit'] = 1000
+        second = reader.read_config(service)
+        assert second['pools']['pool2'] is first['pools']['pool2']
+        assert not second['pools']['pool2'].has_location()
+        assert second['pools']['pool2']._current is None
+        assert second['virtuals'] != first['virtuals']
+        assert second['virtuals']['vs1'].data['connectionLimit'] == 1000
+        assert reader.get_cache_stats() == \
+            dict(hits=count - 1, misses=count + 1, size=count)
+
+        # The cache is limited.
+        reader = ServiceConfigReader(self.partition, cache_size=2)
+        reader.read_config(self.service)
+        assert reader.get_cache_stats()['size'] == 2
+
+        reader = ServiceConfigReader(self.partition, cache_size=0)
+        reader.read_config(self.service)
+        assert reader.get_cache_stats()['size'] == 0
@@ -26,10 +26,13 @@ from f5_cccl.resource.ltm.monitor.http_monitor import HTTPMonitor
 from f5_cccl.resource.ltm.policy.policy import Policy 
 from f5_cccl.resource.ltm.internal_data_group import InternalDataGroup
 from f5_cccl.resource.ltm.irule import IRule
+from f5_cccl.service.manager import deploy_tier
 from f5_cccl.service.manager import ServiceConfigDeployer
 from f5_cccl.service.manager import ServiceManager
 from f5_cccl.service.config_reader import ServiceConfigReader
 
+from f5.sdk_exception import TransactionSubmitException
+from mock import call
 from mock import MagicMock
 from mock import Mock
 from mock import patch
@@ -53,6 +56,46 @@ def test_apply_config(service_manager):
     assert service_manager.apply_config(services) == 0
 
 
+def test_apply_config_unchanged(service_manager):
+    svcfile = 'f5_cccl/schemas/tests/service.json'
+    with open(svcfile, 'r') as fp:
+        services = json.loads(fp.read())
+
+    unchanged = json.loads(json.dumps(services))
+    deployer = service_manager._service_deployer
+    deployer.deploy = Mock(wraps=deployer.deploy)
+
+    assert service_manager.apply_config(services) == 0
+    assert deployer.deploy.call_count == 1
+
+    # The same configuration is not applied again.
+    assert service_manager.apply_config(unchanged) == 0
+    assert deployer.deploy.call_count == 1
+    assert service_manager.get_unchanged_applies() == 1
+
+    # Unless the BIG-IP partition changed.
+    big_ip = service_manager._bigip.mgmt_root()
+    big_ip.bigip_data['nodes'][0]['generation'] = 999999
+    assert service_manager.apply_config(unchanged) == 0
+    assert deployer.deploy.call_count == 2
+
+    # Or the configuration did.
+    unchanged['virtualServers'] = []
+    assert service_manager.apply_config(unchanged) == 0
+    assert deployer.deploy.call_count == 3
+    assert service_manager.get_unchanged_applies() == 1
+
+
+def test_apply_config_failed(service_manager):
+    deployer = service_manager._service_deployer
+    deployer.deploy = Mock(return_value=1)
+
+    # Configurations that were not fully applied are applied again.
+    assert service_manager.apply_config({}) == 1
+    assert service_manager.apply_config({}) == 1
+    assert deployer.deploy.call_count == 2
+
+
 class TestServiceConfigDeployer:
 
     def setup(self):
@@ -247,3 +290,228 @@ class TestServiceConfigDeployer:
         objs = self.get_deleted_objects(service_manager, IRule)
         assert 1 == len(objs)
         assert 'https_redirector' == objs[0].name
+
+    def test_resource_tasks_location(self):
+        """Test that updates are sent where the resource was found."""
+        deployer = ServiceConfigDeployer(self.bigip)
+        existing = Pool('pool1', 'test', members=[], monitor="/test/http")
+        existing.set_location(
+            "https://localhost/mgmt/tm/ltm/pool/~test~pool1")
+        desired = Pool('pool1', 'test', members=[], monitor="/test/https")
+
+        update_list = deployer._get_resource_tasks(
+            {'pool1': existing}, {'pool1': desired})[1]
+
+        assert update_list == [desired]
+        assert desired.self_link == existing.self_link
+
+    def test_desired_nodes(self):
+        """Test that desired nodes are inferred from the pool members."""
+        deployer = ServiceConfigDeployer(self.bigip)
+        self.bigip.refresh()
+
+        desired_nodes = deployer._desired_nodes()
+        assert list(desired_nodes.keys()) == ['5.6.7.8']
+        for name, node in desired_nodes.items():
+            assert node.data['address'] == name
+            assert node.data['state'] == 'user-up'
+            assert node.data['session'] == 'user-enabled'
+
+    def test_deploy_refresh(self):
+        """Test the BIG-IP state that is read back after deploying."""
+        deployer = ServiceConfigDeployer(self.bigip)
+        self.bigip.refresh = Mock(wraps=self.bigip.refresh)
+
+        # Creating an iApp requires a full refresh.
+        assert 0 == deployer.deploy(self.desired_config)
+        assert self.bigip.refresh.call_args_list == [call(), call()]
+
+        # Only nodes and virtual addresses are read back when every
+        # task succeeded and the cache was kept up to date.
+        self.bigip.refresh.reset_mock()
+        self.desired_config['iapps'] = dict(self.bigip.get_app_svcs())
+        assert 0 == deployer.deploy(self.desired_config)
+        assert self.bigip.refresh.call_args_list == [
+            call(), call(['nodes', 'virtual_addresses'])]
+
+        # The created and updated resources are in the cache.
+        pools = self.bigip.get_pools()
+        for name, pool in self.desired_config['pools'].items():
+            assert pools[name] is pool
+            assert self.bigip.get_pools(True)[name] is pool
+        virtuals = self.bigip.get_virtuals()
+        for name, virtual in self.desired_config['virtuals'].items():
+            assert virtuals[name] is virtual
+            assert self.bigip.get_virtuals(True)[name] is virtual
+
+        # Nothing is read back when there is nothing to do.
+        self.bigip.refresh.reset_mock()
+        deployer._get_resource_tasks = Mock(return_value=([], [], []))
+        assert 0 == deployer.deploy(self.desired_config)
+        assert self.bigip.refresh.call_args_list == [call()]
+
+    def test_deploy_refresh_failed_task(self):
+        """Test that a failed task causes a full refresh after deploy."""
+        deployer = ServiceConfigDeployer(self.bigip)
+        self.bigip.refresh = Mock(wraps=self.bigip.refresh)
+        self.desired_config['iapps'] = dict()
+        deployer._create_resources = Mock(
+            side_effect=lambda create_list: create_list)
+
+        assert deployer.deploy(self.desired_config) > 0
+        assert self.bigip.refresh.call_args_list == [call(), call()]
+
+    def test_deploy_concurrent(self):
+        """Test deploying resources concurrently, tier by tier."""
+        deployer = ServiceConfigDeployer(self.bigip, deploy_workers=4)
+
+        created = list()
+        deployer._create_resources = Mock(
+            side_effect=lambda create_list: created.extend(create_list) or [])
+        deleted = list()
+        deployer._delete_resources = Mock(
+            side_effect=lambda delete_list: deleted.extend(delete_list) or [])
+
+        assert 0 == deployer.deploy(self.desired_config)
+
+        # Each resource is deployed on its own.
+        assert len(created) == deployer._create_resources.call_count
+        assert len(created) > 1 and len(deleted) > 1
+
+        # Resources are created after those they reference and deleted
+        # before them.
+        tiers = [deploy_tier(resource) for resource in created]
+        assert tiers == sorted(tiers)
+        tiers = [deploy_tier(resource) for resource in deleted]
+        assert tiers == sorted(tiers, reverse=True)
+
+    def test_deploy_concurrent_retry(self):
+        """Test that failed concurrent tasks are retried."""
+        deployer = ServiceConfigDeployer(self.bigip, deploy_workers=4)
+        failures = dict()
+
+        def create_resources(create_list):
+            # Every virtual server fails on the first attempt.
+            retry_list = list()
+            for resource in create_list:
+                if (isinstance(resource, VirtualServer) and
+                        resource.name not in failures):
+                    failures[resource.name] = True
+                    retry_list.append(resource)
+            return retry_list
+        deployer._create_resources = Mock(side_effect=create_resources)
+
+        assert 0 == deployer.deploy(self.desired_config)
+        assert failures
+
+        # A resource that always fails is left in the queue.
+        deployer._create_resources = Mock(
+            side_effect=lambda create_list: create_list)
+        assert deployer.deploy(self.desired_config) > 0
+
+
+def test_deploy_tier():
+    """Test the deployment tiers of the resources."""
+    pool = Pool('pool1', 'test', members=[])
+    policy = Policy('policy1', 'test')
+    virtual = VirtualServer('virtual1', 'test',
+                            destination="/test/1.2.3.4:80")
+    monitor = HTTPMonitor('monitor1', 'test')
+
+    assert deploy_tier(monitor) < deploy_tier(pool)
+    assert deploy_tier(pool) < deploy_tier(policy)
+    assert deploy_tier(policy) < deploy_tier(virtual)
+
+
+class TestTransactionDeploy:
+
+    def setup(self):
+        self.bigip = bigip_proxy()
+        self.bigip.refresh()
+        self.bigip.mgmt_root().tm.transactions = MagicMock()
+        self.pools = [
+            Pool("tx-pool{}".format(i), "test", members=[]) for i in range(5)
+        ]
+
+    @patch('f5_cccl.service.manager.TransactionContextManager')
+    def test_transactions(self, transaction_cm):
+        """Test that the tasks are split into transactions."""
+        api = transaction_cm.return_value.__enter__.return_value
+        deployer = ServiceConfigDeployer(self.bigip, transaction_size=2)
+        run_tasks = Mock(return_value=[])
+
+        retry = deployer._run_transactions(run_tasks, 'create', self.pools)
+
+        assert retry == []
+        assert transaction_cm.call_count == 3
+        assert api.tm.ltm.pools.pool.create.call_count == 5
+        run_tasks.assert_called_once_with([])
+        for pool in self.pools:
+            assert self.bigip.get_pools()[pool.name] is pool
+
+    @patch('f5_cccl.service.manager.TransactionContextManager')
+    def test_transaction_rejected(self, transaction_cm):
+        """Test that the resources of a rejected transaction are retried."""
+        transaction_cm.return_value.__exit__.side_effect = \
+            TransactionSubmitException("rejected")
+        deployer = ServiceConfigDeployer(self.bigip, transaction_size=3)
+        run_tasks = Mock(side_effect=lambda tasks: tasks[:1])
+
+        retry = deployer._run_transactions(run_tasks, 'create', self.pools)
+
+        assert run_tasks.call_args_list == [
+            call(self.pools[0:3]), call(self.pools[3:5]), call([])]
+        assert retry == [self.pools[0], self.pools[3]]
+        for pool in self.pools:
+            assert pool.name not in self.bigip.get_pools()
+
+    @patch('f5_cccl.service.manager.TransactionContextManager')
+    def test_transaction_updates(self, transaction_cm):
+        """Test that only located resources are updated in a transaction."""
+        deployer = ServiceConfigDeployer(self.bigip, transaction_size=10)
+        run_tasks = Mock(return_value=[])
+        self.pools[0].set_location(
+            "https://localhost/mgmt/tm/ltm/pool/~test~tx-pool0")
+        iapp = list(self.bigip.get_app_svcs().values())[0]
+        iapp.set_location(
+            "https://localhost/mgmt/tm/sys/application/service/~test~x")
+        api = transaction_cm.return_value.__enter__.return_value
+        api._meta_data = {'uri': "https://1.2.3.4:443/mgmt/",
+                          'icr_session': MagicMock()}
+
+        deployer._run_transactions(run_tasks, 'update', self.pools + [iapp])
+
+        assert transaction_cm.call_count == 1
+        assert api._meta_data['icr_session'].put.call_count == 1
+        assert run_tasks.call_args_list == [
+            call(self.pools[1:]), call([iapp])]
+
+    @patch('f5_cccl.service.manager.TransactionContextManager')
+    def test_transaction_deletes(self, transaction_cm):
+        """Test that committed deletes are not run a second time."""
+        deployer = ServiceConfigDeployer(self.bigip, transaction_size=10)
+        run_tasks = Mock(return_value=[])
+        for pool in self.pools:
+            pool.set_location(
+                "https://localhost/mgmt/tm/ltm/pool/~test~" + pool.name)
+        api = transaction_cm.return_value.__enter__.return_value
+        api._meta_data = {'uri': "https://1.2.3.4:443/mgmt/",
+                          'icr_session': MagicMock()}
+
+        deployer._run_transactions(run_tasks, 'delete', self.pools)
+
+        assert transaction_cm.call_count == 1
+        assert api._meta_data['icr_session'].delete.call_count == 5
+        run_tasks.assert_called_once_with([])
+
+    @patch('f5_cccl.service.manager.TransactionContextManager')
+    def test_deploy_transactions(self, transaction_cm):
+        """Test deploying a service configuration in transactions."""
+        svcfile = 'f5_cccl/schemas/tests/service.json'
+        with open(svcfile, 'r') as fp:
+            service = json.loads(fp.read())
+        desired_config = ServiceConfigReader("test").read_config(service)
+        deployer = ServiceConfigDeployer(self.bigip, transaction_size=100)
+
+        assert 0 == deployer.deploy(desired_config)
+        assert transaction_cm.called
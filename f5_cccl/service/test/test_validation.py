@@ -15,9 +15,11 @@
 #
 
 import copy
+from multiprocessing.pool import ThreadPool
 import simplejson as json
 import pdb
 import pytest
+import threading
 import yaml
 
 from jsonschema import validators, Draft4Validator, exceptions
@@ -180,3 +182,154 @@ def test_read_json(store_json_loads):
         assert m.called, "We opened a file"
         json.loads.assert_called_once_with(read_data)
         assert result == expected, "We got what we came for"
+
+
+def test_compiled_validator():
+    """The compiled validator agrees with the jsonschema validator."""
+    with open('f5_cccl/schemas/tests/service.json', 'r') as fp:
+        service_data = json.load(fp)
+    validator = ServiceConfigValidator()
+    assert validator._compiled
+
+    # The same defaults are set.
+    compiled_config = copy.deepcopy(service_data)
+    assert validator._compiled(compiled_config)
+    jsonschema_config = copy.deepcopy(service_data)
+    validator.validator.validate(jsonschema_config)
+    assert compiled_config == jsonschema_config
+    assert compiled_config != service_data
+
+    def _invalid(modify):
+        config = copy.deepcopy(service_data)
+        modify(config)
+        assert not validator._compiled(copy.deepcopy(config))
+        with pytest.raises(F5CcclValidationError):
+            validator.validate(config)
+
+    _invalid(lambda c: c['virtualServers'][0].pop('destination'))
+    _invalid(lambda c: c['virtualServers'][0].update(name=""))
+    _invalid(lambda c: c['virtualServers'][0].update(enabled="yes"))
+    _invalid(lambda c: c['pools'][0]['members'][0].update(port=65536))
+    _invalid(lambda c: c['pools'][0]['members'][0].update(port=True))
+    _invalid(lambda c: c['pools'][0].update(loadBalancingMode="random"))
+    _invalid(lambda c: c['monitors'][0].update(interval=0))
+    _invalid(lambda c: c['l7Policies'][0]['rules'][0]['actions'][0].update(
+        redirect=True, location="http://example.com", httpReply=True))
+    _invalid(lambda c: c['iapps'][0]['variables'].update(var=1))
+    _invalid(lambda c: c.update(pools={}))
+
+
+def test_validators_shared():
+    """The validators of a schema are created once."""
+    first = ServiceConfigValidator()
+    second = ServiceConfigValidator(
+        schema='f5_cccl/schemas/cccl-api-schema.yml')
+    assert first.validator is second.validator
+    assert first._compiled is second._compiled
+
+    # Each thread has a jsonschema validator of its own.
+    validators = list()
+    thread = threading.Thread(
+        target=lambda: validators.append(first.validator))
+    thread.start()
+    thread.join()
+    assert validators[0] is not first.validator
+    assert validators[0].schema is first.validator.schema
+
+
+def test_validate_concurrently():
+    """Configs are validated concurrently without the compiled validator."""
+    with open('f5_cccl/schemas/tests/service.json', 'r') as fp:
+        service_data = json.load(fp)
+    validator = ServiceConfigValidator(cache_size=0)
+    expected = copy.deepcopy(service_data)
+    validator.validate(expected)
+    validator._compiled = None
+
+    def _validate(_):
+        config = copy.deepcopy(service_data)
+        validator.validate(config)
+        return config
+
+    thread_pool = ThreadPool(8)
+    try:
+        configs = thread_pool.map(_validate, range(32))
+    finally:
+        thread_pool.close()
+        thread_pool.join()
+    assert all(config == expected for config in configs)
+
+
+def test_unsupported_schema(tmpdir):
+    """A schema that cannot be compiled is used with jsonschema."""
+    schema = tmpdir.join('schema.json')
+    schema.write(json.dumps({
+        'type': "object",
+        'properties': {
+            'name': {'anyOf': [{'type': "string"}, {'type': "integer"}]},
+            'port': {'type': "integer", 'default': 80}
+        }
+    }))
+    validator = ServiceConfigValidator(schema=str(schema))
+    assert validator._compiled is None
+
+    config = {'name': 1}
+    validator.validate(config)
+    assert config['port'] == 80
+    with pytest.raises(F5CcclValidationError):
+        validator.validate({'name': []})
+
+
+def test_validate_changed_entries():
+    """Only the entries that changed are validated again."""
+    with open('f5_cccl/schemas/tests/service.json', 'r') as fp:
+        service_data = json.load(fp)
+    validator = ServiceConfigValidator()
+    expected = copy.deepcopy(service_data)
+    ServiceConfigValidator(cache_size=0).validate(expected)
+
+    validator.validate(copy.deepcopy(service_data))
+    cached = len(validator._validated)
+    assert cached > 0
+
+    # Unchanged entries get their defaults.
+    config = copy.deepcopy(service_data)
+    with patch.object(validator, '_compiled',
+                      wraps=validator._compiled) as compiled:
+        validator.validate(config)
+        unvalidated = compiled.call_args[0][0]
+    assert config == expected
+    assert all(not unvalidated[key] for key in validator._lists
+               if key in unvalidated)
+
+    # A changed entry is validated again.
+    config = copy.deepcopy(service_data)
+    config['pools'][0]['members'][0]['port'] = 65536
+    with pytest.raises(F5CcclValidationError):
+        validator.validate(config)
+    config['pools'][0]['members'][0]['port'] = 80
+    validator.validate(config)
+    assert config['pools'][0]['members'][0]['ratio'] == 1
+    assert len(validator._validated) == cached
+
+    # Values that equal the cached ones but are of another type are
+    # validated again.
+    for (port, other) in [(80, 80.0), (80, True), (1, True)]:
+        config = copy.deepcopy(service_data)
+        config['pools'][0]['members'][0]['port'] = port
+        validator.validate(config)
+        config = copy.deepcopy(service_data)
+        config['pools'][0]['members'][0]['port'] = other
+        with pytest.raises(F5CcclValidationError):
+            validator.validate(config)
+
+    # The structure of the config is still validated.
+    config = copy.deepcopy(service_data)
+    config['pools'] = {}
+    with pytest.raises(F5CcclValidationError):
+        validator.validate(config)
+
+    # The number of remembered entries is limited.
+    validator = ServiceConfigValidator(cache_size=2)
+    validator.validate(copy.deepcopy(service_data))
+    assert len(validator._validated) == 2
@@ -18,8 +18,18 @@
 
 from __future__ import print_function
 
+from collections import OrderedDict
+import hashlib
 import logging
+import numbers
+import os
+import re
+import threading
 from time import time
+try:
+    from urlparse import urljoin
+except ImportError:
+    from urllib.parse import urljoin
 
 import jsonschema
 from jsonschema import Draft4Validator
@@ -32,6 +42,33 @@ import f5_cccl.exceptions as cccl_exc
 LOGGER = logging.getLogger(__name__)
 DEFAULT_SCHEMA = "./f5_cccl/schemas/cccl-api-schema.yml"
 
+# The number of validated service entries to remember.
+DEFAULT_CACHE_SIZE = 50000
+
+STRING_TYPES = (type(u''), type(''))
+
+
+def _is_number(instance):
+    return isinstance(instance, numbers.Number) and \
+        not isinstance(instance, bool)
+
+
+def _is_integer(instance):
+    return isinstance(instance, numbers.Integral) and \
+        not isinstance(instance, bool)
+
+
+# The Draft 4 types.
+TYPES = {
+    'array': lambda instance: isinstance(instance, list),
+    'boolean': lambda instance: isinstance(instance, bool),
+    'integer': _is_integer,
+    'null': lambda instance: instance is None,
+    'number': _is_number,
+    'object': lambda instance: isinstance(instance, dict),
+    'string': lambda instance: isinstance(instance, STRING_TYPES)
+}
+
 
 def read_yaml(target):
     """Open and read a yaml file."""
@@ -58,6 +95,288 @@ def read_yaml_or_json(target):
             'CCCL API schema json or yaml file expected.')
 
 
+class UnsupportedSchemaError(Exception):
+    """The schema uses a keyword that the SchemaCompiler does not support."""
+
+
+class SchemaCompiler(object):
+    """Compile a Draft 4 schema into validation functions.
+
+    Each subschema becomes a closure that returns whether an instance is
+    valid and, like the ServiceConfigValidator, sets the defaults of the
+    properties it checks.  The closures of the definitions a schema
+    refers to, e.g. poolType, are compiled once and shared by every
+    reference.  Only the keywords used by the CCCL API schema are
+    compiled, UnsupportedSchemaError is raised for the others.
+
+    Each keyword is compiled by a method that takes the value of the
+    keyword, the schema it is part of and the resolution scope, whether
+    it uses them or not.  The functions do not report why an instance is
+    invalid, the jsonschema validator is used for that.
+    """
+
+    def __init__(self, schema):
+        """Initialize the compiler for the schema."""
+        self._schema = schema
+        self._resolver = Draft4Validator(schema).resolver
+        self._refs = dict()
+        self._keywords = {
+            'enum': self._enum,
+            'items': self._items,
+            'maxItems': self._max_items,
+            'maxLength': self._max_length,
+            'maximum': self._maximum,
+            'minItems': self._min_items,
+            'minLength': self._min_length,
+            'minimum': self._minimum,
+            'oneOf': self._one_of,
+            'patternProperties': self._pattern_properties,
+            'properties': self._properties,
+            'required': self._required,
+            'type': self._type
+        }
+
+    def compile(self):
+        """Return the validation function of the schema."""
+        return self._compile(self._schema, self._resolver.resolution_scope)
+
+    def _compile(self, schema, scope):
+        if not isinstance(schema, dict):
+            raise UnsupportedSchemaError("Schema is not an object")
+        if 'id' in schema:
+            scope = urljoin(scope, schema['id'])
+        if '$ref' in schema:
+            # As in Draft 4, the other keywords of a reference are ignored.
+            return self._ref(urljoin(scope, schema['$ref']))
+
+        checks = list()
+        for (keyword, value) in schema.items():
+            if keyword in self._keywords:
+                checks.append(self._keywords[keyword](value, schema, scope))
+            elif keyword in Draft4Validator.VALIDATORS and \
+                    keyword != 'format':
+                raise UnsupportedSchemaError(
+                    "Keyword {} is not supported".format(keyword))
+        if len(checks) == 1:
+            return checks[0]
+
+        def check(instance):
+            for subcheck in checks:
+                if not subcheck(instance):
+                    return False
+            return True
+
+        return check
+
+    def _ref(self, url):
+        (url, schema) = self._resolver.resolve(url)
+        if url not in self._refs:
+            # A definition may refer to itself, it is found by url until
+            # it is compiled.
+            self._refs[url] = None
+            self._refs[url] = self._compile(schema, url)
+        if self._refs[url] is None:
+            return lambda instance: self._refs[url](instance)
+        return self._refs[url]
+
+    @staticmethod
+    def _type(types, _schema, _scope):
+        if not isinstance(types, list):
+            types = [types]
+        checks = [TYPES[name] for name in types]
+        if len(checks) == 1:
+            return checks[0]
+        return lambda instance: any(c(instance) for c in checks)
+
+    @staticmethod
+    def _enum(enum, _schema, _scope):
+        def check(instance):
+            # Unlike ==, True and 1 are different values.
+            return any(instance == value and
+                       isinstance(instance, bool) == isinstance(value, bool)
+                       for value in enum)
+        return check
+
+    @staticmethod
+    def _minimum(minimum, schema, _scope):
+        if schema.get('exclusiveMinimum', False):
+            return lambda i: not _is_number(i) or i > minimum
+        return lambda i: not _is_number(i) or i >= minimum
+
+    @staticmethod
+    def _maximum(maximum, schema, _scope):
+        if schema.get('exclusiveMaximum', False):
+            return lambda i: not _is_number(i) or i < maximum
+        return lambda i: not _is_number(i) or i <= maximum
+
+    @staticmethod
+    def _min_length(length, _schema, _scope):
+        return lambda i: not isinstance(i, STRING_TYPES) or len(i) >= length
+
+    @staticmethod
+    def _max_length(length, _schema, _scope):
+        return lambda i: not isinstance(i, STRING_TYPES) or len(i) <= length
+
+    @staticmethod
+    def _min_items(length, _schema, _scope):
+        return lambda i: not isinstance(i, list) or len(i) >= length
+
+    @staticmethod
+    def _max_items(length, _schema, _scope):
+        return lambda i: not isinstance(i, list) or len(i) <= length
+
+    @staticmethod
+    def _required(required, _schema, _scope):
+        return lambda i: not isinstance(i, dict) or \
+            all(name in i for name in required)
+
+    def _items(self, items, _schema, scope):
+        if isinstance(items, list):
+            checks = [self._compile(item, scope) for item in items]
+            return lambda i: not isinstance(i, list) or \
+                all(c(item) for (c, item) in zip(checks, i))
+
+        item_check = self._compile(items, scope)
+        return lambda i: not isinstance(i, list) or \
+            all(item_check(item) for item in i)
+
+    def _one_of(self, subschemas, _schema, scope):
+        checks = [self._compile(subschema, scope) for subschema in subschemas]
+        # Every subschema is checked, as each of them sets its defaults.
+        return lambda i: [c(i) for c in checks].count(True) == 1
+
+    def _properties(self, properties, _schema, scope):
+        defaults = [
+            (name, subschema['default'])
+            for (name, subschema) in properties.items()
+            if isinstance(subschema, dict) and 'default' in subschema
+        ]
+        checks = [(name, self._compile(subschema, scope))
+                  for (name, subschema) in properties.items()]
+
+        def check(instance):
+            if not isinstance(instance, dict):
+                return True
+            for (name, default) in defaults:
+                instance.setdefault(name, default)
+            for (name, subcheck) in checks:
+                if name in instance and not subcheck(instance[name]):
+                    return False
+            return True
+
+        return check
+
+    def _pattern_properties(self, patterns, _schema, scope):
+        checks = [(re.compile(pattern), self._compile(subschema, scope))
+                  for (pattern, subschema) in patterns.items()]
+
+        def check(instance):
+            if not isinstance(instance, dict):
+                return True
+            for (pattern, subcheck) in checks:
+                for (name, value) in instance.items():
+                    if pattern.search(name) and not subcheck(value):
+                        return False
+            return True
+
+        return check
+
+
+def _set_defaults(validator, properties, instance, schema):
+    """Set the defaults of the properties, then validate them."""
+    if isinstance(instance, dict):
+        for item, subschema in properties.items():
+            if "default" in subschema:
+                instance.setdefault(item, subschema["default"])
+
+    validate_properties = Draft4Validator.VALIDATORS["properties"]
+    for error in validate_properties(validator, properties, instance,
+                                     schema):
+        yield error
+
+
+# The validators of each schema file, shared by all ServiceConfigValidators.
+_validators = dict()
+_validators_lock = threading.Lock()
+
+# The jsonschema validators of each thread, by validator class.  Their
+# resolver keeps the scope of the reference being resolved.
+_thread_validators = threading.local()
+
+
+def _load_validators(schema_path):
+    """Read a schema and create its validators.
+
+    Returns:
+        The schema, the class of the jsonschema validator that sets
+        defaults, and the compiled validation function or None if the
+        schema cannot be compiled.
+    """
+    try:
+        schema = read_yaml_or_json(schema_path)
+    except json.JSONDecodeError as error:
+        LOGGER.error("%s", error)
+        raise cccl_exc.F5CcclSchemaError(
+            'CCCL API schema could not be decoded.')
+    except IOError as error:
+        LOGGER.error("%s", error)
+        raise cccl_exc.F5CcclSchemaError(
+            'CCCL API schema could not be read.')
+
+    try:
+        Draft4Validator.check_schema(schema)
+        validator_with_defaults = validators.extend(
+            Draft4Validator,
+            {"properties": _set_defaults})
+    except jsonschema.SchemaError as error:
+        LOGGER.error("%s", error)
+        raise cccl_exc.F5CcclSchemaError("Invalid API schema")
+
+    try:
+        compiled = SchemaCompiler(schema).compile()
+    except (UnsupportedSchemaError, jsonschema.RefResolutionError) as error:
+        LOGGER.info("Schema %s is not compiled: %s", schema_path, error)
+        compiled = None
+
+    return (schema, validator_with_defaults, compiled)
+
+
+def get_validators(schema_path):
+    """Return the cached validators of a schema file.
+
+    The validators are created again when the file is modified.  The
+    jsonschema validator of the calling thread is created from the class
+    that is returned, see thread_validator.
+    """
+    try:
+        stat = os.stat(schema_path)
+        key = (os.path.realpath(schema_path), stat.st_mtime, stat.st_size)
+    except OSError:
+        # The read fails and reports the error.
+        return _load_validators(schema_path)
+
+    with _validators_lock:
+        if key not in _validators:
+            _validators[key] = _load_validators(schema_path)
+        return _validators[key]
+
+
+def thread_validator(validator_class, schema):
+    """Return the calling thread's jsonschema validator of a schema.
+
+    The validators are not thread-safe, each thread creates its own
+    once and uses it for every ServiceConfigValidator of the schema.
+    """
+    cache = getattr(_thread_validators, 'cache', None)
+    if cache is None:
+        cache = _thread_validators.cache = dict()
+
+    validator = cache.get(validator_class)
+    if validator is None:
+        validator = cache[validator_class] = validator_class(schema)
+    return validator
+
+
 class ServiceConfigValidator(object):
     """A schema validator used by f5-cccl service manager.
 
@@ -67,54 +386,132 @@ class ServiceConfigValidator(object):
     Optionally accepts an alternate json or yaml schema to validate against.
 
     """
-    def __init__(self, schema=DEFAULT_SCHEMA):
+    def __init__(self, schema=DEFAULT_SCHEMA, cache_size=DEFAULT_CACHE_SIZE):
         """Choose schema and initialize extended Draft4Validator.
 
+        The schema is read, checked and compiled once per process, and
+        again when it is modified.
+
+        Args:
+            schema: Path of the json or yaml schema.
+            cache_size: Maximum number of validated entries, e.g. pools,
+            to remember.  An entry is not validated again while it does not
+            change, 0 disables the cache.
+
         Raises:
             F5CcclSchemaError: Failed to read or validate the CCCL
             API schema file.
         """
+        (self.schema, self._validator_class, self._compiled) = \
+            get_validators(schema)
 
-        try:
-            self.schema = read_yaml_or_json(schema)
-        except json.JSONDecodeError as error:
-            LOGGER.error("%s", error)
-            raise cccl_exc.F5CcclSchemaError(
-                'CCCL API schema could not be decoded.')
-        except IOError as error:
-            LOGGER.error("%s", error)
-            raise cccl_exc.F5CcclSchemaError(
-                'CCCL API schema could not be read.')
+        # The top level lists of entries, e.g. pools and virtualServers.
+        self._lists = [
+            key for (key, subschema) in
+            self.schema.get('properties', dict()).items()
+            if isinstance(subschema, dict) and 'items' in subschema
+        ]
+        self._cache_size = cache_size
+        self._validated = OrderedDict()
+
+    @property
+    def validator(self):
+        """The jsonschema validator of the calling thread."""
+        return thread_validator(self._validator_class, self.schema)
+
+    def _restore_validated(self, cfg):
+        """Restore the entries that are unchanged since they were validated.
+
+        An entry is unchanged if its digest is that of the source of the
+        entry of the same list and name that was validated last.  It is
+        given the validated content, with the defaults set by the schema.
+
+        Returns:
+            The config without the restored entries, and the
+            (list, name, digest, entry) of each of its entries that can be
+            remembered once it is validated.
+        """
+        pending = list()
+        if not self._cache_size or not isinstance(cfg, dict):
+            return (cfg, pending)
+
+        unvalidated = dict(cfg)
+        for key in self._lists:
+            entries = cfg.get(key)
+            if not isinstance(entries, list):
+                continue
+
+            unvalidated[key] = list()
+            for entry in entries:
+                if not isinstance(entry, dict) or \
+                        not isinstance(entry.get('name'), STRING_TYPES):
+                    unvalidated[key].append(entry)
+                    continue
+
+                cache_key = (key, entry['name'])
+                digest = self._digest(entry)
+                validated = self._validated.pop(cache_key, None)
+                if validated is not None and digest is not None and \
+                        validated[0] == digest:
+                    self._validated[cache_key] = validated
+                    entry.update(json.loads(validated[1]))
+                    continue
 
+                if digest is not None:
+                    pending.append((key, entry['name'], digest, entry))
+                unvalidated[key].append(entry)
+
+        return (unvalidated, pending)
+
+    @staticmethod
+    def _digest(entry):
+        """Return the digest of an entry, or None if it cannot be cached.
+
+        The digest is taken of the canonical JSON text of the entry,
+        which tells apart values that compare equal, e.g. 1, 1.0 and
+        True.
+        """
         try:
-            Draft4Validator.check_schema(self.schema)
-            self.validate_properties = Draft4Validator.VALIDATORS["properties"]
-            validator_with_defaults = validators.extend(
-                Draft4Validator,
-                {"properties": self.__set_defaults})
-            self.validator = validator_with_defaults(self.schema)
-        except jsonschema.SchemaError as error:
-            LOGGER.error("%s", error)
-            raise cccl_exc.F5CcclSchemaError("Invalid API schema")
-
-    def __set_defaults(self, validator, properties, instance, schema):
-        """Helper function to simply return when setting defaults."""
-        for item, subschema in properties.items():
-            if "default" in subschema:
-                instance.setdefault(item, subschema["default"])
+            text = json.dumps(entry, sort_keys=True, separators=(',', ':'))
+        except (TypeError, ValueError):
+            return None
+
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
 
-        for error in self.validate_properties(validator, properties, instance,
-                                              schema):
-            yield error
+    def _remember_validated(self, pending):
+        """Remember the validated entries and the digest of their source."""
+        for (key, name, digest, entry) in pending:
+            self._validated.pop((key, name), None)
+            self._validated[(key, name)] = (
+                digest, json.dumps(entry, separators=(',', ':')))
+        while len(self._validated) > self._cache_size:
+            self._validated.popitem(last=False)
 
     def validate(self, cfg):
-        """Check a config against the schema, returns `None` at succeess."""
+        """Check a config against the schema, returns `None` at succeess.
+
+        The entries that did not change since the last validation are
+        not checked again, only the rest of the config is.
+        """
         LOGGER.debug("Validating desired config against CCCL API schema.")
         start_time = time()
 
         try:
             LOGGER.debug("validate start")
-            self.validator.validate(cfg)
+            (unvalidated, pending) = self._restore_validated(cfg)
+            if self._compiled is not None:
+                valid = self._compiled(unvalidated)
+            else:
+                valid = self.validator.is_valid(unvalidated)
+            # The jsonschema validator finds the error of an invalid
+            # config.
+            if not valid:
+                self.validator.validate(cfg)
+            elif unvalidated is not cfg:
+                # Keep the top level defaults.
+                for (key, value) in unvalidated.items():
+                    cfg.setdefault(key, value)
+            self._remember_validated(pending)
         except jsonschema.exceptions.ValidationError as err:
             msg = str(err)
             raise cccl_exc.F5CcclValidationError(msg)
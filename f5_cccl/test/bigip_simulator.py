@@ -0,0 +1,706 @@
+#!/usr/bin/env python
+# Copyright 2017 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+u"""An in-process simulation of the BIG-IP iControl REST API.
+
+The simulator is a requests transport adapter that keeps the state of
+the iControl REST endpoints used by CCCL in memory, so that the library
+can be exercised and benchmarked without a BIG-IP.  It is mounted on the
+session of a ManagementRoot:
+
+    bigip = SimulatedManagementRoot(latency=0.005)
+    cccl = F5CloudServiceManager(bigip, "Test")
+    cccl.apply_config(services)
+    print(bigip.simulator.counters)
+
+The simulator assigns a new generation to every resource it writes,
+automatically creates the nodes of pool members and the virtual
+addresses of virtual servers, refuses to delete resources that are still
+referenced and supports iControl REST transactions.  Each request is
+delayed by the configured latency, outside of any lock, so concurrent
+requests overlap as they would against a real BIG-IP.
+"""
+
+from collections import OrderedDict
+import copy
+import json
+import threading
+import time
+
+from f5.bigip import ManagementRoot
+from requests.adapters import BaseAdapter
+from requests.models import Response
+from six.moves.urllib.parse import parse_qs
+from six.moves.urllib.parse import unquote
+from six.moves.urllib.parse import urlsplit
+
+
+# The top level collections and their subcollections.
+COLLECTIONS = [
+    'ltm/data-group/internal',
+    'ltm/monitor/gateway-icmp',
+    'ltm/monitor/http',
+    'ltm/monitor/https',
+    'ltm/monitor/tcp',
+    'ltm/node',
+    'ltm/policy',
+    'ltm/pool',
+    'ltm/rule',
+    'ltm/virtual',
+    'ltm/virtual-address',
+    'sys/application/service',
+    'sys/folder'
+]
+SUBCOLLECTIONS = {
+    'ltm/policy': ['rules'],
+    'ltm/policy/rules': ['actions', 'conditions'],
+    'ltm/pool': ['members'],
+    'ltm/virtual': ['policies', 'profiles']
+}
+
+# Properties that are assigned by the BIG-IP and never written.
+READ_ONLY = ['fullPath', 'generation', 'kind', 'selfLink']
+
+# Some of the default properties that the BIG-IP returns with the
+# resources it creates, which CCCL does not write.
+_MONITOR_DEFAULTS = {
+    'adaptive': "disabled",
+    'adaptiveDivergenceType': "relative",
+    'adaptiveDivergenceValue': 25,
+    'adaptiveLimit': 200,
+    'adaptiveSamplingTimespan': 300,
+    'destination': "*:*",
+    'ipDscp': 0,
+    'manualResume': "disabled",
+    'reverse': "disabled",
+    'timeUntilUp': 0,
+    'transparent': "disabled",
+    'upInterval': 0
+}
+DEFAULTS = {
+    'ltm/monitor/http': dict(_MONITOR_DEFAULTS,
+                             defaultsFrom="/Common/http"),
+    'ltm/monitor/https': dict(_MONITOR_DEFAULTS,
+                              defaultsFrom="/Common/https",
+                              cipherlist="DEFAULT:+SHA:+3DES:+kEDH",
+                              compatibility="enabled"),
+    'ltm/pool': {
+        'allowNat': "yes",
+        'allowSnat': "yes",
+        'ignorePersistedWeight': "disabled",
+        'ipTosToClient': "pass-through",
+        'ipTosToServer': "pass-through",
+        'linkQosToClient': "pass-through",
+        'linkQosToServer': "pass-through",
+        'minActiveMembers': 0,
+        'minUpMembers': 0,
+        'minUpMembersAction': "failover",
+        'minUpMembersChecking': "disabled",
+        'queueDepthLimit': 0,
+        'queueOnConnectionLimit': "disabled",
+        'queueTimeLimit': 0,
+        'reselectTries': 0,
+        'serviceDownAction': "none",
+        'slowRampTime': 10
+    },
+    'ltm/pool/members': {
+        'dynamicRatio': 1,
+        'ephemeral': "false",
+        'fqdn': {'autopopulate': "disabled"},
+        'inheritProfile': "enabled",
+        'logging': "disabled",
+        'monitor': "default",
+        'rateLimit': "disabled",
+        'state': "unchecked"
+    },
+    'ltm/virtual': {
+        'addressStatus': "yes",
+        'autoLasthop': "default",
+        'cmpEnabled': "yes",
+        'gtmScore': 0,
+        'mask': "255.255.255.255",
+        'mirror': "disabled",
+        'mobileAppTunnel': "disabled",
+        'nat64': "disabled",
+        'rateLimit': "disabled",
+        'rateLimitDstMask': 0,
+        'rateLimitMode': "object",
+        'rateLimitSrcMask': 0,
+        'serviceDownImmediateAction': "none",
+        'source': "0.0.0.0/0",
+        'sourcePort': "preserve",
+        'synCookieStatus': "not-activated",
+        'translateAddress': "enabled",
+        'translatePort': "enabled"
+    }
+}
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found",
+           409: "Conflict"}
+
+COORDINATION_HEADER = 'X-F5-REST-Coordination-Id'
+
+
+class SimulatorError(Exception):
+    """A request that the BIG-IP would reject."""
+
+    def __init__(self, code, message):
+        super(SimulatorError, self).__init__(message)
+        self.code = code
+        self.message = message
+
+
+class _Item(object):
+    """A resource: its properties and the items of its subcollections."""
+
+    def __init__(self, props=None):
+        self.props = props if props is not None else dict()
+        self.subs = OrderedDict()
+
+
+def _split_address(name):
+    """Return the address of a pool member or virtual destination name."""
+    if name.count(':') == 1:
+        return name.split(':')[0]
+    return name.rsplit('.', 1)[0]
+
+
+class BigIPSimulator(BaseAdapter):
+    """A requests adapter that simulates the BIG-IP iControl REST API."""
+
+    def __init__(self, latency=0.0, version="13.1.0"):
+        """Create an empty BIG-IP with the Common partition.
+
+        Args:
+            latency: Seconds to delay each request by.
+            version: The TMOS version that is reported.
+        """
+        super(BigIPSimulator, self).__init__()
+        self.latency = latency
+        self.version = version
+        self.counters = dict(
+            (method, 0) for method in
+            ['get', 'post', 'put', 'patch', 'delete'])
+
+        self._lock = threading.RLock()
+        self._generation = 0
+        self._collections = dict(
+            (path, OrderedDict()) for path in COLLECTIONS)
+        self._transactions = dict()
+        self._next_transaction = 1
+
+        self._collections['sys/folder']['/Common'] = _Item(
+            dict(name="Common", subPath="/", fullPath="/Common"))
+
+    def reset_counters(self):
+        """Reset the number of requests made of each method."""
+        with self._lock:
+            for method in self.counters:
+                self.counters[method] = 0
+
+    def send(self, request, **kwargs):
+        """Handle a prepared request and return the response."""
+        method = request.method.lower()
+        with self._lock:
+            self.counters[method] = self.counters.get(method, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        (_, _, path, query, _) = urlsplit(request.url)
+        segments = [unquote(s) for s in path.strip('/').split('/')]
+        query = dict((k, v[0]) for (k, v) in parse_qs(query).items())
+        body = None
+        if request.body:
+            body = request.body
+            if not isinstance(body, str):
+                body = body.decode('utf-8')
+            body = json.loads(body)
+
+        with self._lock:
+            try:
+                if segments[:2] != ['mgmt', 'tm']:
+                    raise SimulatorError(404, "Public URI path not registered")
+                (code, result) = self._handle(
+                    method, segments[2:], query, body,
+                    request.headers.get(COORDINATION_HEADER))
+            except SimulatorError as error:
+                (code, result) = (error.code, dict(
+                    code=error.code, message=error.message, errorStack=[]))
+            content = json.dumps(result)
+
+        response = Response()
+        response.status_code = code
+        response.reason = REASONS.get(code, "Error")
+        response.headers['Content-Type'] = "application/json"
+        response.encoding = 'utf-8'
+        response._content = content.encode('utf-8')
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        """Nothing to release."""
+        pass
+
+    def _link(self, path):
+        return "https://localhost/mgmt/tm/{}?ver={}".format(
+            path, self.version)
+
+    @staticmethod
+    def _kind(path, suffix="state"):
+        return "tm:{}:{}{}".format(
+            path.replace('/', ':'), path.split('/')[-1], suffix)
+
+    @staticmethod
+    def _token(key):
+        """Return the URI path element of an item key."""
+        if key.startswith('/'):
+            return '~' + key[1:].replace('/', '~')
+        return key
+
+    @staticmethod
+    def _key(path, props):
+        """Return the key of an item, its full path when partitioned."""
+        name = props.get('name')
+        if not name:
+            raise SimulatorError(400, "The name of the resource is required")
+        if path == 'sys/folder':
+            return "{}/{}".format(props.get('subPath', '/').rstrip('/'), name)
+        if 'partition' not in props:
+            return name
+        if props.get('subPath'):
+            return "/{}/{}/{}".format(
+                props['partition'], props['subPath'], name)
+        return "/{}/{}".format(props['partition'], name)
+
+    @staticmethod
+    def _lookup(path, container, token):
+        """Return the key of the item referred to by a URI path element."""
+        if token.startswith('~'):
+            key = '/' + token[1:].replace('~', '/')
+        elif path == 'sys/folder':
+            key = '/' + token
+        else:
+            key = token
+        if key in container:
+            return key
+
+        # Resources in a subPath, e.g. iApps, can be loaded by name.
+        parts = key.split('/')
+        if len(parts) == 3:
+            for (other, item) in container.items():
+                if item.props.get('partition') == parts[1] and \
+                        item.props.get('name') == parts[2]:
+                    return other
+        return key
+
+    def _handle(self, method, segments, query, body, transaction):
+        """Dispatch a request to the transactions or the resources."""
+        if segments == ['sys']:
+            return (200, dict(kind="tm:sys:syscollectionstate",
+                              selfLink=self._link('sys')))
+        if segments and segments[0] == 'transaction':
+            return self._handle_transaction(method, segments[1:], body)
+        if transaction and method != 'get':
+            return self._queue_command(
+                transaction, method, segments, query, body)
+        return self._dispatch(method, segments, query, body)
+
+    def _resolve(self, segments):
+        """Find the collection or item that a URI path refers to.
+
+        Returns a tuple of (collection path, URI path, container,
+        key, parent) where key is None for a collection.
+        """
+        for path in COLLECTIONS:
+            depth = path.count('/') + 1
+            if segments[:depth] == path.split('/'):
+                break
+        else:
+            raise SimulatorError(404, "Public URI path not registered")
+
+        link = path
+        container = self._collections[path]
+        parent = None
+        rest = segments[depth:]
+        while True:
+            if not rest:
+                return (path, link, container, None, parent)
+            key = self._lookup(path, container, rest[0])
+            link = "{}/{}".format(link, self._token(key))
+            if len(rest) == 1:
+                return (path, link, container, key, parent)
+            if key not in container:
+                raise SimulatorError(
+                    404, "Object not found: {}".format(key))
+            parent = container[key]
+            if rest[1] not in SUBCOLLECTIONS.get(path, []):
+                raise SimulatorError(404, "Public URI path not registered")
+            path = "{}/{}".format(path, rest[1])
+            link = "{}/{}".format(link, rest[1])
+            container = parent.subs[rest[1]]
+            rest = rest[2:]
+
+    def _dispatch(self, method, segments, query, body):
+        (path, link, container, key, parent) = self._resolve(segments)
+        expand = query.get('expandSubcollections') == 'true'
+
+        if key is None:
+            if method == 'get':
+                return (200, self._render_collection(
+                    path, link, container, query, expand))
+            if method == 'post':
+                (key, item) = self._create(path, container, parent,
+                                           body or {})
+                return (200, self._render(
+                    path, "{}/{}".format(link, self._token(key)), item,
+                    expand=True))
+            raise SimulatorError(400, "Method not allowed on a collection")
+
+        if key not in container:
+            raise SimulatorError(404, "Object not found: {}".format(key))
+        if method == 'get':
+            return (200, self._render(path, link, container[key], expand))
+        if method in ['put', 'patch']:
+            item = self._modify(path, container, key, body or {})
+            return (200, self._render(path, link, item, expand=True))
+        if method == 'delete':
+            self._delete(path, container, key)
+            return (200, dict())
+        raise SimulatorError(400, "Method not allowed")
+
+    def _render(self, path, link, item, expand=False):
+        """Return the JSON representation of an item."""
+        result = copy.deepcopy(item.props)
+        result['kind'] = self._kind(path)
+        result['selfLink'] = self._link(link)
+        for (sub, entries) in item.subs.items():
+            sub_link = "{}/{}".format(link, sub)
+            reference = dict(link=self._link(sub_link), isSubcollection=True)
+            if expand and entries:
+                reference['items'] = [
+                    self._render("{}/{}".format(path, sub),
+                                 "{}/{}".format(sub_link, self._token(key)),
+                                 entry, expand)
+                    for (key, entry) in entries.items()
+                ]
+            result[sub + 'Reference'] = reference
+        return result
+
+    def _render_collection(self, path, link, container, query, expand):
+        """Return the JSON representation of a collection."""
+        partition = None
+        if query.get('$filter', '').startswith('partition eq '):
+            partition = query['$filter'][len('partition eq '):]
+        select = None
+        if query.get('$select'):
+            select = query['$select'].split(',')
+
+        entries = [
+            (key, item) for (key, item) in container.items()
+            if not partition or item.props.get('partition') == partition
+        ]
+        total = len(entries)
+        top = int(query.get('$top', 0))
+        skip = int(query.get('$skip', 0))
+        if top or skip:
+            entries = entries[skip:skip + top if top else None]
+
+        items = list()
+        for (key, item) in entries:
+            entry = self._render(
+                path, "{}/{}".format(link, self._token(key)), item, expand)
+            if select:
+                entry = dict((k, v) for (k, v) in entry.items()
+                             if k in select)
+            items.append(entry)
+
+        result = dict(kind=self._kind(path, "collectionstate"),
+                      selfLink=self._link(link))
+        if top:
+            # The paging properties of an iControl REST collection.
+            result.update(currentItemCount=len(items),
+                          itemsPerPage=top,
+                          pageIndex=skip // top + 1,
+                          startIndex=skip + 1,
+                          totalItems=total,
+                          totalPages=(total + top - 1) // top)
+        if items:
+            result['items'] = items
+        return result
+
+    def _next_generation(self):
+        self._generation += 1
+        return self._generation
+
+    def _store(self, path, item, body):
+        """Write the properties and subcollections of a request body.
+
+        Like the BIG-IP, properties that are not in the body keep their
+        value, for a PUT as well as a PATCH.  A new item has the default
+        properties of its collection.
+        """
+        if not item.props:
+            item.props.update(copy.deepcopy(DEFAULTS.get(path, {})))
+        body = dict(body)
+        for sub in SUBCOLLECTIONS.get(path, []):
+            values = body.pop(sub, None)
+            reference = body.pop(sub + 'Reference', None)
+            if values is None and isinstance(reference, dict):
+                values = reference.get('items')
+            if values is None:
+                item.subs.setdefault(sub, OrderedDict())
+                continue
+
+            sub_path = "{}/{}".format(path, sub)
+            entries = OrderedDict()
+            for (index, value) in enumerate(values):
+                if not isinstance(value, dict):
+                    value = dict(name=value)
+                value = dict(value)
+                value.setdefault('name', str(index))
+                entry = _Item()
+                self._store(sub_path, entry, value)
+                entries[self._key(sub_path, entry.props)] = entry
+            item.subs[sub] = entries
+
+        for attr in READ_ONLY:
+            body.pop(attr, None)
+        for (attr, value) in body.items():
+            if value is None:
+                item.props.pop(attr, None)
+            else:
+                item.props[attr] = value
+
+        if path == 'ltm/node' and item.props.get('state') == 'user-up':
+            item.props['state'] = 'unchecked'
+        if path == 'ltm/policy':
+            item.props['status'] = \
+                'legacy' if item.props.get('legacy') else 'published'
+        item.props['generation'] = self._next_generation()
+
+    def _create(self, path, container, parent, body):
+        """Create an item in a collection."""
+        props = dict(body)
+        if parent is None and path != 'sys/folder':
+            props.setdefault('partition', "Common")
+            if '/' + props['partition'] not in \
+                    self._collections['sys/folder']:
+                raise SimulatorError(400, "Folder not found: /{}".format(
+                    props['partition']))
+        if path == 'sys/application/service':
+            props.setdefault('subPath', "{}.app".format(props.get('name')))
+
+        key = self._key(path, props)
+        if key in container:
+            raise SimulatorError(409, "The requested object ({}) already "
+                                 "exists.".format(key))
+
+        item = _Item()
+        self._store(path, item, props)
+        if key.startswith('/'):
+            item.props['fullPath'] = key
+        self._check_references(path, item)
+        container[key] = item
+        self._add_implicit(path, item)
+        return (key, item)
+
+    def _modify(self, path, container, key, body):
+        """Update the properties of an existing item."""
+        item = copy.deepcopy(container[key])
+        body = dict(body)
+        for attr in ['name', 'partition', 'subPath']:
+            body.pop(attr, None)
+        self._store(path, item, body)
+        self._check_references(path, item)
+        container[key] = item
+        self._add_implicit(path, item)
+        return item
+
+    def _delete(self, path, container, key):
+        """Delete an item that is no longer referenced."""
+        item = container[key]
+        reference = self._find_reference(path, item)
+        if reference:
+            raise SimulatorError(400, "{} is referenced by {}".format(
+                key, reference))
+        del container[key]
+
+        if path == 'ltm/virtual':
+            # Virtual addresses created for a virtual go with it.
+            vaddrs = self._collections['ltm/virtual-address']
+            vaddr_key = self._destination_key(item)
+            vaddr = vaddrs.get(vaddr_key)
+            if vaddr and vaddr.props.get('autoDelete') == 'true' and \
+                    not self._find_reference('ltm/virtual-address', vaddr):
+                del vaddrs[vaddr_key]
+
+    @staticmethod
+    def _destination_key(virtual):
+        """Return the key of the virtual address of a virtual server."""
+        destination = virtual.props.get('destination', '')
+        if destination.count('/') != 2:
+            return None
+        (_, partition, name) = destination.split('/')
+        return "/{}/{}".format(partition, _split_address(name))
+
+    def _members(self):
+        for pool in self._collections['ltm/pool'].values():
+            for member in pool.subs.get('members', {}).values():
+                yield (pool, member)
+
+    def _find_reference(self, path, item):
+        """Return the full path of a resource that references the item."""
+        full_path = item.props.get('fullPath')
+        if path == 'ltm/node':
+            for (pool, member) in self._members():
+                if member.props.get('partition') == \
+                        item.props.get('partition') and \
+                        member.props.get('address') == \
+                        item.props.get('address'):
+                    return pool.props['fullPath']
+        elif path == 'ltm/virtual-address':
+            for virtual in self._collections['ltm/virtual'].values():
+                if self._destination_key(virtual) == full_path:
+                    return virtual.props['fullPath']
+        elif path == 'ltm/pool':
+            for virtual in self._collections['ltm/virtual'].values():
+                if virtual.props.get('pool') == full_path:
+                    return virtual.props['fullPath']
+        elif path == 'sys/folder':
+            partition = item.props['name']
+            for collection in COLLECTIONS:
+                for other in self._collections[collection].values():
+                    if other.props.get('partition') == partition:
+                        return other.props.get('fullPath')
+        return None
+
+    def _check_references(self, path, item):
+        """Reject an item that references a pool that does not exist."""
+        pool = item.props.get('pool')
+        if path == 'ltm/virtual' and pool and \
+                pool not in self._collections['ltm/pool']:
+            raise SimulatorError(
+                400, "The requested pool ({}) was not found.".format(pool))
+
+    def _add_implicit(self, path, item):
+        """Create the nodes and virtual addresses that the BIG-IP would."""
+        if path == 'ltm/pool':
+            for member in item.subs['members'].values():
+                self._add_node(member)
+        elif path == 'ltm/pool/members':
+            self._add_node(item)
+        elif path == 'ltm/virtual':
+            key = self._destination_key(item)
+            vaddrs = self._collections['ltm/virtual-address']
+            if key and key not in vaddrs:
+                (_, partition, address) = key.split('/')
+                vaddrs[key] = _Item(dict(
+                    name=address, partition=partition, fullPath=key,
+                    address=address, autoDelete="true", enabled="yes",
+                    trafficGroup="/Common/traffic-group-1",
+                    generation=self._next_generation()))
+
+    def _add_node(self, member):
+        """Create the node of a pool member if it does not exist."""
+        address = _split_address(member.props['name'])
+        partition = member.props.get('partition', "Common")
+        member.props['address'] = address
+        key = "/{}/{}".format(partition, address)
+        nodes = self._collections['ltm/node']
+        if key not in nodes:
+            nodes[key] = _Item(dict(
+                name=address, partition=partition, fullPath=key,
+                address=address, state="unchecked", session="user-enabled",
+                generation=self._next_generation()))
+
+    def _handle_transaction(self, method, segments, body):
+        """Create, commit or inspect an iControl REST transaction."""
+        if not segments:
+            if method != 'post':
+                raise SimulatorError(400, "Method not allowed")
+            trans_id = self._next_transaction
+            self._next_transaction += 1
+            self._transactions[trans_id] = list()
+            return (200, self._render_transaction(trans_id, "STARTED"))
+
+        try:
+            trans_id = int(segments[0])
+        except ValueError:
+            raise SimulatorError(404, "Transaction not found")
+        if trans_id not in self._transactions:
+            raise SimulatorError(404, "Transaction not found")
+        if method == 'get':
+            return (200, self._render_transaction(trans_id, "STARTED"))
+        if method == 'delete':
+            del self._transactions[trans_id]
+            return (200, dict())
+        if method != 'patch' or (body or {}).get('state') != 'VALIDATING':
+            raise SimulatorError(400, "Invalid transaction request")
+
+        commands = self._transactions.pop(trans_id)
+        saved = (copy.deepcopy(self._collections), self._generation)
+        try:
+            for command in commands:
+                self._dispatch(*command)
+        except SimulatorError as error:
+            (self._collections, self._generation) = saved
+            raise SimulatorError(400, "Transaction failed: {}".format(
+                error.message))
+        if body.get('validateOnly'):
+            (self._collections, self._generation) = saved
+        return (200, self._render_transaction(trans_id, "COMPLETED"))
+
+    def _render_transaction(self, trans_id, state):
+        return dict(transId=trans_id, state=state, kind="tm:transactionstate",
+                    selfLink=self._link("transaction/{}".format(trans_id)))
+
+    def _queue_command(self, transaction, method, segments, query, body):
+        """Add a request to a transaction, to be run on commit."""
+        try:
+            commands = self._transactions[int(transaction)]
+        except (KeyError, ValueError):
+            raise SimulatorError(404, "Transaction not found")
+        commands.append((method, segments, query, body))
+        trans_link = "transaction/{}/commands/{}".format(
+            transaction, len(commands))
+        return (200, dict(
+            method=method.upper(), uri="/".join(segments), body=body,
+            commandId=len(commands), evalOrder=len(commands),
+            kind="tm:transaction:commandsstate",
+            selfLink=self._link(trans_link)))
+
+
+class SimulatedManagementRoot(ManagementRoot):
+    """A ManagementRoot that sends its requests to a BigIPSimulator."""
+
+    def __init__(self, simulator=None, latency=0.0, **kwargs):
+        """Connect to a new simulator, or to an existing one.
+
+        The simulator's request counters are available as test_rest_calls,
+        like those of an instrumented ManagementRoot.
+        """
+        if simulator is None:
+            simulator = BigIPSimulator(latency=latency)
+        self.simulator = simulator
+        super(SimulatedManagementRoot, self).__init__(
+            "bigip-simulator", "admin", "admin", **kwargs)
+        self.test_rest_calls = simulator.counters
+
+    def _get_icr_session(self, *args, **kwargs):
+        icr_session = super(SimulatedManagementRoot, self)._get_icr_session(
+            *args, **kwargs)
+        icr_session.session.mount("https://", self.simulator)
+        return icr_session
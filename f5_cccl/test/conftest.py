@@ -14,6 +14,9 @@
 # limitations under the License.
 #
 from f5_cccl import bigip
+from f5_cccl.api import F5CloudServiceManager
+from f5_cccl.test.bigip_simulator import SimulatedManagementRoot
+from f5_cccl.test.service_generator import make_service_config
 from f5.bigip import ManagementRoot
 import json
 from mock import Mock, patch
@@ -735,7 +738,7 @@ class MockBigIP(ManagementRoot):
 
     def partition_from_params(self, params): 
         """Extract partition name from the request params"""
-        return params.split("partition+eq+")[1].split("&expand")[0]
+        return params.split("partition+eq+")[1].split("&")[0]
 
     def create_mock_pool(self, name, **kwargs):
         """Create a mock pool server object."""
@@ -885,3 +888,12 @@ def bigip_proxy():
     bigip_proxy = bigip.BigIPProxy(mgmt_root, 'test')
 
     return bigip_proxy
+
+
+@pytest.fixture()
+def simulated_bigip():
+    mgmt_root = SimulatedManagementRoot()
+    mgmt_root.tm.sys.folders.folder.create(name="Test", subPath="/")
+    cccl = F5CloudServiceManager(mgmt_root, "Test")
+    assert cccl.apply_config(make_service_config("Test", 20)) == 0
+    return mgmt_root
@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+# Copyright 2017 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+u"""Generate CCCL service configurations of any size for benchmarks.
+
+A service is a virtual server with an explicit virtual address, a pool
+and its monitor, an L7 policy, an iRule and the internal data group the
+iRule looks up.  Every iapp_every-th service also has an iApp.  The
+monitors cycle through the four supported types.
+
+Churn profiles modify a copy of a configuration the way a controller
+would between two applies:
+
+    none            nothing changes
+    members-1pct    1% of the pool members move to a new address
+    pool-added      a pool is added
+    pool-removed    the last pool is removed, with the virtual server and
+                    the policy that reference it
+    policy-reorder  the rules of the first policy are reversed
+"""
+
+from copy import deepcopy
+import random
+
+
+MONITOR_TYPES = ['http', 'https', 'tcp', 'icmp']
+
+
+def _address(network, index):
+    return "10.{}.{}.{}".format(network, (index // 256) % 256, index % 256)
+
+
+def _monitor(partition, index):
+    monitor = {
+        'name': "monitor-{}".format(index),
+        'type': MONITOR_TYPES[index % len(MONITOR_TYPES)],
+        'interval': 5,
+        'timeout': 16
+    }
+    if monitor['type'] in ['http', 'https']:
+        monitor['send'] = "GET /health HTTP/1.0\\r\\n\\r\\n"
+        monitor['recv'] = "200 OK"
+    return monitor
+
+
+def _members(index, num_members):
+    first = index * num_members
+    return [
+        {'address': _address(1 + (first + m) // 65536, first + m),
+         'port': 8080,
+         'routeDomain': {'id': 0}}
+        for m in range(num_members)
+    ]
+
+
+def _policy(partition, index, num_rules):
+    pool = "/{}/pool-{}".format(partition, index)
+    rules = list()
+    for r in range(num_rules):
+        rules.append({
+            'name': "rule-{}".format(r),
+            'conditions': [{
+                'httpHost': True,
+                'host': True,
+                'equals': True,
+                'values': ["app{}.svc{}.example.com".format(r, index)]
+            }],
+            'actions': [{
+                'forward': True,
+                'request': True,
+                'pool': pool
+            }]
+        })
+    return {'name': "policy-{}".format(index),
+            'strategy': "/Common/first-match",
+            'rules': rules}
+
+
+def _iapp(index, members):
+    return {
+        'name': "iapp-{}".format(index),
+        'template': "/Common/f5.http",
+        'variables': {
+            'net__client_mode': "wan",
+            'net__server_mode': "lan",
+            'pool__addr': _address(250, index),
+            'pool__port': "80"
+        },
+        'poolMemberTable': {
+            'name': "pool__members",
+            'columns': [
+                {'name': "addr", 'kind': "IPAddress"},
+                {'name': "port", 'kind': "Port"},
+                {'name': "connection_limit", 'value': "0"}
+            ],
+            'members': members
+        }
+    }
+
+
+def make_service_config(partition, num_services, num_members=5,
+                        num_rules=5, num_records=20, iapp_every=10):
+    """Return a service configuration of num_services services.
+
+    Args:
+        partition: The managed partition.
+        num_services: The number of virtual servers.
+        num_members: The number of members in each pool.
+        num_rules: The number of rules in each L7 policy.
+        num_records: The number of records in each data group.
+        iapp_every: Add an iApp to every iapp_every-th service, 0 for none.
+    """
+    config = {
+        'virtualAddresses': [],
+        'virtualServers': [],
+        'pools': [],
+        'monitors': [],
+        'l7Policies': [],
+        'iRules': [],
+        'internalDataGroups': [],
+        'iapps': []
+    }
+
+    for i in range(num_services):
+        address = _address(0, i)
+        members = _members(i, num_members)
+
+        config['virtualAddresses'].append({
+            'name': address,
+            'address': address,
+            'enabled': "yes",
+            'autoDelete': "false"
+        })
+        config['monitors'].append(_monitor(partition, i))
+        config['pools'].append({
+            'name': "pool-{}".format(i),
+            'loadBalancingMode': "round-robin",
+            'monitors': ["/{}/monitor-{}".format(partition, i)],
+            'members': members
+        })
+        config['l7Policies'].append(_policy(partition, i, num_rules))
+        config['internalDataGroups'].append({
+            'name': "datagroup-{}".format(i),
+            'type': "string",
+            'records': [
+                {'name': "key-{}".format(r), 'data': "value-{}".format(r)}
+                for r in range(num_records)
+            ]
+        })
+        config['iRules'].append({
+            'name': "irule-{}".format(i),
+            'apiAnonymous': (
+                "when HTTP_REQUEST {{\n"
+                "  if {{ [class match [HTTP::host] equals "
+                "/{}/datagroup-{}] }} {{\n"
+                "    HTTP::redirect https://[HTTP::host][HTTP::uri]\n"
+                "  }}\n"
+                "}}".format(partition, i))
+        })
+        config['virtualServers'].append({
+            'name': "virtual-{}".format(i),
+            'destination': "/{}/{}:80".format(partition, address),
+            'ipProtocol': "tcp",
+            'pool': "/{}/pool-{}".format(partition, i),
+            'profiles': [
+                {'name': "http", 'partition': "Common", 'context': "all"},
+                {'name': "tcp", 'partition': "Common", 'context': "all"}
+            ],
+            'policies': [
+                {'name': "policy-{}".format(i), 'partition': partition}
+            ],
+            'iRules': ["/{}/irule-{}".format(partition, i)],
+            'enabled': True,
+            'vlansEnabled': True,
+            'sourceAddressTranslation': {'type': "automap"}
+        })
+        if iapp_every and i % iapp_every == 0:
+            config['iapps'].append(_iapp(i, deepcopy(members)))
+
+    return config
+
+
+def _churn_members(config, rand):
+    members = [m for p in config['pools'] for m in p['members']]
+    changed = rand.sample(range(len(members)),
+                          max(1, len(members) // 100))
+    for (count, index) in enumerate(sorted(changed)):
+        members[index]['address'] = _address(200, count)
+
+
+def _churn_pool_added(config, rand):
+    config['pools'].append({
+        'name': "pool-added",
+        'monitors': [],
+        'members': [{'address': _address(201, m), 'port': 80}
+                    for m in range(rand.randint(1, 5))]
+    })
+
+
+def _churn_pool_removed(config, rand):
+    pool = config['pools'].pop()
+    path = "/{}".format(pool['name'])
+
+    def _forwards(policy):
+        return any(action.get('pool', '').endswith(path)
+                   for rule in policy['rules']
+                   for action in rule['actions'])
+
+    config['virtualServers'] = [
+        v for v in config['virtualServers']
+        if not v.get('pool', '').endswith(path)
+    ]
+    config['l7Policies'] = [
+        p for p in config['l7Policies'] if not _forwards(p)
+    ]
+
+
+def _churn_policy_reorder(config, rand):
+    if config['l7Policies']:
+        config['l7Policies'][0]['rules'].reverse()
+
+
+CHURN_PROFILES = {
+    'none': lambda config, rand: None,
+    'members-1pct': _churn_members,
+    'pool-added': _churn_pool_added,
+    'pool-removed': _churn_pool_removed,
+    'policy-reorder': _churn_policy_reorder
+}
+
+
+def churn(config, profile, seed=0):
+    """Return a copy of the configuration changed by a churn profile."""
+    changed = deepcopy(config)
+    CHURN_PROFILES[profile](changed, random.Random(seed))
+    return changed
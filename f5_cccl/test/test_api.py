@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# Copyright 2017 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import pytest
+
+from f5_cccl.api import F5CloudServiceManager
+from f5_cccl.api import F5MultiPartitionServiceManager
+from f5_cccl.bigip import BigIPProxy
+from f5_cccl.exceptions import F5CcclApplyConfigError
+from f5_cccl.exceptions import F5CcclError
+from f5_cccl.test.service_generator import make_service_config
+
+
+def test_stream_collections_service_managers(simulated_bigip):
+    """The managers create the streamed collections' resources."""
+    bigip = simulated_bigip
+    config = make_service_config("Test", 20)
+    cccl = F5CloudServiceManager(bigip, "Test", stream_collections=True)
+    multi = F5MultiPartitionServiceManager(bigip, ["Test"],
+                                           stream_collections=True)
+    assert cccl._bigip_proxy._stream_collections
+    assert multi._bigip_proxy.get_proxy("Test")._stream_collections
+
+    # The BIG-IP is already configured, nothing is deployed.
+    bigip.simulator.reset_counters()
+    assert cccl.apply_config(config) == 0
+    assert multi.apply_config({"Test": config}) == {"Test": 0}
+    assert bigip.simulator.counters['post'] == 0
+    assert bigip.simulator.counters['patch'] == 0
+    assert bigip.simulator.counters['put'] == 0
+
+
+def test_selected_pages_service_managers(simulated_bigip):
+    """The managers retrieve the selected properties in pages."""
+    bigip = simulated_bigip
+    config = make_service_config("Test", 20)
+    options = dict(page_size=7, page_workers=3, select_properties=True)
+    cccl = F5CloudServiceManager(bigip, "Test", **options)
+    multi = F5MultiPartitionServiceManager(bigip, ["Test"], **options)
+
+    bigip.simulator.reset_counters()
+    assert cccl.apply_config(config) == 0
+    assert multi.apply_config({"Test": config}) == {"Test": 0}
+    assert bigip.simulator.counters['post'] == 0
+    assert bigip.simulator.counters['patch'] == 0
+
+    fresh = BigIPProxy(bigip, "Test")
+    fresh.refresh()
+    for proxy in [cccl._bigip_proxy, multi._bigip_proxy.get_proxy("Test")]:
+        assert proxy._select_properties
+        assert (proxy._page_size, proxy._page_workers) == (7, 3)
+        assert proxy.get_pools() == fresh.get_pools()
+        assert proxy.get_virtuals() == fresh.get_virtuals()
+
+
+def test_skip_unchanged_service_managers(simulated_bigip):
+    """The managers retrieve only the collections that changed."""
+    bigip = simulated_bigip
+    config = make_service_config("Test", 20)
+    cccl = F5CloudServiceManager(bigip, "Test", skip_unchanged=True)
+    multi = F5MultiPartitionServiceManager(bigip, ["Test"],
+                                           skip_unchanged=True)
+    proxies = [cccl._bigip_proxy, multi._bigip_proxy.get_proxy("Test")]
+
+    assert cccl.apply_config(config) == 0
+    assert multi.apply_config({"Test": config}) == {"Test": 0}
+    pools = [proxy.get_pools() for proxy in proxies]
+
+    # The same configuration in another order is applied again, from
+    # the caches of the unchanged collections.
+    for key in ['virtualServers', 'pools']:
+        config[key].reverse()
+    assert cccl.apply_config(config) == 0
+    assert multi.apply_config({"Test": config}) == {"Test": 0}
+    assert all(proxy.get_pools() is cached
+               for (proxy, cached) in zip(proxies, pools))
+
+
+def test_multi_partition_service_manager(simulated_bigip):
+    """The configurations of several partitions are applied together."""
+    bigip = simulated_bigip
+    for partition in ["Test2", "Test3"]:
+        bigip.tm.sys.folders.folder.create(name=partition, subPath="/")
+    cccl = F5MultiPartitionServiceManager(
+        bigip, ["Test", "Test2", "Test3"], apply_workers=3)
+    assert cccl.get_partitions() == ["Test", "Test2", "Test3"]
+
+    services = dict(
+        (partition, make_service_config(partition, 10))
+        for partition in ["Test", "Test2", "Test3"])
+    assert cccl.apply_config(services) == {"Test": 0, "Test2": 0, "Test3": 0}
+    for partition in ["Test", "Test2", "Test3"]:
+        proxy = BigIPProxy(bigip, partition)
+        proxy.refresh()
+        assert len(proxy.get_pools()) == 10
+        assert len(proxy.get_virtuals()) == 10
+
+    # The other partitions are left as they are.
+    assert cccl.apply_config({"Test2": {}}) == {"Test2": 0}
+    for (partition, size) in [("Test", 10), ("Test2", 0), ("Test3", 10)]:
+        proxy = BigIPProxy(bigip, partition)
+        proxy.refresh()
+        assert len(proxy.get_pools()) == size
+
+    with pytest.raises(F5CcclApplyConfigError):
+        cccl.apply_config({"Test4": {}})
+
+
+def test_multi_partition_transactions(simulated_bigip):
+    """The partitions are deployed in transactions one at a time."""
+    bigip = simulated_bigip
+    bigip.tm.sys.folders.folder.create(name="Test2", subPath="/")
+
+    # An open transaction would take in the requests of the others.
+    with pytest.raises(F5CcclError):
+        F5MultiPartitionServiceManager(
+            bigip, ["Test", "Test2"], direct_updates=True,
+            transaction_size=10, apply_workers=2)
+
+    cccl = F5MultiPartitionServiceManager(
+        bigip, ["Test", "Test2"], direct_updates=True, transaction_size=10)
+    services = dict(
+        (partition, make_service_config(partition, 10))
+        for partition in ["Test", "Test2"])
+    assert cccl.apply_config(services) == {"Test": 0, "Test2": 0}
+    for partition in ["Test", "Test2"]:
+        proxy = BigIPProxy(bigip, partition)
+        proxy.refresh()
+        assert len(proxy.get_pools()) == 10
+        assert len(proxy.get_virtuals()) == 10
+
+
+def test_apply_config_async(simulated_bigip):
+    """Configurations are applied by an executor of an event loop."""
+    asyncio = pytest.importorskip("asyncio")
+    bigip = simulated_bigip
+    bigip.tm.sys.folders.folder.create(name="Test2", subPath="/")
+    managers = [F5CloudServiceManager(bigip, partition)
+                for partition in ["Test", "Test2"]]
+    multi = F5MultiPartitionServiceManager(bigip, ["Test", "Test2"])
+
+    loop = asyncio.new_event_loop()
+    try:
+        futures = [
+            cccl.apply_config_async(
+                make_service_config(cccl.get_partition(), 10), loop=loop)
+            for cccl in managers]
+        assert loop.run_until_complete(asyncio.gather(*futures)) == [0, 0]
+        for partition in ["Test", "Test2"]:
+            proxy = BigIPProxy(bigip, partition)
+            proxy.refresh()
+            assert len(proxy.get_pools()) == 10
+
+        future = multi.apply_config_async({"Test2": {}}, loop=loop)
+        assert loop.run_until_complete(future) == {"Test2": 0}
+        proxy = BigIPProxy(bigip, "Test2")
+        proxy.refresh()
+        assert not proxy.get_pools()
+    finally:
+        loop.close()
+
+
+def test_apply_config_async_transactions(simulated_bigip):
+    """Managers of one session deploy in transactions one at a time."""
+    asyncio = pytest.importorskip("asyncio")
+    bigip = simulated_bigip
+    bigip.tm.sys.folders.folder.create(name="Test2", subPath="/")
+    managers = [F5CloudServiceManager(bigip, partition, direct_updates=True,
+                                      transaction_size=5)
+                for partition in ["Test", "Test2"]]
+
+    def _apply():
+        futures.extend(
+            cccl.apply_config_async(
+                make_service_config(cccl.get_partition(), 10))
+            for cccl in managers)
+
+    # The futures are created by the running loop.
+    futures = list()
+    loop = asyncio.new_event_loop()
+    try:
+        loop.call_soon(_apply)
+        loop.run_until_complete(asyncio.sleep(0))
+        assert loop.run_until_complete(asyncio.gather(*futures)) == [0, 0]
+    finally:
+        loop.close()
+
+    for partition in ["Test", "Test2"]:
+        proxy = BigIPProxy(bigip, partition)
+        proxy.refresh()
+        assert len(proxy.get_pools()) == 10
+        assert len(proxy.get_virtuals()) == 10
+
+
+def test_apply_config_async_without_loop(simulated_bigip):
+    """A configuration is not applied without an event loop."""
+    pytest.importorskip("asyncio")
+    cccl = F5CloudServiceManager(simulated_bigip, "Test")
+
+    with pytest.raises(RuntimeError):
+        cccl.apply_config_async(make_service_config("Test", 10))
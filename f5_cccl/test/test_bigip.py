@@ -13,10 +13,23 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import time
+
+from f5.sdk_exception import F5SDKError
+from mock import Mock
+import pytest
+
+import f5_cccl.bigip as bigip_module
+from f5_cccl.api import F5CloudServiceManager
+from f5_cccl.bigip import BigIPProxy
+from f5_cccl.bigip_multi import MultiPartitionBigIPProxy
+from f5_cccl.exceptions import F5CcclCacheRefreshError
+from f5_cccl.resource.ltm.pool import ApiPool
 from f5_cccl.resource.ltm.pool import IcrPool
 from f5_cccl.resource.ltm.virtual import VirtualServer
 from f5_cccl.resource.ltm.node import Node
 from f5_cccl.resource.ltm.app_service import IcrApplicationService
+from f5_cccl.test.service_generator import make_service_config
 
 
 def test_bigip_refresh(bigip_proxy):
@@ -113,3 +126,456 @@ def test_bigip_properties(bigip_proxy):
     https_hc = big_ip.get_https_monitors()
     tcp_hc = big_ip.get_tcp_monitors()
     icmp_hc = big_ip.get_icmp_monitors()
+
+
+def test_bigip_shared_resources(bigip_proxy):
+    """Managed virtuals and pools are created once."""
+    bigip_proxy.refresh()
+
+    virtuals = bigip_proxy.get_virtuals()
+    all_virtuals = bigip_proxy.get_virtuals(all_virtuals=True)
+    assert virtuals
+    assert all(virtuals[name] is all_virtuals[name] for name in virtuals)
+
+    pools = bigip_proxy.get_pools()
+    all_pools = bigip_proxy.get_pools(all_pools=True)
+    assert pools
+    assert all(pools[name] is all_pools[name] for name in pools)
+
+
+def test_bigip_virtual_address_references(bigip_proxy):
+    """Virtual addresses are referenced by the virtual destinations."""
+    bigip_proxy.refresh()
+
+    vaddrs = dict((name, Mock()) for name in ['10.190.6.7', '10.190.6.8'])
+    bigip_proxy._virtual_addresses = vaddrs
+    (referenced, unreferenced) = \
+        bigip_proxy.get_virtual_address_references()
+
+    assert referenced == {'10.190.6.7': vaddrs['10.190.6.7']}
+    assert unreferenced == {'10.190.6.8': vaddrs['10.190.6.8']}
+
+
+def test_bigip_concurrent_refresh(bigip_proxy):
+    """Test BIG-IP refresh with concurrent collection retrieval."""
+    big_ip = bigip_proxy.mgmt_root()
+
+    bigip_proxy.refresh()
+    sequential_pools = bigip_proxy.get_pools()
+    sequential_virtuals = bigip_proxy.get_virtuals()
+    sequential_nodes = bigip_proxy.get_nodes()
+
+    concurrent_proxy = BigIPProxy(big_ip, 'test', refresh_workers=4)
+    concurrent_proxy.refresh()
+
+    assert concurrent_proxy.get_pools() == sequential_pools
+    assert concurrent_proxy.get_virtuals() == sequential_virtuals
+    assert concurrent_proxy.get_nodes() == sequential_nodes
+    assert (concurrent_proxy.get_iapps().keys() ==
+            bigip_proxy.get_iapps().keys())
+
+    # Each collection retrieval is timed.
+    timings = concurrent_proxy.get_refresh_timings()
+    assert len(timings) == 12
+    for key in ['virtuals', 'pools', 'policies', 'nodes', 'http_monitors']:
+        assert timings[key] >= 0
+
+
+def test_bigip_concurrent_refresh_error(bigip_proxy):
+    """Test that a failed concurrent retrieval fails the refresh."""
+    big_ip = bigip_proxy.mgmt_root()
+    big_ip.tm.ltm.nodes.get_collection = Mock(
+        side_effect=F5SDKError("Failed to get nodes"))
+
+    concurrent_proxy = BigIPProxy(big_ip, 'test', refresh_workers=4)
+    with pytest.raises(F5CcclCacheRefreshError):
+        concurrent_proxy.refresh()
+
+
+def test_bigip_partial_refresh(bigip_proxy):
+    """Test that a partial refresh only retrieves the given collections."""
+    big_ip = bigip_proxy.mgmt_root()
+    bigip_proxy.refresh()
+    pools = bigip_proxy.get_pools()
+
+    big_ip.tm.ltm.pools.get_collection.reset_mock()
+    big_ip.tm.ltm.nodes.get_collection.reset_mock()
+    bigip_proxy.refresh(['nodes', 'virtual_addresses'])
+
+    assert big_ip.tm.ltm.nodes.get_collection.called
+    assert not big_ip.tm.ltm.pools.get_collection.called
+    assert bigip_proxy.get_pools() == pools
+    assert 'nodes' in bigip_proxy.get_refresh_timings()
+
+
+def test_bigip_cache_resource(bigip_proxy):
+    """Test adding and removing resources from the proxy cache."""
+    bigip_proxy.refresh()
+    pool = ApiPool(name="pool-cached", partition="test", members=list())
+
+    assert bigip_proxy.cache_resource(pool)
+    assert bigip_proxy.get_pools()['pool-cached'] is pool
+    assert bigip_proxy.get_pools(True)['pool-cached'] is pool
+
+    assert bigip_proxy.uncache_resource(pool)
+    assert 'pool-cached' not in bigip_proxy.get_pools()
+    assert 'pool-cached' not in bigip_proxy.get_pools(True)
+
+    # The state of an iApp is not known until the BIG-IP is read back.
+    iapp = list(bigip_proxy.get_app_svcs().values())[0]
+    assert not bigip_proxy.cache_resource(iapp)
+    assert not bigip_proxy.uncache_resource(iapp)
+
+
+def test_bigip_change_marker(bigip_proxy):
+    """Test the marker of the state of the managed partition."""
+    big_ip = bigip_proxy.mgmt_root()
+
+    marker = bigip_proxy.get_change_marker()
+    assert marker == bigip_proxy.get_change_marker()
+    assert len(marker) == 12
+
+    # Only the names and generations are retrieved.
+    args, kwargs = big_ip.tm.ltm.pools.get_collection.call_args
+    assert "$select=name,generation,membersReference" in \
+        kwargs['requests_params']['params']
+
+    # A modified resource changes the marker.
+    pools = [p for p in big_ip.bigip_data['pools']
+             if p['partition'] == 'test']
+    pools[0]['generation'] = pools[0].get('generation', 0) + 100000
+    modified = bigip_proxy.get_change_marker()
+    assert modified != marker
+
+    # So does a deleted one.
+    big_ip.bigip_data['pools'].remove(pools[-1])
+    assert bigip_proxy.get_change_marker() != modified
+
+
+def test_bigip_change_marker_selected_items():
+    """Test the marker of items the F5 SDK returned as dicts."""
+    items = [
+        {'name': 'pool1', 'generation': 3,
+         'membersReference': {'items': [{'generation': 7}]}},
+        Mock(raw={'name': 'pool2', 'generation': 5})]
+
+    assert BigIPProxy._collection_marker(items) == (3, 7)
+
+
+def test_bigip_change_marker_error(bigip_proxy):
+    """Test that a failure to retrieve the marker is reported."""
+    big_ip = bigip_proxy.mgmt_root()
+    big_ip.tm.ltm.pools.get_collection = Mock(
+        side_effect=F5SDKError("Failed to get pools"))
+
+    with pytest.raises(F5CcclCacheRefreshError):
+        bigip_proxy.get_change_marker()
+
+
+def test_bigip_node_addresses(bigip_proxy):
+    """Test the index of node names by address."""
+    bigip_proxy.refresh()
+    node_addresses = bigip_proxy.get_node_addresses()
+    assert node_addresses['1.2.3.4'] == ['1.2.3.4']
+    assert node_addresses['10.2.3.5'] == ['10.2.3.5%0']
+
+    node = Node('10.2.3.6', 'test', address='10.2.3.6')
+    bigip_proxy.cache_resource(node)
+    assert bigip_proxy.get_node_addresses()['10.2.3.6'] == ['10.2.3.6']
+
+    bigip_proxy.uncache_resource(node)
+    assert bigip_proxy.get_node_addresses()['10.2.3.6'] == []
+
+
+def test_bigip_direct_updates(bigip_proxy):
+    """Test that the locations of resources are recorded on request."""
+    big_ip = bigip_proxy.mgmt_root()
+    bigip_proxy.refresh()
+    pool = list(bigip_proxy.get_pools().values())[0]
+    assert pool.self_link is None
+
+    direct_proxy = BigIPProxy(big_ip, 'test', direct_updates=True)
+    direct_proxy.refresh()
+    pool = direct_proxy.get_pools()[pool.name]
+    assert pool.self_link.startswith("https://localhost/mgmt/tm/ltm/pool/")
+
+    # iApps are always loaded before they are updated.
+    for iapp in direct_proxy.get_app_svcs().values():
+        assert iapp.self_link is None
+
+
+def _assert_same_caches(proxy, other):
+    for getter in ['get_pools', 'get_virtuals', 'get_virtual_addresses',
+                   'get_l7policies', 'get_irules', 'get_nodes',
+                   'get_internal_data_groups', 'get_app_svcs']:
+        assert getattr(proxy, getter)() == getattr(other, getter)()
+    for hm_type in ['http', 'https', 'tcp', 'icmp']:
+        assert proxy.get_monitors(hm_type) == other.get_monitors(hm_type)
+
+
+def test_bigip_stream_collections(simulated_bigip):
+    """Streamed collections are cached as those retrieved by the SDK."""
+    bigip = simulated_bigip
+    proxy = BigIPProxy(bigip, "Test")
+    proxy.refresh()
+    streamed = BigIPProxy(bigip, "Test", stream_collections=True)
+    bigip.simulator.reset_counters()
+    streamed.refresh()
+
+    assert len(streamed.get_pools()) == 20
+    assert streamed.get_pools() == proxy.get_pools()
+    assert streamed.get_virtuals() == proxy.get_virtuals()
+    assert streamed.get_virtuals(all_virtuals=True) == \
+        proxy.get_virtuals(all_virtuals=True)
+    assert streamed.get_virtual_address_references() == \
+        proxy.get_virtual_address_references()
+    assert bigip.simulator.counters['get'] == len(proxy._collections())
+
+
+def test_bigip_stream_collections_error(simulated_bigip, monkeypatch):
+    """A streamed collection that cannot be decoded fails the refresh."""
+    bigip = simulated_bigip
+    session = bigip._meta_data['icr_session']
+    monkeypatch.setattr(session, 'get',
+                        Mock(return_value=Mock(text='{"items": [{')))
+
+    streamed = BigIPProxy(bigip, "Test", stream_collections=True)
+    with pytest.raises(F5CcclCacheRefreshError):
+        streamed.refresh(['pools'])
+
+
+def test_bigip_stream_collections_timings(simulated_bigip, monkeypatch):
+    """The decoding of a streamed collection is part of its retrieval."""
+    iter_collection_items = bigip_module.iter_collection_items
+
+    def _iter_slowly(text, properties=None):
+        for item in iter_collection_items(text, properties):
+            time.sleep(0.005)
+            yield item
+
+    monkeypatch.setattr(bigip_module, 'iter_collection_items',
+                        _iter_slowly)
+    streamed = BigIPProxy(simulated_bigip, "Test", stream_collections=True)
+    streamed.refresh(['pools'])
+    assert streamed.get_refresh_timings()['pools'] >= 20 * 0.005
+
+
+def test_bigip_stream_collections_consumed(simulated_bigip, monkeypatch):
+    """Each streamed item is consumed before the next one is decoded."""
+    iter_collection_items = bigip_module.iter_collection_items
+    collection_item = bigip_module.CollectionItem
+    events = list()
+
+    def _iter_recorded(text, properties=None):
+        for item in iter_collection_items(text, properties):
+            events.append('decoded')
+            yield item
+
+    def _item_recorded(raw):
+        events.append('consumed')
+        return collection_item(raw)
+
+    monkeypatch.setattr(bigip_module, 'iter_collection_items',
+                        _iter_recorded)
+    monkeypatch.setattr(bigip_module, 'CollectionItem', _item_recorded)
+    streamed = BigIPProxy(simulated_bigip, "Test", stream_collections=True)
+    streamed.refresh(['pools'])
+    assert len(events) >= 2
+    assert events == ['decoded', 'consumed'] * (len(events) // 2)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+@pytest.mark.parametrize("page_workers", [1, 3])
+def test_bigip_paged_refresh(simulated_bigip, stream, page_workers):
+    """Collections retrieved in pages are cached as a whole."""
+    bigip = simulated_bigip
+    proxy = BigIPProxy(bigip, "Test")
+    proxy.refresh()
+
+    paged = BigIPProxy(bigip, "Test", stream_collections=stream,
+                       page_size=7, page_workers=page_workers)
+    bigip.simulator.reset_counters()
+    paged.refresh()
+
+    # The 20 pools, virtuals, policies, iRules, data groups and virtual
+    # addresses and the 100 nodes in pages of 7, a single page of each
+    # of the 4 monitor collections and the iApps.
+    assert bigip.simulator.counters['get'] == 6 * 3 + 15 + 5
+
+    assert len(paged.get_pools()) == 20
+    _assert_same_caches(paged, proxy)
+    assert paged.get_change_marker() == proxy.get_change_marker()
+
+
+def test_bigip_concurrent_pages(simulated_bigip, monkeypatch):
+    """Each item of concurrently retrieved pages is retrieved once."""
+    bigip = simulated_bigip
+    nodes = bigip.tm.ltm.nodes
+    proxy = BigIPProxy(bigip, "Test")
+    expected = sorted(n.name for n in proxy._get_items(nodes, "")[0])
+    assert len(expected) > 50
+
+    # The pages are not retrieved with the shared collection object.
+    monkeypatch.setattr(nodes, 'get_collection', Mock())
+    paged = BigIPProxy(bigip, "Test", page_size=3, page_workers=8)
+    items = paged._get_pages(nodes, "")
+    assert not nodes.get_collection.called
+    assert sorted(n.name for n in items) == expected
+    assert all(n.selfLink.startswith("https://localhost/mgmt/tm/ltm/node/")
+               for n in items)
+
+
+def test_bigip_paged_refresh_without_total(simulated_bigip, monkeypatch):
+    """Pages are retrieved until one is not full without totalItems."""
+    bigip = simulated_bigip
+    proxy = BigIPProxy(bigip, "Test")
+    proxy.refresh()
+
+    get_items = BigIPProxy._get_items
+
+    def _get_items(self, collection, query, stream=False, paged=False):
+        return (get_items(self, collection, query, stream, paged)[0], None)
+
+    monkeypatch.setattr(BigIPProxy, '_get_items', _get_items)
+    paged = BigIPProxy(bigip, "Test", page_size=10)
+    bigip.simulator.reset_counters()
+    paged.refresh()
+
+    _assert_same_caches(paged, proxy)
+    # The last page of each collection is empty or not full.
+    assert bigip.simulator.counters['get'] == 6 * 3 + 11 + 5
+
+
+def test_bigip_select_properties(simulated_bigip):
+    """The selected properties are enough to create the resources."""
+    bigip = simulated_bigip
+    proxy = BigIPProxy(bigip, "Test")
+    proxy.refresh()
+
+    selected = BigIPProxy(bigip, "Test", select_properties=True)
+    assert selected._selection('pools') == [
+        'appService', 'description', 'generation', 'kind',
+        'loadBalancingMode', 'membersReference', 'monitor', 'name',
+        'partition', 'selfLink']
+    assert 'policies' not in selected._selection('virtuals')
+    assert 'policiesReference' in selected._selection('virtuals')
+    assert selected._selection('nodes') is None
+
+    selected.refresh()
+    _assert_same_caches(selected, proxy)
+
+    streamed = BigIPProxy(bigip, "Test", select_properties=True,
+                          stream_collections=True)
+    streamed.refresh()
+    _assert_same_caches(streamed, proxy)
+
+
+def test_bigip_skip_unchanged(simulated_bigip):
+    """Only the collections that changed are retrieved again."""
+    bigip = simulated_bigip
+    proxy = BigIPProxy(bigip, "Test", skip_unchanged=True)
+    num_collections = len(proxy._collections())
+    proxy.refresh()
+    pools = proxy.get_pools()
+    virtuals = proxy.get_virtuals()
+
+    # Nothing changed, only the markers are retrieved.
+    bigip.simulator.reset_counters()
+    proxy.refresh()
+    assert bigip.simulator.counters['get'] == num_collections
+    assert proxy.get_pools() is pools
+    assert proxy.get_virtuals() is virtuals
+
+    # A pool member changed.
+    pool = bigip.tm.ltm.pools.pool.load(name="pool-3", partition="Test")
+    member = pool.members_s.members.load(name="10.1.0.15:8080",
+                                         partition="Test")
+    member.modify(ratio=5)
+    bigip.simulator.reset_counters()
+    proxy.refresh()
+    assert bigip.simulator.counters['get'] == num_collections + 1
+    assert proxy.get_pools() is not pools
+    assert proxy.get_virtuals() is virtuals
+    members = proxy.get_pools()['pool-3'].members
+    assert [m.data['ratio'] for m in members if
+            m.name == "10.1.0.15%3A8080"] == [5]
+    fresh = BigIPProxy(bigip, "Test")
+    fresh.refresh()
+    _assert_same_caches(proxy, fresh)
+
+    # A cached resource is replaced, its collection is retrieved again.
+    proxy.cache_resource(proxy.get_virtuals()['virtual-0'])
+    bigip.simulator.reset_counters()
+    proxy.refresh(['virtuals', 'pools'])
+    assert bigip.simulator.counters['get'] == 2 + 1
+    assert proxy.get_virtuals() is not virtuals
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_multi_partition_refresh(simulated_bigip, stream):
+    """Each collection is retrieved once for all the partitions."""
+    bigip = simulated_bigip
+    bigip.tm.sys.folders.folder.create(name="Test2", subPath="/")
+    cccl = F5CloudServiceManager(bigip, "Test2")
+    assert cccl.apply_config(make_service_config("Test2", 5)) == 0
+
+    proxy = MultiPartitionBigIPProxy(bigip, ["Test2", "Test"],
+                                     stream_collections=stream)
+    assert proxy.get_partitions() == ["Test", "Test2"]
+    bigip.simulator.reset_counters()
+    proxy.refresh()
+    assert bigip.simulator.counters['get'] == len(
+        proxy.get_proxy("Test")._collections())
+
+    for (partition, size) in [("Test", 20), ("Test2", 5)]:
+        fresh = BigIPProxy(bigip, partition)
+        fresh.refresh()
+        assert len(proxy.get_proxy(partition).get_pools()) == size
+        _assert_same_caches(proxy.get_proxy(partition), fresh)
+
+    # Only the requested collections are retrieved.
+    bigip.simulator.reset_counters()
+    proxy.refresh(['nodes'])
+    assert bigip.simulator.counters['get'] == 1
+
+
+def test_multi_partition_skip_unchanged(simulated_bigip):
+    """The refresh of all partitions skips the unchanged collections."""
+    bigip = simulated_bigip
+    bigip.tm.sys.folders.folder.create(name="Test2", subPath="/")
+    cccl = F5CloudServiceManager(bigip, "Test2")
+    assert cccl.apply_config(make_service_config("Test2", 5)) == 0
+
+    proxy = MultiPartitionBigIPProxy(bigip, ["Test", "Test2"],
+                                     skip_unchanged=True)
+    num_collections = len(proxy.get_proxy("Test")._collections())
+    proxy.refresh()
+    pools = proxy.get_proxy("Test").get_pools()
+
+    # Nothing changed, only the markers are retrieved.
+    bigip.simulator.reset_counters()
+    proxy.refresh()
+    assert bigip.simulator.counters['get'] == num_collections
+    assert proxy.get_proxy("Test").get_pools() is pools
+
+    # A change in one partition refreshes the collection of all of them.
+    assert cccl.apply_config(make_service_config("Test2", 4)) == 0
+    bigip.simulator.reset_counters()
+    proxy.refresh()
+    assert bigip.simulator.counters['get'] > num_collections
+    assert len(proxy.get_proxy("Test2").get_pools()) == 4
+    pools = proxy.get_proxy("Test").get_pools()
+    assert len(pools) == 20
+
+    # The cache of one partition was changed, its collection is
+    # retrieved again.
+    test2 = proxy.get_proxy("Test2")
+    test2.cache_resource(test2.get_virtuals()['virtual-0'])
+    bigip.simulator.reset_counters()
+    proxy.refresh()
+    assert bigip.simulator.counters['get'] == num_collections + 1
+    assert proxy.get_proxy("Test").get_pools() is pools
+    for partition in ["Test", "Test2"]:
+        fresh = BigIPProxy(bigip, partition)
+        fresh.refresh()
+        _assert_same_caches(proxy.get_proxy(partition), fresh)
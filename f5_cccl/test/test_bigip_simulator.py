@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# Copyright 2017 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from time import time
+
+from icontrol.exceptions import iControlUnexpectedHTTPError
+import pytest
+
+from f5_cccl.api import F5CloudServiceManager
+from f5_cccl.test.bigip_simulator import SimulatedManagementRoot
+
+
+def _service_config(num_members=3):
+    return {
+        'virtualServers': [{
+            'name': "vs0",
+            'destination': "/Test/10.0.0.1:80",
+            'ipProtocol': "tcp",
+            'pool': "/Test/pool0",
+            'profiles': [
+                {'name': "tcp", 'partition': "Common", 'context': "all"}
+            ],
+            'enabled': True,
+            'vlansEnabled': True,
+            'sourceAddressTranslation': {'type': "automap"}
+        }],
+        'pools': [{
+            'name': "pool0",
+            'monitors': ["/Common/http"],
+            'members': [
+                {'address': "172.16.0.{}".format(i), 'port': 8080}
+                for i in range(num_members)
+            ]
+        }]
+    }
+
+
+def _writes(counters):
+    return sum(counters[m] for m in ['post', 'put', 'patch', 'delete'])
+
+
+@pytest.fixture()
+def bigip():
+    mgmt_root = SimulatedManagementRoot()
+    mgmt_root.tm.sys.folders.folder.create(name="Test", subPath="/")
+    mgmt_root.simulator.reset_counters()
+    return mgmt_root
+
+
+def test_apply_config(bigip):
+    """Apply a service config and apply it again unchanged."""
+    cccl = F5CloudServiceManager(bigip, "Test")
+    assert cccl.apply_config(_service_config()) == 0
+
+    pool = bigip.tm.ltm.pools.pool.load(
+        name="pool0", partition="Test",
+        requests_params={'params': "expandSubcollections=true"})
+    assert len(pool.membersReference['items']) == 3
+
+    # The BIG-IP creates the nodes and the virtual address.
+    nodes = bigip.tm.ltm.nodes.get_collection()
+    assert sorted(n.name for n in nodes) == \
+        ["172.16.0.0", "172.16.0.1", "172.16.0.2"]
+    assert all(n.state == "unchecked" for n in nodes)
+    vaddrs = bigip.tm.ltm.virtual_address_s.get_collection()
+    assert [v.name for v in vaddrs] == ["10.0.0.1"]
+
+    bigip.simulator.reset_counters()
+    assert cccl.apply_config(_service_config()) == 0
+    assert _writes(bigip.test_rest_calls) == 0
+    assert bigip.test_rest_calls['get'] > 0
+
+    # Removing everything leaves an empty partition.
+    assert cccl.apply_config({}) == 0
+    bigip.tm.sys.folders.folder.load(name="Test").delete()
+
+
+def test_delete_referenced(bigip):
+    """Resources that are referenced cannot be deleted."""
+    cccl = F5CloudServiceManager(bigip, "Test")
+    cccl.apply_config(_service_config())
+
+    with pytest.raises(iControlUnexpectedHTTPError) as error:
+        bigip.tm.ltm.nodes.node.load(
+            name="172.16.0.1", partition="Test").delete()
+    assert error.value.response.status_code == 400
+
+    with pytest.raises(iControlUnexpectedHTTPError) as error:
+        bigip.tm.ltm.pools.pool.load(name="pool0", partition="Test").delete()
+    assert error.value.response.status_code == 400
+
+    with pytest.raises(iControlUnexpectedHTTPError) as error:
+        bigip.tm.sys.folders.folder.load(name="Test").delete()
+    assert error.value.response.status_code == 400
+
+
+def test_create_conflict(bigip):
+    """Creating a resource that exists fails with a conflict."""
+    bigip.tm.ltm.pools.pool.create(name="pool0", partition="Test")
+    with pytest.raises(iControlUnexpectedHTTPError) as error:
+        bigip.tm.ltm.pools.pool.create(name="pool0", partition="Test")
+    assert error.value.response.status_code == 409
+
+    with pytest.raises(iControlUnexpectedHTTPError) as error:
+        bigip.tm.ltm.pools.pool.create(name="pool0", partition="Missing")
+    assert error.value.response.status_code == 400
+
+
+def test_select_filter(bigip):
+    """Collections are filtered by partition and properties selected."""
+    bigip.tm.ltm.pools.pool.create(name="pool0", partition="Test")
+    bigip.tm.ltm.pools.pool.create(name="pool1", partition="Common")
+
+    pools = bigip.tm.ltm.pools.get_collection(
+        requests_params={'params': "$filter=partition+eq+Test"})
+    assert [p.name for p in pools] == ["pool0"]
+
+    pools = bigip.tm.ltm.pools.get_collection(
+        requests_params={'params': "$select=name,generation"})
+    pools = sorted(pools, key=lambda p: p['name'])
+    assert [sorted(p) for p in pools] == [['generation', 'name']] * 2
+    assert pools[0]['generation'] < pools[1]['generation']
+
+
+def test_paging(bigip):
+    """Collections are paged with $top and $skip."""
+    for i in range(5):
+        bigip.tm.ltm.pools.pool.create(name="pool{}".format(i),
+                                       partition="Test")
+    bigip.tm.ltm.pools.pool.create(name="pool5", partition="Common")
+
+    session = bigip._meta_data['icr_session']
+    uri = bigip.tm.ltm.pools._meta_data['uri']
+    pages = [
+        session.get(uri, params="$filter=partition+eq+Test&$top=2&"
+                    "$skip={}".format(skip)).json()
+        for skip in [0, 2, 4, 6]
+    ]
+    assert [[p['name'] for p in page.get('items', [])]
+            for page in pages] == \
+        [["pool0", "pool1"], ["pool2", "pool3"], ["pool4"], []]
+    assert [page['pageIndex'] for page in pages] == [1, 2, 3, 4]
+    assert all(page['totalItems'] == 5 for page in pages)
+    assert all(page['totalPages'] == 3 for page in pages)
+    assert pages[2]['currentItemCount'] == 1
+
+
+def test_transactions(bigip):
+    """Deploy in transactions, each resource is written once."""
+    cccl = F5CloudServiceManager(bigip, "Test", direct_updates=True,
+                                 transaction_size=10)
+    assert cccl.apply_config(_service_config()) == 0
+    assert bigip.tm.ltm.virtuals.virtual.exists(name="vs0", partition="Test")
+
+    bigip.simulator.reset_counters()
+    assert cccl.apply_config({}) == 0
+
+    # The virtual and pool are deleted in one transaction each, the
+    # nodes one at a time after the refresh.
+    assert bigip.test_rest_calls['delete'] == 5
+    assert bigip.test_rest_calls['patch'] == 2
+    assert not bigip.tm.ltm.pools.get_collection()
+    assert not bigip.tm.ltm.nodes.get_collection()
+
+
+def test_latency(bigip):
+    """Each request is delayed by the latency."""
+    bigip.simulator.latency = 0.02
+    start = time()
+    bigip.tm.ltm.pools.get_collection()
+    bigip.tm.ltm.nodes.get_collection()
+    assert time() - start >= 0.04
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# Copyright 2017 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from f5_cccl.service.config_reader import ServiceConfigReader
+from f5_cccl.service.validation import ServiceConfigValidator
+from f5_cccl.test.service_generator import CHURN_PROFILES
+from f5_cccl.test.service_generator import churn
+from f5_cccl.test.service_generator import make_service_config
+
+
+def _read(service_config):
+    validator = ServiceConfigValidator(
+        schema='f5_cccl/schemas/cccl-api-schema.yml')
+    validator.validate(service_config)
+    return ServiceConfigReader("Test").read_config(service_config)
+
+
+def test_make_service_config():
+    """Every resource type is generated and valid."""
+    desired = _read(make_service_config("Test", 20, num_members=3,
+                                        num_rules=4, num_records=50))
+
+    for key in ['virtuals', 'virtual_addresses', 'pools', 'l7policies',
+                'irules', 'internaldatagroups']:
+        assert len(desired[key]) == 20
+    for hm_type in ['http', 'https', 'tcp', 'icmp']:
+        assert len(desired["{}_monitors".format(hm_type)]) == 5
+    assert len(desired['iapps']) == 2
+
+    pool = desired['pools']['pool-7']
+    assert len(pool.data['membersReference']['items']) == 3
+    policy = desired['l7policies']['policy-7']
+    assert len(policy.data['rules']) == 4
+    data_group = desired['internaldatagroups']['datagroup-7']
+    assert len(data_group.data['records']) == 50
+
+
+def test_churn():
+    """Each churn profile changes a copy of the configuration."""
+    cfg = make_service_config("Test", 50)
+    desired = _read(make_service_config("Test", 50))
+    assert churn(cfg, 'none') == cfg
+
+    for profile in CHURN_PROFILES:
+        changed = churn(cfg, profile)
+        assert changed is not cfg
+        assert cfg == make_service_config("Test", 50)
+        if profile == 'none':
+            continue
+
+        changed = _read(changed)
+        assert changed != desired
+        differences = [
+            key for key in desired
+            if set(desired[key]) != set(changed[key]) or
+            any(desired[key][name] != changed[key][name]
+                for name in desired[key])
+        ]
+        assert differences
+
+    # One percent of the members move.
+    changed = _read(churn(cfg, 'members-1pct'))
+    updated = [name for name in desired['pools']
+               if desired['pools'][name] != changed['pools'][name]]
+    assert len(updated) in [1, 2]
+
+    # The same seed changes the same members.
+    assert churn(cfg, 'members-1pct', seed=3) == \
+        churn(cfg, 'members-1pct', seed=3)
@@ -0,0 +1,137 @@
+# coding=utf-8
+#
+# Copyright 2017 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Retrieval and decoding of iControl REST collections."""
+
+import json
+import re
+import threading
+import weakref
+
+from f5.sdk_exception import UnregisteredKind
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# The F5 SDK keeps the last response of get_collection in the collection
+# object, which every proxy of a management root shares.  The locks go
+# away with the collections of the management root.
+_COLLECTION_LOCKS = weakref.WeakKeyDictionary()
+_COLLECTION_LOCKS_GUARD = threading.Lock()
+
+
+def collection_lock(collection):
+    """Return the lock that serializes the retrieval of a collection."""
+    with _COLLECTION_LOCKS_GUARD:
+        lock = _COLLECTION_LOCKS.get(collection)
+        if lock is None:
+            lock = _COLLECTION_LOCKS[collection] = threading.Lock()
+        return lock
+
+
+def iter_collection_items(text, properties=None):
+    """Decode the items of a collection response one at a time.
+
+    The generator holds only the text of the response and the item
+    being decoded, not the decoded response as a whole, so a caller
+    that consumes each item as it is yielded never has two copies of
+    the collection in memory.
+
+    Args:
+        text: The JSON text of an iControl REST collection.
+        properties: Optional dict that the other properties of the
+            collection, e.g. totalItems, are added to as they are
+            decoded.
+
+    Raises:
+        ValueError: The text is not a JSON object.
+    """
+    decoder = json.JSONDecoder()
+
+    def _skip(index, separator=None):
+        index = _WHITESPACE.match(text, index).end()
+        if separator is not None and text[index] == separator:
+            index = _WHITESPACE.match(text, index + 1).end()
+        return index
+
+    try:
+        index = _skip(0)
+        if text[index] != '{':
+            raise ValueError("Expecting a JSON object")
+        index = _skip(index + 1)
+        while text[index] != '}':
+            (key, index) = decoder.raw_decode(text, index)
+            index = _skip(index, ':')
+            if key != 'items':
+                (value, index) = decoder.raw_decode(text, index)
+                if properties is not None:
+                    properties[key] = value
+                index = _skip(index, ',')
+                continue
+
+            if text[index] != '[':
+                raise ValueError("Expecting a list of items")
+            index = _skip(index + 1)
+            while text[index] != ']':
+                (item, index) = decoder.raw_decode(text, index)
+                yield item
+                index = _skip(index, ',')
+            index = _skip(index + 1, ',')
+    except IndexError:
+        raise ValueError("Unterminated JSON object")
+
+
+def collection_resource(collection, item):
+    """Create the F5 SDK resource of a decoded item of a collection.
+
+    The resource is created as get_collection creates it, without
+    storing the response in the collection object.  An item that has
+    no kind is returned as it is.
+
+    Raises:
+        UnregisteredKind: The kind of the item is not one of the
+            collection's.
+    """
+    if 'kind' not in item:
+        return item
+
+    # pylint: disable=protected-access
+    registry = collection._meta_data['attribute_registry']
+    if item['kind'] not in registry:
+        raise UnregisteredKind(
+            "{!r} is not registered!".format(item['kind']))
+    resource = registry[item['kind']](collection)
+    resource._local_update(item)
+    resource._activate_URI(resource.selfLink)
+    return resource
+
+
+class CollectionItem(object):
+    """An item of a decoded collection.
+
+    The properties of the item can be read as attributes, as those of
+    the F5 SDK resources that are created by get_collection.
+    """
+
+    __slots__ = ('raw',)
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def __getattr__(self, name):
+        try:
+            return self.raw[name]
+        except KeyError:
+            raise AttributeError(name)
@@ -16,9 +16,170 @@
 #
 """Wrapper functions for the f5-sdk"""
 
+from contextlib import contextmanager
+import socket
+import threading
+import weakref
+
 from f5.bigip import ManagementRoot
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """A requests transport adapter with tunable connection pools.
+
+    The socket options are set on every new connection of the pools.
+    """
+
+    def __init__(self, socket_options=None, **kwargs):
+        self._socket_options = socket_options
+        super(PooledHTTPAdapter, self).__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self._socket_options is not None:
+            kwargs['socket_options'] = self._socket_options
+        super(PooledHTTPAdapter, self).init_poolmanager(*args, **kwargs)
+
+
+class PooledManagementRoot(ManagementRoot):
+    """A ManagementRoot that sends its requests through a given adapter."""
+
+    def __init__(self, hostname, username, password, adapter, **kwargs):
+        self.adapter = adapter
+        super(PooledManagementRoot, self).__init__(
+            hostname, username, password, **kwargs)
+
+    def _get_icr_session(self, *args, **kwargs):
+        icr_session = super(PooledManagementRoot, self)._get_icr_session(
+            *args, **kwargs)
+        icr_session.session.mount("https://", self.adapter)
+        return icr_session
+
+
+def connection_adapter(pool_connections=10, pool_maxsize=10,
+                       pool_block=False, keep_alive=True, tcp_nodelay=True,
+                       max_retries=0, backoff_factor=0):
+    """Create a pooled transport adapter for iControl REST sessions.
+
+    :param pool_connections: Number of hosts to keep connection pools for.
+    :param pool_maxsize: Maximum number of connections kept open to each
+    host.
+    :param pool_block: Wait for a connection of the pool to be free
+    instead of opening one that is not kept when the pool is full.
+    :param keep_alive: Enable TCP keep-alive probes on idle connections.
+    :param tcp_nodelay: Disable Nagle's algorithm on the connections.
+    :param max_retries: Number of times to retry a request that fails to
+    connect, or an idempotent request that fails to read the response.
+    :param backoff_factor: Sleep backoff_factor * 2 ** (retry - 1)
+    seconds between retries.
+    """
+    socket_options = [
+        (socket.IPPROTO_TCP, socket.TCP_NODELAY, int(bool(tcp_nodelay))),
+        (socket.SOL_SOCKET, socket.SO_KEEPALIVE, int(bool(keep_alive)))
+    ]
+    if max_retries:
+        max_retries = Retry(total=max_retries, backoff_factor=backoff_factor)
+
+    return PooledHTTPAdapter(socket_options=socket_options,
+                             pool_connections=pool_connections,
+                             pool_maxsize=pool_maxsize,
+                             pool_block=pool_block,
+                             max_retries=max_retries)
+
+
+def mgmt_root(host, username, password, port, token, **kwargs):
+    """Create a BIG-IP Management Root object
+
+    The keyword arguments tune the connection pool of the iControl REST
+    session, see connection_adapter.
+    """
+    return PooledManagementRoot(host, username, password,
+                                connection_adapter(**kwargs),
+                                port=port, token=token)
+
+
+class SessionGuard(object):
+    """Guards the open transactions of an iControl REST session.
+
+    A transaction is opened by setting its coordination id on the
+    session, every request sent over the session while it is open is
+    part of the transaction.  The holders of the exclusive guard use
+    the session alone, those of the shared guard use it concurrently.
+    A waiting exclusive holder goes before the shared holders that come
+    after it.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._shared = 0
+        self._exclusive = False
+        self._waiting = 0
+
+    @contextmanager
+    def hold(self, exclusive=False):
+        """Hold the guard for the duration of the context.
+
+        :param exclusive: Hold the guard alone, e.g. to deploy in
+        transactions (default: False, share it).
+        """
+        with self._condition:
+            if exclusive:
+                self._waiting += 1
+                while self._exclusive or self._shared:
+                    self._condition.wait()
+                self._waiting -= 1
+                self._exclusive = True
+            else:
+                while self._exclusive or self._waiting:
+                    self._condition.wait()
+                self._shared += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                if exclusive:
+                    self._exclusive = False
+                else:
+                    self._shared -= 1
+                self._condition.notify_all()
+
+
+_SESSION_GUARDS = weakref.WeakKeyDictionary()
+_SESSION_GUARDS_LOCK = threading.Lock()
+
+
+def session_guard(mgmt):
+    """Get the guard of the iControl REST session of a Management Root.
+
+    Every caller that is given the same Management Root gets the same
+    guard, for as long as the Management Root exists.
+    """
+    with _SESSION_GUARDS_LOCK:
+        guard = _SESSION_GUARDS.get(mgmt)
+        if guard is None:
+            guard = _SESSION_GUARDS[mgmt] = SessionGuard()
+        return guard
+
 
+def get_connection_stats(mgmt):
+    """Get the connection reuse statistics of a Management Root.
 
-def mgmt_root(host, username, password, port, token):
-    """Create a BIG-IP Management Root object"""
-    return ManagementRoot(host, username, password, port=port, token=token)
+    :return: A dict of the number of connections opened, requests sent
+    and requests sent on a connection that was already open.
+    """
+    stats = {'connections': 0, 'requests': 0, 'reused': 0}
+    # pylint: disable=protected-access
+    session = mgmt._meta_data['icr_session'].session
+    for adapter in session.adapters.values():
+        poolmanager = getattr(adapter, 'poolmanager', None)
+        if poolmanager is None:
+            continue
+        for key in list(poolmanager.pools.keys()):
+            pool = poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            stats['connections'] += pool.num_connections
+            stats['requests'] += pool.num_requests
+    stats['reused'] = max(0, stats['requests'] - stats['connections'])
+    return stats
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# Copyright 2017 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import gc
+
+from mock import Mock
+import pytest
+
+from f5_cccl.utils.collection import _COLLECTION_LOCKS
+from f5_cccl.utils.collection import collection_lock
+from f5_cccl.utils.collection import iter_collection_items
+
+
+def test_collection_lock():
+    """Each collection has a lock, as long as the collection exists."""
+    collection = Mock()
+    lock = collection_lock(collection)
+    assert collection_lock(collection) is lock
+    assert collection_lock(Mock()) is not lock
+
+    gc.collect()
+    locks = len(_COLLECTION_LOCKS)
+    del collection
+    gc.collect()
+    assert len(_COLLECTION_LOCKS) == locks - 1
+
+
+def test_iter_collection_items():
+    """Collection items are decoded one at a time."""
+    text = ('{"kind": "tm:ltm:pool:poolcollectionstate",\n'
+            ' "selfLink": "https://localhost/mgmt/tm/ltm/pool",\n'
+            ' "items": [ {"name": "pool1", "membersReference": {"items": '
+            '[{"name": "1.2.3.4:80"}]}} ,\n  {"name": "pool2"}],'
+            ' "generation": 1 }')
+    items = iter_collection_items(text)
+    assert next(items) == {
+        'name': "pool1", 'membersReference': {'items': [
+            {'name': "1.2.3.4:80"}]}}
+    assert list(items) == [{'name': "pool2"}]
+
+    assert list(iter_collection_items('{"kind": "x"}')) == []
+    assert list(iter_collection_items('{"items": []}')) == []
+    for text in ['[]', '{"items": {}}', '{"items": [{"name": "a"}, ']:
+        with pytest.raises(ValueError):
+            list(iter_collection_items(text))
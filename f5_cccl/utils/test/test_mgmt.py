@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# Copyright 2017 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import socket
+import threading
+
+from mock import Mock
+import pytest
+import requests
+from six.moves.BaseHTTPServer import BaseHTTPRequestHandler
+from six.moves.BaseHTTPServer import HTTPServer
+
+from f5_cccl.utils.mgmt import connection_adapter
+from f5_cccl.utils.mgmt import get_connection_stats
+from f5_cccl.utils.mgmt import session_guard
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = HTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield "http://127.0.0.1:{}".format(httpd.server_address[1])
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _mgmt(session):
+    mgmt = Mock()
+    mgmt._meta_data = {'icr_session': Mock(session=session)}
+    return mgmt
+
+
+def test_connection_adapter():
+    """The socket options and retries are set on the adapter."""
+    adapter = connection_adapter(pool_maxsize=4, tcp_nodelay=False,
+                                 max_retries=3, backoff_factor=0.5)
+    options = adapter.poolmanager.connection_pool_kw['socket_options']
+    assert (socket.IPPROTO_TCP, socket.TCP_NODELAY, 0) in options
+    assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) in options
+    assert adapter.poolmanager.connection_pool_kw['maxsize'] == 4
+    assert adapter.max_retries.total == 3
+    assert adapter.max_retries.backoff_factor == 0.5
+
+    adapter = connection_adapter()
+    assert adapter.max_retries.total == 0
+
+
+def test_get_connection_stats(server):
+    """The requests sent on a kept-alive connection are counted."""
+    session = requests.Session()
+    session.mount("http://", connection_adapter())
+    mgmt = _mgmt(session)
+    assert get_connection_stats(mgmt) == \
+        {'connections': 0, 'requests': 0, 'reused': 0}
+
+    for _ in range(5):
+        assert session.get(server + "/mgmt/tm/ltm/pool").json() == {}
+    assert get_connection_stats(mgmt) == \
+        {'connections': 1, 'requests': 5, 'reused': 4}
+    session.close()
+
+
+def test_session_guard():
+    """An exclusive holder of the guard holds it alone."""
+    mgmt = Mock()
+    guard = session_guard(mgmt)
+    assert session_guard(mgmt) is guard
+    assert session_guard(Mock()) is not guard
+
+    events = list()
+
+    def _hold(name, exclusive):
+        with guard.hold(exclusive=exclusive):
+            events.append(name)
+
+    with guard.hold():
+        # The shared guard is held concurrently.
+        shared = threading.Thread(target=_hold, args=("shared", False))
+        shared.start()
+        shared.join(5)
+        assert events == ["shared"]
+
+        exclusive = threading.Thread(target=_hold, args=("exclusive", True))
+        exclusive.start()
+        exclusive.join(0.1)
+        assert exclusive.is_alive()
+
+        # Shared holders that come after wait for the exclusive one.
+        later = threading.Thread(target=_hold, args=("later", False))
+        later.start()
+        later.join(0.1)
+        assert later.is_alive()
+
+    exclusive.join(5)
+    later.join(5)
+    assert events == ["shared", "exclusive", "later"]
@@ -15,12 +15,13 @@
 # limitations under the License.
 #
 
+import os
+
 import pytest
 import requests
 
-from mock import MagicMock
-
 from f5_cccl.api import F5CloudServiceManager
+from f5_cccl.test.bigip_simulator import SimulatedManagementRoot
 
 from f5.bigip import ManagementRoot
 
@@ -48,17 +49,30 @@ def instrument_bigip(mgmt_root):
     return mgmt_root
 
 
+def bigip_symbols():
+    """Return the pytest symbols of a real BIG-IP, if there are any."""
+    symbols = getattr(pytest, 'symbols', None)
+    for sym in ['bigip_mgmt_ip', 'bigip_username', 'bigip_password']:
+        if not hasattr(symbols, sym):
+            return None
+    return symbols
+
+
 @pytest.fixture(scope="module")
 def bigip():
-    if pytest.symbols:
-        hostname = pytest.symbols.bigip_mgmt_ip
-        username = pytest.symbols.bigip_username
-        password = pytest.symbols.bigip_password
+    symbols = bigip_symbols()
+    if symbols:
+        hostname = symbols.bigip_mgmt_ip
+        username = symbols.bigip_username
+        password = symbols.bigip_password
 
         bigip_fix = ManagementRoot(hostname, username, password)
         bigip_fix = instrument_bigip(bigip_fix)
     else:
-        bigip_fix = MagicMock()
+        # Without a BIG-IP, run against the simulator.  The latency of
+        # each request in seconds is set by CCCL_SIMULATOR_LATENCY.
+        latency = float(os.environ.get('CCCL_SIMULATOR_LATENCY', 0))
+        bigip_fix = SimulatedManagementRoot(latency=latency)
 
     yield bigip_fix
 
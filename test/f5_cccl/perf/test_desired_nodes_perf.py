@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+
+# Copyright 2017 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Benchmark the inference of the desired nodes from the pool members.
+
+The large data set (2000 pools with 40 members each and 5000 nodes) is
+only used when CCCL_PERF_LARGE is set in the environment, since the
+legacy scan takes minutes at that size.
+"""
+
+import os
+
+import pytest
+
+from mock import MagicMock
+
+from f5_cccl.bigip import BigIPProxy
+from f5_cccl.resource.ltm.node import Node
+from f5_cccl.service.manager import ServiceConfigDeployer
+
+
+class IcrObject(object):
+    """A minimal iControl REST resource as returned by the F5 SDK."""
+
+    def __init__(self, **raw):
+        self.raw = raw
+        self.name = raw['name']
+        self.partition = raw['partition']
+
+
+def _make_proxy(num_pools, num_members, num_nodes):
+    """Create a proxy whose cache holds the pools and nodes."""
+    nodes = [
+        IcrObject(name="10.{}.{}.{}".format(i // 65536, (i // 256) % 256,
+                                             i % 256),
+                  partition="test", state="up", session="user-enabled")
+        for i in range(num_nodes)
+    ]
+    for node in nodes:
+        node.raw['address'] = node.name
+
+    pools = list()
+    for i in range(num_pools):
+        members = [
+            {'name': "{}:{}".format(
+                nodes[(i * num_members + j) % num_nodes].name, 8080),
+             'partition': "test"}
+            for j in range(num_members)
+        ]
+        pools.append(IcrObject(name="pool-{}".format(i), partition="test",
+                               membersReference={'items': members}))
+
+    proxy = BigIPProxy(MagicMock(), "test")
+    proxy._update_caches({'nodes': nodes, 'pools': pools})
+    return proxy
+
+
+def _legacy_desired_nodes(bigip):
+    """The pools x members x nodes scan that the index replaced."""
+    desired_nodes = dict()
+
+    nodes = bigip.get_nodes()
+    pools = bigip.get_pools(True)
+    for pool in pools:
+        for member in pools[pool].members:
+            addr = member.name.split('%3A')[0]
+            node_list = list(nodes.keys())
+            for key in node_list:
+                if nodes[key].data['address'] == addr:
+                    node = {'name': key,
+                            'partition': nodes[key].partition,
+                            'address': addr,
+                            'state': 'user-up',
+                            'session': 'user-enabled'}
+                    desired_nodes[key] = Node(**node)
+
+    return desired_nodes
+
+
+testdata = [
+    (20, 40, 50),
+    (200, 40, 500),
+]
+if os.environ.get('CCCL_PERF_LARGE'):
+    testdata.append((2000, 40, 5000))
+
+
+@pytest.mark.parametrize("np,nm,nn", testdata)
+@pytest.mark.benchmark(group="desired-nodes-legacy")
+def test_desired_nodes_legacy(benchmark, np, nm, nn):
+    proxy = _make_proxy(np, nm, nn)
+    desired_nodes = benchmark.pedantic(
+        _legacy_desired_nodes, args=(proxy,), rounds=1, iterations=1)
+    assert len(desired_nodes) == min(np * nm, nn)
+
+
+@pytest.mark.parametrize("np,nm,nn", testdata)
+@pytest.mark.benchmark(group="desired-nodes-indexed")
+def test_desired_nodes_indexed(benchmark, np, nm, nn):
+    proxy = _make_proxy(np, nm, nn)
+    deployer = ServiceConfigDeployer(proxy)
+    desired_nodes = benchmark(deployer._desired_nodes)
+    assert len(desired_nodes) == min(np * nm, nn)
+
+    # The index gives the same result as the scan.
+    if np * nm * nn <= 400000:
+        legacy_nodes = _legacy_desired_nodes(proxy)
+        assert sorted(desired_nodes) == sorted(legacy_nodes)
+        for name, node in desired_nodes.items():
+            assert node.data == legacy_nodes[name].data
@@ -16,6 +16,8 @@
 #
 
 from copy import deepcopy
+from time import time
+
 import pytest
 import requests
 import pdb
@@ -34,15 +36,6 @@ from pprint import pprint
 
 requests.packages.urllib3.disable_warnings()
 
-req_symbols = ['bigip_mgmt_ip', 'bigip_username', 'bigip_password']
-def missing_bigip_symbols():
-    for sym in req_symbols:
-        if not hasattr(pytest.symbols, sym):
-            return True
-    return False
-
-pytestmark = pytest.mark.skipif(missing_bigip_symbols(),
-                                reason="Need symbols pointing at a real bigip.")
 
 def _make_svc_config(partition, num_virtuals=0, num_members=0):
     base_virtual = {
@@ -63,7 +56,7 @@ def _make_svc_config(partition, num_virtuals=0, num_members=0):
     base_pool = {
         "name": "pool1",
         "monitors": ["/Common/http"]
-    },
+    }
     base_member ={
         "address": "172.16.0.100", "port": 8080, "routeDomain": {"id": 0}
     }
@@ -77,6 +70,8 @@ def _make_svc_config(partition, num_virtuals=0, num_members=0):
         v = {}
         v.update(base_virtual)
         v['name'] = "virtual-{}".format(i)
+        v['destination'] = "/{}/10.0.{}.{}:80".format(partition, i // 256,
+                                                      i % 256)
         v['pool'] = "/{}/pool-{}".format(partition,i)
         cfg['virtualServers'].append(v)
 
@@ -104,24 +99,46 @@ testdata = [
 
 
 
+def _report(benchmark, counters, elapsed):
+    """Record the wall time and REST calls of the last apply."""
+    benchmark.extra_info['wall_time'] = elapsed[-1]
+    benchmark.extra_info['rest_calls'] = dict(counters)
+    pprint(benchmark.extra_info)
+
+
 @pytest.mark.parametrize("nv,nm", testdata)
 @pytest.mark.benchmark(group="apply-new")
 def test_apply_new(partition, cccl, bigip_rest_counters, benchmark, nv, nm):
     cfg = _make_svc_config(partition, num_virtuals=nv, num_members=nm)
+    elapsed = []
     def setup():
         cccl.apply_config({})
+        for k in bigip_rest_counters:
+            bigip_rest_counters[k] = 0
     def apply():
-        cccl.apply_config(cfg)
+        start = time()
+        cccl.apply_config(deepcopy(cfg))
+        elapsed.append(time() - start)
     benchmark.pedantic(apply, setup=setup, rounds=2, iterations=1)
 
-    pprint(bigip_rest_counters)
+    _report(benchmark, bigip_rest_counters, elapsed)
+    assert bigip_rest_counters['post'] >= 2 * nv
+
 
 @pytest.mark.parametrize("nv,nm", testdata)
 @pytest.mark.benchmark(group="apply-no-change")
 def test_apply_no_change(partition, cccl, bigip_rest_counters, benchmark, nv, nm):
     cfg = _make_svc_config(partition, num_virtuals=nv, num_members=nm)
+    elapsed = []
     def apply():
-        cccl.apply_config(cfg)
+        for k in bigip_rest_counters:
+            bigip_rest_counters[k] = 0
+        start = time()
+        cccl.apply_config(deepcopy(cfg))
+        elapsed.append(time() - start)
     apply()
     benchmark.pedantic(apply, rounds=2, iterations=1)
-    pprint(bigip_rest_counters)
+
+    _report(benchmark, bigip_rest_counters, elapsed)
+    for method in ['post', 'put', 'patch', 'delete']:
+        assert bigip_rest_counters[method] == 0
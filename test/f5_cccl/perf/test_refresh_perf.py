@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+
+# Copyright 2017 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Benchmark the time and memory taken by a refresh of the BIG-IP state.
+
+Partitions of 100 and 1000 services are used by default, 5000 is added
+when CCCL_PERF_LARGE is set in the environment.  The memory retained by
+the caches of the proxy and the peak during the refresh are recorded in
+the extra info of the benchmark.  The refresh is benchmarked with and
+without streamed collections, and in pages of 250 items.  A refresh
+of an unchanged partition is benchmarked with and without skipping the
+unchanged collections.
+
+The memory taken by the members of pools read from the BIG-IP is
+measured separately, with 10000 and 100000 members.
+"""
+
+from copy import deepcopy
+import os
+
+import pytest
+
+from f5_cccl.bigip import BigIPProxy
+from f5_cccl.resource.ltm.pool import IcrPool
+from f5_cccl.test.service_generator import make_service_config
+
+tracemalloc = pytest.importorskip("tracemalloc")
+
+
+SIZES = [100, 1000]
+if os.environ.get('CCCL_PERF_LARGE'):
+    SIZES += [5000]
+
+MEMBER_COUNTS = [10000, 100000]
+
+
+def _reset(counters):
+    for k in counters:
+        counters[k] = 0
+
+
+def _icr_pools(partition, num_members, pool_size=100):
+    u"""Return the iControl REST representation of pools of members."""
+    pools = list()
+    for first in range(0, num_members, pool_size):
+        members = [
+            {'name': "10.{}.{}.{}:8080".format(
+                m // 65536, (m // 256) % 256, m % 256),
+             'partition': partition,
+             'address': "10.{}.{}.{}".format(
+                 m // 65536, (m // 256) % 256, m % 256),
+             'ratio': 1,
+             'connectionLimit': 0,
+             'priorityGroup': 0,
+             'session': "monitor-enabled",
+             'state': "up",
+             'description': None}
+            for m in range(first, min(first + pool_size, num_members))]
+        pools.append({
+            'name': "pool-{}".format(first // pool_size),
+            'partition': partition,
+            'loadBalancingMode': "round-robin",
+            'monitor': "/Common/http ",
+            'membersReference': {'isSubcollection': True,
+                                 'items': members}})
+    return pools
+
+
+@pytest.mark.parametrize("stream", [False, True])
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.benchmark(group="refresh")
+def test_refresh(bigip, partition, cccl, benchmark, size, stream):
+    cfg = make_service_config(partition, size, iapp_every=0)
+    assert cccl.apply_config(deepcopy(cfg)) == 0
+
+    proxy = BigIPProxy(bigip, partition, stream_collections=stream)
+    benchmark.pedantic(proxy.refresh, rounds=3, iterations=1)
+
+    # Measure the memory of the caches of a new proxy.
+    proxy = BigIPProxy(bigip, partition, stream_collections=stream)
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        proxy.refresh()
+        (current, peak) = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    benchmark.extra_info['size'] = size
+    benchmark.extra_info['cache_bytes'] = current - before
+    benchmark.extra_info['peak_bytes'] = peak - before
+    assert len(proxy.get_pools()) == size
+    assert len(proxy.get_virtuals()) == size
+
+
+@pytest.mark.parametrize("page_workers", [1, 4])
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.benchmark(group="paged-refresh")
+def test_paged_refresh(bigip, partition, cccl, benchmark, size,
+                       page_workers):
+    cfg = make_service_config(partition, size, iapp_every=0)
+    assert cccl.apply_config(deepcopy(cfg)) == 0
+
+    proxy = BigIPProxy(bigip, partition, page_size=250,
+                       page_workers=page_workers)
+    benchmark.pedantic(proxy.refresh, rounds=3, iterations=1)
+
+    benchmark.extra_info['size'] = size
+    assert len(proxy.get_pools()) == size
+
+
+@pytest.mark.parametrize("skip_unchanged", [False, True])
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.benchmark(group="unchanged-refresh")
+def test_unchanged_refresh(bigip, partition, cccl, bigip_rest_counters,
+                           benchmark, size, skip_unchanged):
+    cfg = make_service_config(partition, size, iapp_every=0)
+    assert cccl.apply_config(deepcopy(cfg)) == 0
+
+    proxy = BigIPProxy(bigip, partition, skip_unchanged=skip_unchanged)
+    proxy.refresh()
+    _reset(bigip_rest_counters)
+    benchmark.pedantic(proxy.refresh, rounds=3, iterations=1)
+
+    benchmark.extra_info['size'] = size
+    benchmark.extra_info['rest_calls'] = dict(bigip_rest_counters)
+    assert len(proxy.get_pools()) == size
+
+
+@pytest.mark.parametrize("num_members", MEMBER_COUNTS)
+@pytest.mark.benchmark(group="pool-members")
+def test_pool_members(partition, benchmark, num_members):
+    pools = _icr_pools(partition, num_members)
+
+    def create():
+        return [IcrPool(**pool) for pool in pools]
+
+    benchmark.pedantic(create, rounds=3, iterations=1)
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        created = create()
+        current = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    benchmark.extra_info['members'] = num_members
+    benchmark.extra_info['bytes'] = current - before
+    benchmark.extra_info['bytes_per_member'] = (
+        (current - before) // num_members)
+    assert sum(len(pool) for pool in created) == num_members
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+# Copyright 2017 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Benchmark each stage of an apply with every CCCL resource type.
+
+The services are made by f5_cccl.test.service_generator, see there for
+the churn profiles.  Services of 10 and 100 virtual servers are used by
+default, 1000 and 10000 are added when CCCL_PERF_LARGE is set in the
+environment.  The results are saved for comparison with:
+
+    py.test test/f5_cccl/perf/test_service_perf.py \\
+        --benchmark-json=perf.json
+"""
+
+from copy import deepcopy
+import os
+
+import pytest
+
+from f5_cccl.service.config_reader import ServiceConfigReader
+from f5_cccl.test.service_generator import CHURN_PROFILES
+from f5_cccl.test.service_generator import churn
+from f5_cccl.test.service_generator import make_service_config
+
+
+SIZES = [10, 100]
+if os.environ.get('CCCL_PERF_LARGE'):
+    SIZES += [1000, 10000]
+
+
+def _reset(counters):
+    for k in counters:
+        counters[k] = 0
+
+
+def _validated(cccl, service_config):
+    """Return a copy of the config with the schema defaults set."""
+    service_config = deepcopy(service_config)
+    cccl._service_manager._config_validator.validate(service_config)
+    return service_config
+
+
+def _read(cccl, service_config):
+    reader = cccl._service_manager._config_reader
+    return reader.read_config(_validated(cccl, service_config))
+
+
+def _all_tasks(deployer, bigip, desired_config):
+    """Compute the tasks of every resource type, as deploy does."""
+    tasks = list()
+    for (getter, config_key) in [
+            (bigip.get_virtual_addresses, 'virtual_addresses'),
+            (bigip.get_virtuals, 'virtuals'),
+            (bigip.get_pools, 'pools'),
+            (bigip.get_irules, 'irules'),
+            (bigip.get_internal_data_groups, 'internaldatagroups'),
+            (bigip.get_l7policies, 'l7policies'),
+            (bigip.get_app_svcs, 'iapps')]:
+        tasks.append(deployer._get_resource_tasks(
+            getter(), desired_config.get(config_key, dict())))
+    tasks.append(deployer._get_monitor_tasks(desired_config))
+    return tasks
+
+
+@pytest.mark.parametrize("cache_size", [0, 50000])
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.benchmark(group="read-config")
+def test_read_config(partition, cccl, benchmark, size, cache_size):
+    cfg = make_service_config(partition, size)
+    reader = ServiceConfigReader(partition, cache_size=cache_size)
+    reader.read_config(_validated(cccl, cfg))
+
+    # 1% of the pool members changed since the last read.
+    changed = _validated(cccl, churn(cfg, 'members-1pct'))
+    desired = benchmark(reader.read_config, changed)
+
+    benchmark.extra_info['size'] = size
+    benchmark.extra_info['cache'] = reader.get_cache_stats()
+    assert len(desired['virtuals']) == size
+    assert len(desired['internaldatagroups']) == size
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.benchmark(group="resource-tasks")
+def test_resource_tasks(partition, cccl, benchmark, size):
+    cfg = make_service_config(partition, size)
+    assert cccl.apply_config(deepcopy(cfg)) == 0
+
+    bigip = cccl._bigip_proxy
+    deployer = cccl._service_manager._service_deployer
+    bigip.refresh()
+    desired = _read(cccl, churn(cfg, 'members-1pct'))
+
+    tasks = benchmark(_all_tasks, deployer, bigip, desired)
+
+    benchmark.extra_info['size'] = size
+    # Only the pools with a changed member are updated.
+    (create_pools, update_pools, delete_pools) = tasks[2]
+    assert not create_pools and not delete_pools
+    assert 1 <= len(update_pools) <= max(1, size * 5 // 100)
+
+
+@pytest.mark.parametrize("profile", sorted(CHURN_PROFILES))
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.benchmark(group="deploy")
+def test_deploy(partition, cccl, bigip_rest_counters, benchmark, size,
+                profile):
+    cfg = make_service_config(partition, size)
+    changed = churn(cfg, profile)
+    deployer = cccl._service_manager._service_deployer
+
+    def setup():
+        assert cccl.apply_config(deepcopy(cfg)) == 0
+        _reset(bigip_rest_counters)
+        return ((_read(cccl, changed),), dict())
+
+    retval = benchmark.pedantic(deployer.deploy, setup=setup, rounds=3,
+                                iterations=1)
+
+    benchmark.extra_info['size'] = size
+    benchmark.extra_info['churn'] = profile
+    benchmark.extra_info['rest_calls'] = dict(bigip_rest_counters)
+    assert retval == 0
+    if profile == 'none':
+        for method in ['post', 'put', 'patch', 'delete']:
+            assert bigip_rest_counters[method] == 0
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+# Copyright 2017 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Benchmark the compiled schema validator against jsonschema.
+
+The validation of a config in which 1% of the pool members changed is
+benchmarked with and without the cache of validated entries.
+
+Services of 10 and 100 virtual servers are used by default, 1000 and
+5000 are added when CCCL_PERF_LARGE is set in the environment.
+"""
+
+from copy import deepcopy
+import os
+
+import pytest
+
+from f5_cccl.service.validation import ServiceConfigValidator
+from f5_cccl.test.service_generator import churn
+from f5_cccl.test.service_generator import make_service_config
+
+
+SIZES = [10, 100]
+if os.environ.get('CCCL_PERF_LARGE'):
+    SIZES += [1000, 5000]
+
+
+@pytest.mark.parametrize("engine", ["compiled", "jsonschema"])
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.benchmark(group="validate")
+def test_validate(benchmark, size, engine):
+    cfg = make_service_config("Test", size)
+    validator = ServiceConfigValidator(cache_size=0)
+    if engine == "compiled":
+        validate = validator.validate
+    else:
+        validate = validator.validator.validate
+
+    def setup():
+        return ((deepcopy(cfg),), dict())
+
+    benchmark.pedantic(validate, setup=setup, rounds=5, iterations=1)
+
+    benchmark.extra_info['size'] = size
+    validated = deepcopy(cfg)
+    validator.validate(validated)
+    assert validated['pools'][0]['members'][0]['ratio'] == 1
+
+
+@pytest.mark.parametrize("cache_size", [0, 50000])
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.benchmark(group="validate-changed")
+def test_validate_changed(benchmark, size, cache_size):
+    cfg = make_service_config("Test", size)
+    changed = churn(cfg, 'members-1pct')
+    validator = ServiceConfigValidator(cache_size=cache_size)
+
+    def setup():
+        validator.validate(deepcopy(cfg))
+        return ((deepcopy(changed),), dict())
+
+    benchmark.pedantic(validator.validate, setup=setup, rounds=5,
+                       iterations=1)
+
+    benchmark.extra_info['size'] = size